@@ -0,0 +1,385 @@
+"""
+Server-Side Alert Rule Engine
+Evaluates user alert rules once, centrally, instead of in every open browser
+tab. Rules are indexed per (metric, direction) in threshold-sorted lists, so an
+update from the previous to the current value binary-searches the range of
+thresholds it crossed and only visits those rules. Cooldowns are enforced per
+rule, and fired alerts are kept in a sequence-numbered event log. Rules that
+share a group behave like an if / else-if chain: one update fires at most one
+of them, the most extreme threshold that is off cooldown.
+
+Run this module directly for a throughput benchmark:
+    python3 alert_engine.py
+"""
+
+import bisect
+import heapq
+import itertools
+import math
+import threading
+import time
+from collections import deque
+
+ABOVE = 'above'
+BELOW = 'below'
+
+CROSS = 'cross'  # fire when the value crosses the threshold
+LEVEL = 'level'  # fire on crossing, then again every cooldown while still beyond it
+
+DEFAULT_COOLDOWN = 300  # seconds
+MAX_EVENTS = 1000       # fired alerts kept for polling
+
+class AlertRule:
+    __slots__ = ('id', 'user', 'metric', 'direction', 'threshold', 'mode', 'cooldown', 'message',
+                 'inclusive', 'group', 'created', 'last_fired', 'fired', 'suppressed', 'active', 'scheduled')
+
+    def __init__(self, rule_id, user, metric, direction, threshold, mode, cooldown, message,
+                 inclusive=False, group=None):
+        self.id = rule_id
+        self.user = user
+        self.metric = metric
+        self.direction = direction
+        self.threshold = threshold
+        self.mode = mode
+        self.cooldown = cooldown
+        self.message = message
+        self.inclusive = inclusive
+        self.group = group
+        self.created = time.time()
+        self.last_fired = None
+        self.fired = 0
+        self.suppressed = 0
+        self.active = True
+        self.scheduled = False
+
+    def beyond(self, value):
+        if self.direction == ABOVE:
+            return value >= self.threshold if self.inclusive else value > self.threshold
+        return value <= self.threshold if self.inclusive else value < self.threshold
+
+    def crossed(self, previous, value):
+        return self.beyond(value) and (previous is None or not self.beyond(previous))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'user': self.user,
+            'metric': self.metric,
+            'direction': self.direction,
+            'threshold': self.threshold,
+            'mode': self.mode,
+            'cooldown': self.cooldown,
+            'message': self.message,
+            'inclusive': self.inclusive,
+            'group': self.group,
+            'last_fired': self.last_fired,
+            'fired': self.fired,
+            'suppressed': self.suppressed
+        }
+
+class _ThresholdIndex:
+    """Rules of one metric and direction, kept sorted by threshold"""
+
+    def __init__(self):
+        self.thresholds = []
+        self.rules = []
+
+    def __len__(self):
+        return len(self.rules)
+
+    def add(self, rule):
+        i = bisect.bisect_right(self.thresholds, rule.threshold)
+        self.thresholds.insert(i, rule.threshold)
+        self.rules.insert(i, rule)
+
+    def remove(self, rule):
+        lo = bisect.bisect_left(self.thresholds, rule.threshold)
+        hi = bisect.bisect_right(self.thresholds, rule.threshold)
+        for i in range(lo, hi):
+            if self.rules[i] is rule:
+                del self.thresholds[i]
+                del self.rules[i]
+                return True
+        return False
+
+    def rising(self, previous, current):
+        """Rules with previous <= threshold <= current (AlertRule.crossed narrows the ends)"""
+        lo = bisect.bisect_left(self.thresholds, previous) if previous is not None else 0
+        return self.rules[lo:bisect.bisect_right(self.thresholds, current)]
+
+    def falling(self, previous, current):
+        """Rules with current <= threshold <= previous"""
+        hi = bisect.bisect_right(self.thresholds, previous) if previous is not None else len(self.rules)
+        return self.rules[bisect.bisect_left(self.thresholds, current):hi]
+
+class AlertEngine:
+    """Indexed alert rules over named metrics such as 'NIFTY:pcr'"""
+
+    def __init__(self, max_events=MAX_EVENTS):
+        self.rules = {}
+        self.values = {}
+        self.updates = 0
+        self.evaluated = 0
+        self.events = deque(maxlen=max_events)
+
+        self._above = {}
+        self._below = {}
+        self._rearm = {}  # metric -> heap of (due, seq, rule) for LEVEL rules
+        self._lows = {}
+        self._ids = itertools.count(1)
+        self._seq = itertools.count(1)
+        self._event_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # ============ RULES ============
+
+    def add_rule(self, metric, direction, threshold, mode=CROSS, cooldown=DEFAULT_COOLDOWN,
+                 user=None, message=None, inclusive=False, group=None):
+        """Register a rule and return it; raises ValueError for bad arguments
+
+        ``inclusive`` fires at the threshold itself (>= / <=). Rules of one user
+        with the same ``group`` fire at most one per update (see _fire).
+        """
+        if direction not in (ABOVE, BELOW):
+            raise ValueError(f"direction must be '{ABOVE}' or '{BELOW}'")
+        if mode not in (CROSS, LEVEL):
+            raise ValueError(f"mode must be '{CROSS}' or '{LEVEL}'")
+        if not metric:
+            raise ValueError("metric is required")
+        threshold = float(threshold)
+        if not math.isfinite(threshold):
+            raise ValueError("threshold must be a finite number")
+        cooldown = float(cooldown)
+        if math.isnan(cooldown):
+            raise ValueError("cooldown must be a number")
+        cooldown = max(cooldown, 0.0)
+
+        with self._lock:
+            rule = AlertRule(next(self._ids), user, metric, direction, threshold, mode, cooldown, message,
+                             bool(inclusive), group)
+            self.rules[rule.id] = rule
+            index = self._above if direction == ABOVE else self._below
+            index.setdefault(metric, _ThresholdIndex()).add(rule)
+            # A level rule added while the metric is already beyond it fires on the next update
+            current = self.values.get(metric)
+            if mode == LEVEL and current is not None and rule.beyond(current):
+                self._schedule(rule, time.time())
+            return rule
+
+    def remove_rule(self, rule_id):
+        with self._lock:
+            rule = self.rules.pop(rule_id, None)
+            if rule is None:
+                return False
+            rule.active = False
+            index = (self._above if rule.direction == ABOVE else self._below).get(rule.metric)
+            if index is not None:
+                index.remove(rule)
+                if not index:
+                    del (self._above if rule.direction == ABOVE else self._below)[rule.metric]
+            return True
+
+    def list_rules(self, user=None):
+        with self._lock:
+            return [r.to_dict() for r in self.rules.values() if user is None or r.user == user]
+
+    # ============ EVALUATION ============
+
+    def update(self, metric, value, now=None):
+        """Feed a new metric value; returns the alerts fired by this update"""
+        if value is None:
+            return []
+        now = time.time() if now is None else now
+        fired = []
+        with self._lock:
+            previous = self.values.get(metric)
+            self.values[metric] = value
+            self.updates += 1
+
+            candidates = ()
+            if previous is None:
+                # First observation: only level rules can fire, there was no crossing
+                above, below = self._above.get(metric), self._below.get(metric)
+                candidates = (above.rising(None, value) if above else []) + (below.falling(None, value) if below else [])
+            elif value > previous:
+                index = self._above.get(metric)
+                if index:
+                    candidates = index.rising(previous, value)
+            elif value < previous:
+                index = self._below.get(metric)
+                if index:
+                    candidates = index.falling(previous, value)
+
+            self.evaluated += len(candidates)
+            if previous is None:
+                due = [r for r in candidates if r.mode == LEVEL and r.beyond(value)]
+            else:
+                due = list(candidates)
+                # Only thresholds equal to an end of the move depend on inclusive
+                if due and (due[0].threshold in (previous, value) or due[-1].threshold in (previous, value)):
+                    due = [r for r in due if r.crossed(previous, value)]
+
+            heap = self._rearm.get(metric)
+            while heap and heap[0][0] <= now:
+                _, _, rule = heapq.heappop(heap)
+                rule.scheduled = False
+                self.evaluated += 1
+                if rule.active and rule.beyond(value) and rule not in due:
+                    due.append(rule)
+
+            self._fire(due, value, previous, now, fired)
+        return fired
+
+    def update_jump(self, metric, value, now=None):
+        """Track the running low of metric and update '<metric>:jump' (percent above the low)"""
+        if value is None or value <= 0:
+            return []
+        low = self._lows.get(metric)
+        if low is None or value < low:
+            self._lows[metric] = low = value
+        return self.update(f"{metric}:jump", (value - low) / low * 100, now)
+
+    def reset_lows(self):
+        """Forget running lows, e.g. at the start of a trading day"""
+        self._lows.clear()
+
+    def reset_values(self):
+        """Forget the last value of every metric and the running lows, e.g. after a replay"""
+        with self._lock:
+            self.values.clear()
+            self._lows.clear()
+
+    def _fire(self, rules, value, previous, now, fired):
+        groups = {}
+        for rule in rules:
+            if rule.group is None:
+                self._trigger(rule, value, previous, now, fired)
+            else:
+                groups.setdefault((rule.user, rule.group), []).append(rule)
+
+        for members in groups.values():
+            # if / else-if: the most extreme tier off cooldown fires, the rest
+            # are covered by it and looked at again once its cooldown is over
+            members.sort(key=lambda r: r.threshold, reverse=members[0].direction == ABOVE)
+            winner = None
+            for rule in members:
+                if winner is None:
+                    if self._trigger(rule, value, previous, now, fired):
+                        winner = rule
+                else:
+                    rule.suppressed += 1
+                    if rule.mode == LEVEL:
+                        self._schedule(rule, now + winner.cooldown)
+
+    def _trigger(self, rule, value, previous, now, fired):
+        """Fire rule unless it is cooling down; returns whether it fired"""
+        if rule.last_fired is not None and now - rule.last_fired < rule.cooldown:
+            rule.suppressed += 1
+            if rule.mode == LEVEL:
+                self._schedule(rule, rule.last_fired + rule.cooldown)
+            return False
+
+        rule.last_fired = now
+        rule.fired += 1
+        word = 'above' if rule.direction == ABOVE else 'below'
+        event = {
+            'id': next(self._event_ids),
+            'rule_id': rule.id,
+            'user': rule.user,
+            'metric': rule.metric,
+            'direction': rule.direction,
+            'threshold': rule.threshold,
+            'value': value,
+            'previous': previous,
+            'message': rule.message or f"{rule.metric} {word} {rule.threshold:g} (current: {value:.2f})",
+            'time': now
+        }
+        self.events.append(event)
+        fired.append(event)
+        if rule.mode == LEVEL:
+            self._schedule(rule, now + rule.cooldown)
+        return True
+
+    def _schedule(self, rule, due):
+        if rule.scheduled:
+            return
+        rule.scheduled = True
+        heapq.heappush(self._rearm.setdefault(rule.metric, []), (due, next(self._seq), rule))
+
+    # ============ EVENTS ============
+
+    def recent_events(self, user=None, since=0):
+        """Fired alerts with id > since, oldest first"""
+        with self._lock:
+            return [e for e in self.events if e['id'] > since and (user is None or e['user'] == user)]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'rules': len(self.rules),
+                'metrics': len(set(self._above) | set(self._below)),
+                'updates': self.updates,
+                'evaluated': self.evaluated,
+                'fired': sum(r.fired for r in self.rules.values()),
+                'suppressed': sum(r.suppressed for r in self.rules.values())
+            }
+
+def options360_rules(underlying, iv_threshold=20, pcr_bullish=1.0, pcr_bearish=1.0,
+                     straddle_tiers=(10, 20, 30)):
+    """The alerts.js checks (IV, PCR shift, straddle jump tiers) as rule definitions"""
+    rules = [
+        {'metric': f"{underlying}:iv", 'direction': ABOVE, 'threshold': iv_threshold,
+         'mode': LEVEL, 'cooldown': 300, 'message': f"High IV Alert: {underlying} IV above {iv_threshold}%"},
+        {'metric': f"{underlying}:pcr", 'direction': ABOVE, 'threshold': pcr_bullish,
+         'mode': CROSS, 'cooldown': 300, 'message': f"Bullish PCR Shift: {underlying} PCR crossed above {pcr_bullish}"},
+        {'metric': f"{underlying}:pcr", 'direction': BELOW, 'threshold': pcr_bearish,
+         'mode': CROSS, 'cooldown': 300, 'message': f"Bearish PCR Shift: {underlying} PCR dropped below {pcr_bearish}"}
+    ]
+    # jump >= 30 ... else if jump >= 20 ... else if jump >= 10: one tier per check
+    for tier in straddle_tiers:
+        rules.append({'metric': f"{underlying}:straddle:jump", 'direction': ABOVE, 'threshold': tier,
+                      'mode': LEVEL, 'cooldown': 600, 'inclusive': True, 'group': f"{underlying}:straddle",
+                      'message': f"Straddle Jump: {underlying} straddle premium {tier}% above its low"})
+    return rules
+
+# ============ BENCHMARK ============
+
+def _linear_update(rules, previous, value):
+    """Reference evaluation that checks every rule on every tick"""
+    return [r for r in rules
+            if (r.direction == ABOVE and previous <= r.threshold < value)
+            or (r.direction == BELOW and value < r.threshold <= previous)]
+
+def benchmark(sizes=(1_000, 10_000, 100_000), ticks=20_000):
+    import random
+
+    rng = random.Random(5)
+    print(f"Alert engine benchmark ({ticks} ticks of a random walk on one metric)")
+    for size in sizes:
+        engine = AlertEngine()
+        for i in range(size):
+            engine.add_rule('NIFTY:pcr', ABOVE if i % 2 else BELOW, rng.uniform(0.5, 1.5), cooldown=0)
+        walk, value = [], 1.0
+        for _ in range(ticks):
+            value = min(max(value + rng.gauss(0, 0.002), 0.5), 1.5)
+            walk.append(value)
+
+        start = time.perf_counter()
+        for i, v in enumerate(walk):
+            engine.update('NIFTY:pcr', v, now=i)
+        indexed_s = time.perf_counter() - start
+        fired = sum(r.fired for r in engine.rules.values())
+
+        rules = list(engine.rules.values())
+        sample = walk[:max(ticks * 1_000 // size, 50)]
+        start = time.perf_counter()
+        for previous, v in zip(sample, sample[1:]):
+            _linear_update(rules, previous, v)
+        linear_s = (time.perf_counter() - start) / (len(sample) - 1) * ticks
+
+        print(f"  {size:7d} rules: indexed {indexed_s / ticks * 1e6:8.2f} us/tick "
+              f"({size * ticks / indexed_s:14,.0f} rules covered/s, {fired} fired), "
+              f"linear scan {linear_s / ticks * 1e6:10.2f} us/tick")
+
+if __name__ == '__main__':
+    benchmark()
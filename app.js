@@ -2,8 +2,27 @@
 
 // True Data Server Configuration
 const TRUE_DATA_SERVER = 'http://localhost:5002';
+const ANGEL_SERVER = 'http://localhost:5001';
 let usingTrueData = false;
 
+// Live feeds in order of preference: the Angel One server's merged
+// Angel One + True Data feed first, then the True Data server on its own
+const LIVE_FEEDS = [
+  {
+    label: 'Merged Feed',
+    status: `${ANGEL_SERVER}/api/providers`,
+    indices: `${ANGEL_SERVER}/api/feed`,
+    stream: `${ANGEL_SERVER}/api/feed/stream`
+  },
+  {
+    label: 'True Data',
+    status: `${TRUE_DATA_SERVER}/api/status`,
+    indices: `${TRUE_DATA_SERVER}/api/indices`,
+    stream: `${TRUE_DATA_SERVER}/api/stream`
+  }
+];
+let liveFeed = LIVE_FEEDS[LIVE_FEEDS.length - 1];
+
 // URL parameter handling
 function handleUrlParameters() {
   const urlParams = new URLSearchParams(window.location.search);
@@ -70,61 +89,109 @@ function initializeLiveTickers() {
   });
 }
 
-// Check if True Data server is available
+// Check if a live feed server is available
 async function checkTrueDataConnection() {
-  try {
-    const response = await fetch(`${TRUE_DATA_SERVER}/api/status`, {
-      method: 'GET',
-      signal: AbortSignal.timeout(2000)
-    });
-    
-    if (response.ok) {
+  for (const feed of LIVE_FEEDS) {
+    try {
+      const response = await fetch(feed.status, {
+        method: 'GET',
+        signal: AbortSignal.timeout(2000)
+      });
+      
+      if (!response.ok) continue;
       const status = await response.json();
-      if (status.authenticated) {
-        // Switch to True Data mode
-        usingTrueData = true;
-        demoMode = false;
-        updateTickerStatus('Live Data • True Data');
-        
-        // Clear demo interval and set up True Data polling
-        if (tickerUpdateInterval) {
-          clearInterval(tickerUpdateInterval);
-        }
-        
+      if (!status.authenticated) continue;
+      
+      // Switch to live mode
+      liveFeed = feed;
+      usingTrueData = true;
+      demoMode = false;
+      updateTickerStatus(`Live Data • ${feed.label}`);
+      
+      // Clear demo interval and set up live polling
+      if (tickerUpdateInterval) {
+        clearInterval(tickerUpdateInterval);
+      }
+      
+      tickerUpdateInterval = null;
+      
+      // Prefer server push; fall back to polling if EventSource is unavailable
+      if (!startTrueDataStream()) {
         updateTrueDataTickers();
         tickerUpdateInterval = setInterval(updateTrueDataTickers, 2000);
-        
-        console.log('Connected to True Data server');
-        return;
       }
+      
+      console.log(`Connected to ${feed.label}`);
+      return;
+    } catch (error) {
+      console.log(`${feed.label} not available`);
     }
-  } catch (error) {
-    console.log('True Data server not available, trying Yahoo Finance...');
   }
   
+  console.log('No live feed server available, trying Yahoo Finance...');
+  
   // Fallback to Yahoo Finance
   updateLiveTickers();
 }
 
+// Subscribe to pushed quote updates from True Data server
+let trueDataStream = null;
+
+function startTrueDataStream() {
+  if (typeof EventSource === 'undefined') return false;
+  
+  const tickerIds = { NIFTY: 'nifty', SENSEX: 'sensex', BANKNIFTY: 'banknifty' };
+  const symbols = Object.keys(tickerIds).join(',');
+  
+  trueDataStream = new EventSource(`${liveFeed.stream}?symbols=${symbols}`);
+  
+  trueDataStream.addEventListener('quote', (event) => {
+    const update = JSON.parse(event.data);
+    const index = tickerIds[update.symbol];
+    if (index) updateTickerDisplay(index, update.data);
+    updateLiveBadge(true, update.data.source ? `${liveFeed.label} (${update.data.source})` : liveFeed.label);
+  });
+  
+  trueDataStream.onerror = () => {
+    // EventSource reconnects on its own; only give up once the server closes it
+    if (trueDataStream.readyState === EventSource.CLOSED) {
+      trueDataStream = null;
+      updateLiveBadge(false);
+      if (!demoMode) {
+        demoMode = true;
+        updateTickerStatus('Demo Mode (Server Offline)');
+        tickerUpdateInterval = setInterval(updateDemoTickers, 5000);
+      }
+    }
+  };
+  
+  window.addEventListener('beforeunload', () => {
+    if (trueDataStream) trueDataStream.close();
+  });
+  
+  return true;
+}
+
 // Fetch data from True Data server
 async function updateTrueDataTickers() {
   try {
-    const response = await fetch(`${TRUE_DATA_SERVER}/api/indices`, {
+    const response = await fetch(liveFeed.indices, {
       method: 'GET',
       signal: AbortSignal.timeout(3000)
     });
     
     if (!response.ok) throw new Error('Server not available');
     
-    const data = await response.json();
+    const payload = await response.json();
+    const data = payload.data || payload;
     
-    // Update tickers with True Data
+    // Update tickers with live data
     if (data.NIFTY) updateTickerDisplay('nifty', data.NIFTY);
     if (data.SENSEX) updateTickerDisplay('sensex', data.SENSEX);
     if (data.BANKNIFTY) updateTickerDisplay('banknifty', data.BANKNIFTY);
     
     // Update live badge
-    updateLiveBadge(true, 'True Data');
+    updateLiveBadge(true, liveFeed.label);
     
   } catch (error) {
     console.error('Error fetching True Data:', error);
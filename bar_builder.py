@@ -0,0 +1,249 @@
+"""
+Incremental Multi-Timeframe Bar Builder
+Folds the tick stream into 1s, 1m, 5m and 15m OHLCV bars per symbol. Rolling
+indicators (SMA 5/10/20, Wilder RSI 14, 5-bar momentum, 20-bar return
+volatility) are updated in O(1) when a bar closes; the forming bar gets
+provisional values computed from the same state without mutating it.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+TIMEFRAMES = {
+    '1s': 1,
+    '1m': 60,
+    '5m': 300,
+    '15m': 900
+}
+MAX_BARS = 2000  # closed bars kept per symbol and timeframe
+
+SMA_PERIODS = (5, 10, 20)
+RSI_PERIOD = 14
+MOMENTUM_PERIOD = 5
+VOLATILITY_PERIOD = 20
+
+# ============ ROLLING INDICATORS ============
+
+class RollingMean:
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+
+    def push(self, x):
+        self.window.append(x)
+        self.total += x
+        if len(self.window) > self.period:
+            self.total -= self.window.popleft()
+        return self.total / len(self.window)
+
+    def peek(self, x):
+        if len(self.window) < self.period:
+            return (self.total + x) / (len(self.window) + 1)
+        return (self.total - self.window[0] + x) / self.period
+
+class RollingVolatility:
+    """Population standard deviation of simple returns over the last period bars"""
+
+    def __init__(self, period):
+        self.period = period
+        self.window = deque()
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.last = None
+
+    def _std(self, total, total_sq, count):
+        if count == 0:
+            return 0.0
+        mean = total / count
+        return math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+    def push(self, x):
+        if self.last:
+            r = (x - self.last) / self.last
+            self.window.append(r)
+            self.total += r
+            self.total_sq += r * r
+            if len(self.window) > self.period:
+                old = self.window.popleft()
+                self.total -= old
+                self.total_sq -= old * old
+        self.last = x
+        return self._std(self.total, self.total_sq, len(self.window))
+
+    def peek(self, x):
+        if not self.last:
+            return 0.0
+        r = (x - self.last) / self.last
+        total, total_sq, count = self.total + r, self.total_sq + r * r, len(self.window) + 1
+        if count > self.period:
+            old = self.window[0]
+            total, total_sq, count = total - old, total_sq - old * old, self.period
+        return self._std(total, total_sq, count)
+
+class WilderRSI:
+    """RSI with Wilder smoothing, seeded by a simple average of the first period changes"""
+
+    def __init__(self, period):
+        self.period = period
+        self.last = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def _next(self, x):
+        change = x - self.last
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self.count < self.period:
+            n = self.count + 1
+            return n, (self.avg_gain * self.count + gain) / n, (self.avg_loss * self.count + loss) / n
+        p = self.period
+        return self.count + 1, (self.avg_gain * (p - 1) + gain) / p, (self.avg_loss * (p - 1) + loss) / p
+
+    @staticmethod
+    def _rsi(avg_gain, avg_loss):
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def push(self, x):
+        if self.last is None:
+            self.last = x
+            return None
+        self.count, self.avg_gain, self.avg_loss = self._next(x)
+        self.last = x
+        return self._rsi(self.avg_gain, self.avg_loss)
+
+    def peek(self, x):
+        if self.last is None:
+            return None
+        _, avg_gain, avg_loss = self._next(x)
+        return self._rsi(avg_gain, avg_loss)
+
+class Momentum:
+    """Rate of change in percent over period bars"""
+
+    def __init__(self, period):
+        self.window = deque(maxlen=period)
+
+    def _roc(self, x):
+        if not self.window:
+            return None
+        base = self.window[0]
+        return (x - base) / base * 100 if base else None
+
+    def push(self, x):
+        roc = self._roc(x)
+        self.window.append(x)
+        return roc
+
+    def peek(self, x):
+        return self._roc(x)
+
+class IndicatorSet:
+    """All indicators of one bar series"""
+
+    def __init__(self):
+        self.sma = {p: RollingMean(p) for p in SMA_PERIODS}
+        self.rsi = WilderRSI(RSI_PERIOD)
+        self.momentum = Momentum(MOMENTUM_PERIOD)
+        self.volatility = RollingVolatility(VOLATILITY_PERIOD)
+
+    def _values(self, close, method):
+        values = {f'sma{p}': getattr(sma, method)(close) for p, sma in self.sma.items()}
+        values['rsi'] = getattr(self.rsi, method)(close)
+        values['momentum'] = getattr(self.momentum, method)(close)
+        values['volatility'] = getattr(self.volatility, method)(close)
+        return values
+
+    def push(self, close):
+        return self._values(close, 'push')
+
+    def peek(self, close):
+        return self._values(close, 'peek')
+
+# ============ BARS ============
+
+class BarSeries:
+    """Closed bars plus the forming bar for one symbol and timeframe"""
+
+    def __init__(self, seconds, max_bars=MAX_BARS):
+        self.seconds = seconds
+        self.bars = deque(maxlen=max_bars)
+        self.indicators = IndicatorSet()
+        self.current = None  # [start, open, high, low, close, volume]
+
+    def on_tick(self, ts, price, volume):
+        start = int(ts) - int(ts) % self.seconds
+        bar = self.current
+        if bar is None or start > bar[0]:
+            if bar is not None:
+                self._close(bar)
+            self.current = [start, price, price, price, price, volume]
+            return
+        # Late ticks for an already closed bucket update the forming bar
+        if price > bar[2]:
+            bar[2] = price
+        if price < bar[3]:
+            bar[3] = price
+        bar[4] = price
+        bar[5] += volume
+
+    def _close(self, bar):
+        record = self._record(bar)
+        record.update(self.indicators.push(bar[4]))
+        self.bars.append(record)
+
+    @staticmethod
+    def _record(bar):
+        return {'time': bar[0], 'open': bar[1], 'high': bar[2], 'low': bar[3], 'close': bar[4], 'volume': bar[5]}
+
+    def latest(self, n):
+        """Last n bars, the forming bar last with provisional indicators"""
+        bars = list(self.bars)[-n:] if n > 0 else []
+        if self.current is not None and n > 0:
+            forming = self._record(self.current)
+            forming.update(self.indicators.peek(self.current[4]))
+            forming['forming'] = True
+            bars = bars[1:] + [forming] if len(bars) >= n else bars + [forming]
+        return bars
+
+class BarBuilder:
+    """Bar series for every symbol seen on the tick stream"""
+
+    def __init__(self, timeframes=TIMEFRAMES):
+        self.timeframes = timeframes
+        self.series = {}
+        self._last_volume = {}
+        self._lock = threading.Lock()
+
+    def on_tick(self, symbol, price, cumulative_volume=None, ts=None):
+        """Fold one tick into every timeframe; volume is the day's cumulative volume"""
+        if price <= 0:
+            return
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            volume = 0
+            if cumulative_volume:
+                previous = self._last_volume.get(symbol)
+                if previous is not None and cumulative_volume >= previous:
+                    volume = cumulative_volume - previous
+                self._last_volume[symbol] = cumulative_volume
+
+            by_tf = self.series.get(symbol)
+            if by_tf is None:
+                by_tf = self.series[symbol] = {tf: BarSeries(s) for tf, s in self.timeframes.items()}
+            for series in by_tf.values():
+                series.on_tick(ts, price, volume)
+
+    def bars(self, symbol, timeframe, n=200):
+        """Up to n most recent bars, or None if the symbol or timeframe is unknown"""
+        if timeframe not in self.timeframes:
+            raise ValueError(f"Unknown timeframe {timeframe}; use one of {', '.join(self.timeframes)}")
+        with self._lock:
+            by_tf = self.series.get(symbol)
+            if by_tf is None:
+                return None
+            return by_tf[timeframe].latest(n)
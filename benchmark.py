@@ -0,0 +1,365 @@
+"""
+Load and Latency Benchmark Suite
+Runs server.py and truedata_server.py in-process against local broker
+stand-ins: a fake SmartConnect and a fake True Data HTTP server, both with
+configurable injected latency. N concurrent clients drive the REST endpoints
+for a fixed duration; the report has p50/p99 latency and throughput per
+endpoint plus the feed-loop cycle time, and is written as JSON so runs can be
+compared for regressions.
+
+Usage:
+    python3 benchmark.py --clients 16 --duration 10 --latency-ms 20
+    python3 benchmark.py --compare data/benchmarks/<previous>.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import requests
+from werkzeug.serving import make_server
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'benchmarks')
+
+ANGEL_ENDPOINTS = [
+    '/api/indices',
+    '/api/quote/NIFTY 50',
+    '/api/quote/BANK NIFTY',
+    '/api/positions',
+    '/api/holdings',
+    '/api/orderbook',
+    '/api/profile'
+]
+TRUEDATA_ENDPOINTS = ['/api/indices']
+
+FEED_CYCLES = 20
+
+# ============ BROKER STAND-INS ============
+
+class Latency:
+    """Injected delay of base +/- uniform jitter (seconds)"""
+
+    def __init__(self, base=0.0, jitter=0.0, seed=0):
+        self.base = base
+        self.jitter = jitter
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            delay = self.base + self._rng.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+class FakeSmartConnect:
+    """The SmartConnect calls server.py makes, answered locally after a delay"""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+        self._prices = {}
+        self._lock = threading.Lock()
+
+    def _respond(self, data):
+        self.latency.wait()
+        with self._lock:
+            self.calls += 1
+        return {'status': True, 'message': 'SUCCESS', 'errorcode': '', 'data': data}
+
+    def generateSession(self, client_code, password, totp=None):
+        return self._respond({'jwtToken': 'Bearer bench-jwt', 'feedToken': 'bench-feed',
+                              'refreshToken': 'bench-refresh'})
+
+    def generateToken(self, refresh_token):
+        return self._respond({'jwtToken': 'bench-jwt-renewed', 'feedToken': 'bench-feed',
+                              'refreshToken': refresh_token})
+
+    def setAccessToken(self, token):
+        pass
+
+    def setRefreshToken(self, token):
+        pass
+
+    def setFeedToken(self, token):
+        pass
+
+    def getProfile(self, refresh_token):
+        return self._respond({'clientcode': 'BENCH', 'name': 'Benchmark', 'exchanges': ['NSE', 'NFO']})
+
+    def getMarketData(self, mode, exchange_tokens):
+        fetched = []
+        with self._lock:
+            for exchange, tokens in exchange_tokens.items():
+                for token in tokens:
+                    price = self._prices.get(token, 20000.0) * (1 + random.uniform(-0.0005, 0.0005))
+                    self._prices[token] = price
+                    fetched.append({
+                        'exchange': exchange, 'tradingSymbol': token, 'symbolToken': token,
+                        'ltp': round(price, 2), 'open': 20000.0, 'high': round(price * 1.01, 2),
+                        'low': round(price * 0.99, 2), 'close': 20000.0,
+                        'tradeVolume': 1000, 'opnInterest': 0
+                    })
+        return self._respond({'fetched': fetched, 'unfetched': []})
+
+    def position(self):
+        return self._respond([{'tradingsymbol': 'NIFTY24DEC23500CE', 'netqty': '50', 'ltp': '120.5',
+                               'pnl': '250.0'}])
+
+    def holding(self):
+        return self._respond([{'tradingsymbol': 'RELIANCE-EQ', 'quantity': 10, 'ltp': 2900.0}])
+
+    def orderBook(self):
+        return self._respond([{'orderid': '1', 'tradingsymbol': 'NIFTY24DEC23500CE', 'status': 'complete'}])
+
+def start_fake_truedata(latency):
+    """Local HTTP server answering the True Data login and quote calls"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def _json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            latency.wait()
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if self.path == '/auth/login':
+                self._json(200, {'token': 'bench-token'})
+            else:
+                self._json(404, {'error': 'not found'})
+
+        def do_GET(self):
+            latency.wait()
+            if self.path.startswith('/quotes/'):
+                price = 20000 * (1 + random.uniform(-0.01, 0.01))
+                self._json(200, {'ltp': round(price, 2), 'change': round(price - 20000, 2),
+                                 'change_percent': round((price - 20000) / 200, 2), 'volume': 1000,
+                                 'high': round(price * 1.01, 2), 'low': round(price * 0.99, 2), 'open': 20000})
+            else:
+                self._json(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+def serve_app(app):
+    """Serve a Flask app on a free local port in a background thread"""
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+# ============ LOAD GENERATION ============
+
+def percentile(samples, q):
+    return round(float(np.percentile(samples, q)) * 1000, 3) if len(samples) else None
+
+def run_load(base_url, endpoints, clients, duration):
+    """Drive endpoints round-robin from N client threads; returns per-endpoint stats"""
+    results = [[] for _ in range(clients)]
+    start_barrier = threading.Barrier(clients + 1)
+    deadline = [0.0]
+
+    def client(i):
+        session = requests.Session()
+        samples = results[i]
+        start_barrier.wait()
+        n = i
+        while time.perf_counter() < deadline[0]:
+            endpoint = endpoints[n % len(endpoints)]
+            n += 1
+            started = time.perf_counter()
+            try:
+                status = session.get(base_url + endpoint, timeout=30).status_code
+            except requests.RequestException:
+                status = 0
+            samples.append((endpoint, time.perf_counter() - started, status))
+
+    threads = [threading.Thread(target=client, args=(i,), daemon=True) for i in range(clients)]
+    for t in threads:
+        t.start()
+    deadline[0] = time.perf_counter() + duration
+    start_barrier.wait()
+    started = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [s for client_samples in results for s in client_samples]
+    report = {'_all': summarize([s[1] for s in samples], [s[2] for s in samples], elapsed)}
+    for endpoint in endpoints:
+        rows = [s for s in samples if s[0] == endpoint]
+        report[endpoint] = summarize([s[1] for s in rows], [s[2] for s in rows], elapsed)
+    return report
+
+def summarize(latencies, statuses, elapsed):
+    latencies = np.asarray(latencies)
+    return {
+        'requests': len(latencies),
+        'errors': sum(1 for s in statuses if s == 0 or s >= 500),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else 0,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': round(float(latencies.max()) * 1000, 3) if len(latencies) else None
+    }
+
+def time_cycles(cycle, cycles=FEED_CYCLES):
+    """Wall time of repeated feed-loop iterations"""
+    durations = []
+    for _ in range(cycles):
+        started = time.perf_counter()
+        cycle()
+        durations.append(time.perf_counter() - started)
+    return {'cycles': cycles, 'p50_ms': percentile(durations, 50), 'p99_ms': percentile(durations, 99),
+            'mean_ms': round(float(np.mean(durations)) * 1000, 3)}
+
+# ============ TARGETS ============
+
+def bench_angel(args, latency, scratch):
+    import server
+
+    server.smart_api = FakeSmartConnect(latency)
+    # Only the local stand-in answers quotes; the public fallback would add network noise
+    server.QUOTE_SOURCES = [('angel_one', server.fetch_angel_quote)]
+    server.tick_store = server.TickStore(os.path.join(scratch, 'angel'))
+    if not server.authenticate_angel_one():
+        raise RuntimeError("Fake SmartConnect login failed")
+
+    def feed_cycle():
+        server.merge_market_data(server.fetch_market_data(server.INSTRUMENT_TOKENS))
+
+    feed = time_cycles(feed_cycle)
+    httpd, base_url = serve_app(server.app)
+    try:
+        endpoints = run_load(base_url, ANGEL_ENDPOINTS, args.clients, args.duration)
+    finally:
+        httpd.shutdown()
+    return {'feed_cycle': feed, 'endpoints': endpoints, 'broker_calls': server.smart_api.calls}
+
+def bench_truedata(args, latency, scratch):
+    import truedata_server
+
+    fake = start_fake_truedata(latency)
+    truedata_server.TRUE_DATA_CONFIG['base_url'] = f"http://127.0.0.1:{fake.server_port}"
+    truedata_server.tick_store = truedata_server.TickStore(os.path.join(scratch, 'truedata'))
+    try:
+        if not truedata_server.authenticate_truedata():
+            raise RuntimeError("Fake True Data login failed")
+        feed = time_cycles(truedata_server.update_live_data)
+        httpd, base_url = serve_app(truedata_server.app)
+        try:
+            endpoints = run_load(base_url, TRUEDATA_ENDPOINTS, args.clients, args.duration)
+        finally:
+            httpd.shutdown()
+    finally:
+        truedata_server.fetcher.close()
+        fake.shutdown()
+    return {'feed_cycle': feed, 'endpoints': endpoints}
+
+TARGETS = {
+    'angel': bench_angel,
+    'truedata': bench_truedata
+}
+
+# ============ REPORTING ============
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def print_report(results):
+    for target, result in results['targets'].items():
+        feed = result['feed_cycle']
+        print(f"\n{target}: feed cycle p50 {feed['p50_ms']} ms, p99 {feed['p99_ms']} ms")
+        print(f"  {'endpoint':28s} {'requests':>9s} {'errors':>7s} {'rps':>9s} {'p50 ms':>9s} {'p99 ms':>9s}")
+        for endpoint, stats in result['endpoints'].items():
+            print(f"  {endpoint:28s} {stats['requests']:9d} {stats['errors']:7d} {stats['throughput_rps']:9.1f} "
+                  f"{stats['p50_ms'] or 0:9.2f} {stats['p99_ms'] or 0:9.2f}")
+
+def compare(current, previous_path):
+    """Print the change of every latency and throughput figure against a previous run"""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    print(f"\nCompared with {previous_path} ({previous.get('commit')}, {previous.get('started')}):")
+    for target, result in current['targets'].items():
+        before = previous.get('targets', {}).get(target)
+        if not before:
+            continue
+        rows = [('feed cycle p50', result['feed_cycle']['p50_ms'], before['feed_cycle']['p50_ms'])]
+        for endpoint, stats in result['endpoints'].items():
+            old = before['endpoints'].get(endpoint)
+            if old:
+                rows.append((f"{endpoint} p99", stats['p99_ms'], old['p99_ms']))
+                rows.append((f"{endpoint} rps", stats['throughput_rps'], old['throughput_rps']))
+        for label, now, then in rows:
+            if now is None or not then:
+                continue
+            print(f"  {target:9s} {label:36s} {then:10.2f} -> {now:10.2f} ({(now - then) / then * 100:+6.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load and latency benchmark against local broker stand-ins")
+    parser.add_argument('--target', choices=['angel', 'truedata', 'both'], default='both')
+    parser.add_argument('--clients', type=int, default=16, help="concurrent HTTP clients")
+    parser.add_argument('--duration', type=float, default=10, help="seconds of load per target")
+    parser.add_argument('--latency-ms', type=float, default=20, help="injected broker latency")
+    parser.add_argument('--jitter-ms', type=float, default=5, help="uniform +/- jitter on the latency")
+    parser.add_argument('--output', default=RESULTS_DIR, help="directory for the JSON results")
+    parser.add_argument('--compare', help="previous results file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    for name in ('server', 'truedata_server', 'werkzeug', 'quote_fetcher', 'ttl_cache'):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    latency = Latency(args.latency_ms / 1000, args.jitter_ms / 1000)
+    results = {
+        'started': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'cpus': os.cpu_count(),
+        'config': {'clients': args.clients, 'duration': args.duration,
+                   'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms},
+        'targets': {}
+    }
+
+    scratch = tempfile.mkdtemp(prefix="bench-")
+    try:
+        for target in (TARGETS if args.target == 'both' else [args.target]):
+            print(f"Benchmarking {target} ({args.clients} clients, {args.duration}s, "
+                  f"{args.latency_ms}±{args.jitter_ms} ms broker latency)...")
+            results['targets'][target] = TARGETS[target](args, latency, scratch)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    print_report(results)
+    os.makedirs(args.output, exist_ok=True)
+    path = os.path.join(args.output, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {path}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+if __name__ == '__main__':
+    main()
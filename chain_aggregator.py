@@ -0,0 +1,206 @@
+"""
+Incremental Option Chain Aggregates
+Keeps put/call ratio, ATM straddle premium and max pain for tracked option
+chains up to date tick by tick. A contract update only adjusts the running
+totals by that contract's change; max pain is recomputed lazily with prefix
+sums, once per read after the chain has changed.
+"""
+
+import bisect
+import threading
+import time
+from datetime import date
+
+import numpy as np
+
+CALL = 0
+PUT = 1
+
+class ChainAggregator:
+    """Running aggregates for one (underlying, expiry) chain"""
+
+    def __init__(self, underlying, expiry, contracts):
+        self.underlying = underlying
+        self.expiry = expiry
+        self.exchange = contracts[0]['exchange'] if contracts else 'NFO'
+        self.strikes = sorted({c['strike'] for c in contracts})
+        strike_index = {k: i for i, k in enumerate(self.strikes)}
+
+        size = len(self.strikes)
+        self.ltp = np.zeros((2, size))
+        self.oi = np.zeros((2, size))
+        self.volume = np.zeros((2, size))
+
+        # token -> (side, strike position)
+        self.slots = {
+            str(c['token']): (CALL if c['option_type'] == 'CE' else PUT, strike_index[c['strike']])
+            for c in contracts
+        }
+
+        self.total_oi = [0.0, 0.0]
+        self.total_volume = [0.0, 0.0]
+        self.spot = 0.0
+        self.atm_index = None
+        self.updated = 0.0
+
+        self._max_pain = None
+        self._lock = threading.Lock()
+
+    def update(self, token, ltp=None, oi=None, volume=None):
+        """Apply one contract update in O(1); returns False for unknown tokens"""
+        slot = self.slots.get(token)
+        if slot is None:
+            return False
+        side, i = slot
+
+        with self._lock:
+            if ltp is not None:
+                self.ltp[side, i] = ltp
+            if oi is not None:
+                self.total_oi[side] += oi - self.oi[side, i]
+                self.oi[side, i] = oi
+                self._max_pain = None
+            if volume is not None:
+                self.total_volume[side] += volume - self.volume[side, i]
+                self.volume[side, i] = volume
+            self.updated = time.time()
+        return True
+
+    def update_spot(self, spot):
+        """Move the ATM strike with the underlying (binary search over strikes)"""
+        if spot <= 0 or not self.strikes:
+            return
+        i = bisect.bisect_left(self.strikes, spot)
+        if i == len(self.strikes) or (i > 0 and spot - self.strikes[i - 1] <= self.strikes[i] - spot):
+            i -= 1
+        with self._lock:
+            self.spot = spot
+            self.atm_index = i
+
+    def max_pain(self):
+        """Strike where option writers pay out the least at expiry
+
+        pain(K_j) = sum_{i<j} callOI_i (K_j - K_i) + sum_{i>j} putOI_i (K_i - K_j),
+        evaluated for every strike at once from prefix sums.
+        """
+        with self._lock:
+            if self._max_pain is not None or not self.strikes:
+                return self._max_pain
+            strikes = np.asarray(self.strikes)
+            call_oi, put_oi = self.oi[CALL], self.oi[PUT]
+
+            call_cum = np.cumsum(call_oi)
+            call_cum_k = np.cumsum(call_oi * strikes)
+            put_rev = np.cumsum(put_oi[::-1])[::-1]
+            put_rev_k = np.cumsum((put_oi * strikes)[::-1])[::-1]
+
+            pain = (strikes * call_cum - call_cum_k) + (put_rev_k - strikes * put_rev)
+            self._max_pain = float(strikes[int(np.argmin(pain))]) if call_cum[-1] or put_rev[0] else None
+            return self._max_pain
+
+    @property
+    def pcr(self):
+        """Put/call open interest ratio, or None before any call OI is seen"""
+        call_oi, put_oi = self.total_oi
+        return put_oi / call_oi if call_oi else None
+
+    def snapshot(self):
+        max_pain = self.max_pain()
+        with self._lock:
+            call_oi, put_oi = self.total_oi
+            call_volume, put_volume = self.total_volume
+            atm = self.atm_index
+            straddle = None
+            if atm is not None and self.ltp[CALL, atm] and self.ltp[PUT, atm]:
+                straddle = round(float(self.ltp[CALL, atm] + self.ltp[PUT, atm]), 2)
+            return {
+                'underlying': self.underlying,
+                'expiry': self.expiry,
+                'spot': self.spot,
+                'pcr_oi': round(put_oi / call_oi, 4) if call_oi else None,
+                'pcr_volume': round(put_volume / call_volume, 4) if call_volume else None,
+                'call_oi': call_oi,
+                'put_oi': put_oi,
+                'call_volume': call_volume,
+                'put_volume': put_volume,
+                'atm_strike': self.strikes[atm] if atm is not None else None,
+                'straddle_premium': straddle,
+                'max_pain': max_pain,
+                'contracts': len(self.slots),
+                'updated': self.updated
+            }
+
+class ChainRegistry:
+    """Tracked chains with a token index so each tick touches one aggregator"""
+
+    def __init__(self):
+        self.chains = {}
+        self._by_token = {}
+        self._lock = threading.Lock()
+
+    def get(self, underlying, expiry):
+        return self.chains.get((underlying, expiry))
+
+    def track(self, underlying, expiry, contracts):
+        """Register a chain; returns (aggregator, newly_tracked)"""
+        with self._lock:
+            key = (underlying, expiry)
+            if key in self.chains:
+                return self.chains[key], False
+            aggregator = ChainAggregator(underlying, expiry, contracts)
+            self.chains[key] = aggregator
+            for token in aggregator.slots:
+                self._by_token[token] = aggregator
+            return aggregator, True
+
+    def instruments(self):
+        """{symbol: token} and {symbol: exchange} of every tracked contract"""
+        tokens, exchanges = {}, {}
+        for (underlying, expiry), aggregator in list(self.chains.items()):
+            for token in aggregator.slots:
+                name = f"{underlying}:{expiry}:{token}"
+                tokens[name] = token
+                exchanges[name] = aggregator.exchange
+        return tokens, exchanges
+
+    def on_contract(self, token, ltp=None, oi=None, volume=None):
+        aggregator = self._by_token.get(token)
+        return aggregator.update(token, ltp, oi, volume) if aggregator else False
+
+    def ltp(self, token):
+        """Last traded price of a tracked contract, or None"""
+        aggregator = self._by_token.get(token)
+        if aggregator is None:
+            return None
+        side, i = aggregator.slots[token]
+        return float(aggregator.ltp[side, i]) or None
+
+    def on_spot(self, underlying, spot):
+        for (name, _), aggregator in list(self.chains.items()):
+            if name == underlying:
+                aggregator.update_spot(spot)
+
+    def nearest(self, underlying):
+        """Aggregator of the nearest tracked expiry that has seen call OI"""
+        # Snapshot under the lock: track() and prune() change the dict meanwhile
+        with self._lock:
+            chains = [(key, aggregator) for key, aggregator in self.chains.items() if key[0] == underlying]
+        for _, aggregator in sorted(chains, key=lambda item: item[0]):
+            if aggregator.pcr is not None:
+                return aggregator
+        return None
+
+    def prune(self, today=None):
+        """Stop tracking chains whose expiry (ISO date) is before today; returns their aggregators"""
+        today = (today or date.today()).isoformat()
+        with self._lock:
+            expired = [self.chains.pop(key) for key in [key for key in self.chains if key[1] < today]]
+            for aggregator in expired:
+                for token in aggregator.slots:
+                    self._by_token.pop(token, None)
+        return expired
+
+    def pcr(self, underlying):
+        """OI put/call ratio of the nearest tracked expiry that has data"""
+        aggregator = self.nearest(underlying)
+        return aggregator.pcr if aggregator else None
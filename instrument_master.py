@@ -0,0 +1,347 @@
+"""
+Angel One Instrument Master Index
+Converts the broker's scrip master JSON once into a compact columnar index of
+NumPy arrays on disk. The server only memory-maps the index at startup and
+answers lookups by token, trading symbol and (underlying, expiry, strike,
+option type) with binary searches over sorted columns.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SCRIP_MASTER_URL = "https://margincalculator.angelbroking.com/OpenAPI_File/files/OpenAPIScripMaster.json"
+
+CURRENT_FILE = "CURRENT"
+META_FILE = "meta.json"
+KEEP_VERSIONS = 2
+
+OPTION_TYPES = ['', 'CE', 'PE']
+EPOCH = date(1970, 1, 1)
+
+# ============ BUILD ============
+
+def _parse_expiry(value):
+    """'28NOV2024' -> days since epoch, 0 when the instrument has no expiry"""
+    if not value:
+        return 0
+    return (datetime.strptime(value, "%d%b%Y").date() - EPOCH).days
+
+def _option_type(symbol, instrument_type):
+    if instrument_type.startswith('OPT'):
+        return 1 if symbol.endswith('CE') else 2
+    return 0
+
+def _file_digest(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def build_index(source_path, index_dir):
+    """Convert a scrip master JSON file into a new index version under index_dir
+
+    Rows are sorted by (underlying, expiry, strike, option type) so option chain
+    queries are contiguous slices. Separate sorted copies of the token and
+    symbol columns, each with a row permutation, serve point lookups. Returns
+    the new version name.
+    """
+    digest = _file_digest(source_path)
+    with open(source_path, 'r', encoding='utf-8') as f:
+        records = json.load(f)
+
+    names = sorted({r.get('name', '') for r in records})
+    exchanges = sorted({r.get('exch_seg', '') for r in records})
+    instrument_types = sorted({r.get('instrumenttype', '') for r in records})
+    name_ids = {n: i for i, n in enumerate(names)}
+    exchange_ids = {e: i for i, e in enumerate(exchanges)}
+    type_ids = {t: i for i, t in enumerate(instrument_types)}
+
+    count = len(records)
+    token = np.empty(count, dtype=np.int64)
+    underlying = np.empty(count, dtype=np.int32)
+    expiry = np.empty(count, dtype=np.int32)
+    strike = np.empty(count, dtype=np.float64)
+    option_type = np.empty(count, dtype=np.int8)
+    lot_size = np.empty(count, dtype=np.int32)
+    tick_size = np.empty(count, dtype=np.float32)
+    exchange = np.empty(count, dtype=np.int16)
+    instrument_type = np.empty(count, dtype=np.int16)
+    symbols = []
+
+    for i, r in enumerate(records):
+        symbol = r.get('symbol', '')
+        kind = r.get('instrumenttype', '')
+        token[i] = int(r['token'])
+        underlying[i] = name_ids[r.get('name', '')]
+        expiry[i] = _parse_expiry(r.get('expiry', ''))
+        # Strikes and tick sizes are published in paise
+        strike[i] = max(float(r.get('strike') or 0), 0.0) / 100.0
+        option_type[i] = _option_type(symbol, kind)
+        lot_size[i] = int(float(r.get('lotsize') or 0))
+        tick_size[i] = float(r.get('tick_size') or 0) / 100.0
+        exchange[i] = exchange_ids[r.get('exch_seg', '')]
+        instrument_type[i] = type_ids[kind]
+        symbols.append(symbol)
+
+    symbol = np.array(symbols, dtype=f"S{max((len(s) for s in symbols), default=1)}")
+
+    order = np.lexsort((option_type, strike, expiry, underlying))
+    columns = {
+        'token': token[order],
+        'underlying': underlying[order],
+        'expiry': expiry[order],
+        'strike': strike[order],
+        'option_type': option_type[order],
+        'lot_size': lot_size[order],
+        'tick_size': tick_size[order],
+        'exchange': exchange[order],
+        'instrument_type': instrument_type[order],
+        'symbol': symbol[order]
+    }
+
+    token_rows = np.argsort(columns['token'], kind='stable').astype(np.int32)
+    symbol_rows = np.argsort(columns['symbol'], kind='stable').astype(np.int32)
+    columns.update({
+        'token_sorted': columns['token'][token_rows],
+        'token_rows': token_rows,
+        'symbol_sorted': columns['symbol'][symbol_rows],
+        'symbol_rows': symbol_rows,
+        # Row range of every underlying: rows [offsets[u], offsets[u + 1])
+        'underlying_offsets': np.searchsorted(columns['underlying'], np.arange(len(names) + 1)).astype(np.int64)
+    })
+
+    version = f"{datetime.now():%Y%m%d%H%M%S}-{digest[:8]}"
+    staging = os.path.join(index_dir, f".{version}.tmp")
+    os.makedirs(staging, exist_ok=True)
+    for column, values in columns.items():
+        np.save(os.path.join(staging, f"{column}.npy"), values)
+
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump({
+            'version': version,
+            'source_digest': digest,
+            'rows': count,
+            'underlyings': names,
+            'exchanges': exchanges,
+            'instrument_types': instrument_types,
+            'built_at': datetime.now().isoformat()
+        }, f)
+
+    os.replace(staging, os.path.join(index_dir, version))
+    _write_current(index_dir, version)
+    _prune_versions(index_dir, keep=version)
+    logger.info(f"✓ Built instrument index {version} ({count} instruments)")
+    return version
+
+def _write_current(index_dir, version):
+    pointer = os.path.join(index_dir, CURRENT_FILE)
+    with open(pointer + ".tmp", 'w') as f:
+        f.write(version)
+    os.replace(pointer + ".tmp", pointer)
+
+def _prune_versions(index_dir, keep):
+    versions = sorted(d for d in os.listdir(index_dir)
+                      if not d.startswith('.') and os.path.isdir(os.path.join(index_dir, d)))
+    # Mapped files of a removed version stay readable until unmapped
+    for old in versions[:-KEEP_VERSIONS]:
+        if old != keep:
+            shutil.rmtree(os.path.join(index_dir, old), ignore_errors=True)
+
+def download_scrip_master(dest_path, session=None):
+    """Download the Angel One scrip master JSON to dest_path"""
+    import requests
+
+    http = session or requests
+    tmp_path = dest_path + ".part"
+    with http.get(SCRIP_MASTER_URL, stream=True, timeout=60) as response:
+        response.raise_for_status()
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(1 << 20):
+                f.write(chunk)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+# ============ LOOKUP ============
+
+class InstrumentIndex:
+    """One memory-mapped, read-only version of the instrument index"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.version = self.meta['version']
+        self.underlyings = self.meta['underlyings']
+        self.exchanges = self.meta['exchanges']
+        self.instrument_types = self.meta['instrument_types']
+        self._underlying_ids = {name: i for i, name in enumerate(self.underlyings)}
+
+        for column in ('token', 'underlying', 'expiry', 'strike', 'option_type', 'lot_size',
+                       'tick_size', 'exchange', 'instrument_type', 'symbol', 'token_sorted',
+                       'token_rows', 'symbol_sorted', 'symbol_rows', 'underlying_offsets'):
+            setattr(self, column, np.load(os.path.join(path, f"{column}.npy"), mmap_mode='r'))
+
+    def __len__(self):
+        return len(self.token)
+
+    def record(self, row):
+        """Instrument at row as a plain dict"""
+        expiry_days = int(self.expiry[row])
+        return {
+            'token': str(int(self.token[row])),
+            'symbol': self.symbol[row].decode('ascii'),
+            'name': self.underlyings[self.underlying[row]],
+            'exchange': self.exchanges[self.exchange[row]],
+            'instrument_type': self.instrument_types[self.instrument_type[row]],
+            'expiry': date.fromordinal(EPOCH.toordinal() + expiry_days).isoformat() if expiry_days else None,
+            'strike': float(self.strike[row]),
+            'option_type': OPTION_TYPES[self.option_type[row]] or None,
+            'lot_size': int(self.lot_size[row]),
+            # Stored as float32; round off the widening noise (0.05 -> 0.0500000007)
+            'tick_size': round(float(self.tick_size[row]), 4)
+        }
+
+    def by_token(self, token):
+        token = int(token)
+        i = np.searchsorted(self.token_sorted, token)
+        if i < len(self.token_sorted) and self.token_sorted[i] == token:
+            return self.record(int(self.token_rows[i]))
+        return None
+
+    def by_symbol(self, symbol):
+        key = symbol.encode('ascii', 'ignore')
+        i = np.searchsorted(self.symbol_sorted, key)
+        if i < len(self.symbol_sorted) and self.symbol_sorted[i] == key:
+            return self.record(int(self.symbol_rows[i]))
+        return None
+
+    def _underlying_range(self, underlying):
+        u = self._underlying_ids.get(underlying)
+        if u is None:
+            return 0, 0
+        return int(self.underlying_offsets[u]), int(self.underlying_offsets[u + 1])
+
+    def expiries(self, underlying):
+        """Sorted option/future expiry dates for an underlying"""
+        start, end = self._underlying_range(underlying)
+        days = np.unique(self.expiry[start:end])
+        return [date.fromordinal(EPOCH.toordinal() + int(d)).isoformat() for d in days if d]
+
+    def option_rows(self, underlying, expiry=None, strike_min=None, strike_max=None, option_type=None):
+        """Row numbers matching an (underlying, expiry, strike range, type) query"""
+        start, end = self._underlying_range(underlying)
+        if start == end:
+            return np.empty(0, dtype=np.int64)
+
+        if expiry is not None:
+            days = (date.fromisoformat(expiry) - EPOCH).days if isinstance(expiry, str) else (expiry - EPOCH).days
+            expiries = self.expiry[start:end]
+            lo = start + int(np.searchsorted(expiries, days, side='left'))
+            hi = start + int(np.searchsorted(expiries, days, side='right'))
+
+            # Within one expiry the rows are sorted by strike
+            strikes = self.strike[lo:hi]
+            s_lo = int(np.searchsorted(strikes, strike_min, side='left')) if strike_min is not None else 0
+            s_hi = int(np.searchsorted(strikes, strike_max, side='right')) if strike_max is not None else len(strikes)
+            lo, hi = lo + s_lo, lo + max(s_lo, s_hi)
+            rows = np.arange(lo, hi)
+            mask = self.option_type[lo:hi] > 0
+        else:
+            rows = np.arange(start, end)
+            strikes = self.strike[start:end]
+            mask = self.option_type[start:end] > 0
+            if strike_min is not None:
+                mask &= strikes >= strike_min
+            if strike_max is not None:
+                mask &= strikes <= strike_max
+
+        if option_type:
+            mask &= self.option_type[rows] == OPTION_TYPES.index(option_type.upper())
+        return rows[mask]
+
+    def options(self, underlying, expiry=None, strike_min=None, strike_max=None, option_type=None):
+        rows = self.option_rows(underlying, expiry, strike_min, strike_max, option_type)
+        return [self.record(int(r)) for r in rows]
+
+class InstrumentMaster:
+    """Holds the current index version and swaps in rebuilt versions atomically"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        self.index = None
+        self._refresh_lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.index is not None
+
+    def load(self):
+        """Memory-map the current index version if one has been built"""
+        pointer = os.path.join(self.index_dir, CURRENT_FILE)
+        if not os.path.exists(pointer):
+            logger.warning(f"No instrument index in {self.index_dir}")
+            return False
+        with open(pointer) as f:
+            version = f.read().strip()
+        self.index = InstrumentIndex(os.path.join(self.index_dir, version))
+        logger.info(f"✓ Loaded instrument index {version} ({len(self.index)} instruments)")
+        return True
+
+    def refresh(self, source_path=None):
+        """Rebuild from source_path (downloaded if omitted) when it has changed
+
+        Not incremental: any change to the file's digest rebuilds and maps the
+        whole index as a new version (about 2 s for 150k instruments), since one
+        added or expired contract shifts the sorted rows of every column. An
+        unchanged file costs only the digest. Requests keep using the previous
+        version until the new one is mapped.
+        """
+        if not self._refresh_lock.acquire(blocking=False):
+            logger.info("Instrument index refresh already running")
+            return False
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            if source_path is None:
+                source_path = download_scrip_master(os.path.join(self.index_dir, "scrip_master.json"))
+
+            if self.index and self.index.meta.get('source_digest') == _file_digest(source_path):
+                logger.info("Instrument master unchanged, keeping current index")
+                return False
+
+            version = build_index(source_path, self.index_dir)
+            self.index = InstrumentIndex(os.path.join(self.index_dir, version))
+            return True
+        except Exception as e:
+            logger.error(f"Instrument index refresh failed: {e}")
+            return False
+        finally:
+            self._refresh_lock.release()
+
+    def refresh_async(self, source_path=None):
+        thread = threading.Thread(target=self.refresh, args=(source_path,), name="instrument-refresh", daemon=True)
+        thread.start()
+        return thread
+
+    def start_daily_refresh(self, at_hour=8, at_minute=0):
+        """Refresh once a day before the market opens (local time)"""
+        def worker():
+            while True:
+                now = datetime.now()
+                target = now.replace(hour=at_hour, minute=at_minute, second=0, microsecond=0)
+                if target <= now:
+                    target += timedelta(days=1)
+                time.sleep((target - now).total_seconds())
+                self.refresh()
+
+        threading.Thread(target=worker, name="instrument-daily-refresh", daemon=True).start()
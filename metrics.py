@@ -0,0 +1,281 @@
+"""
+Prometheus-Style Metrics
+Counters, histograms and scrape-time gauges rendered in the Prometheus text
+exposition format. Recording is built for the tick path: a histogram
+observation is one bisect into fixed bucket bounds and two in-place adds, with
+no lock (a rare lost increment under contention is accepted in exchange).
+Values that already exist elsewhere (cache counters, quote ages) are read by
+collector callbacks only when /metrics is scraped.
+
+Run this module directly for an observation-cost benchmark:
+    python3 metrics.py
+"""
+
+import time
+from bisect import bisect_left
+
+# Default latency buckets in seconds (100 us .. 10 s)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Age/lag buckets in seconds (1 ms .. 10 min)
+AGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+# ============ METRIC TYPES ============
+
+class _HistogramChild:
+    __slots__ = ('bounds', 'counts', 'sum')
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    def time(self):
+        return _Timer(self)
+
+class _Timer:
+    """``with histogram.time():`` observes the elapsed seconds"""
+
+    __slots__ = ('child', 'start')
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.start)
+
+class Histogram:
+    """Fixed-bucket histogram, optionally split by labels
+
+    ``labels(*values)`` returns a cached child; keep it in a local or module
+    variable on hot paths to skip the dict lookup.
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.bounds = tuple(sorted(buckets))
+        self._children = {}
+        if not self.labelnames:
+            self._children[()] = _HistogramChild(self.bounds)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children.setdefault(values, _HistogramChild(self.bounds))
+        return child
+
+    def observe(self, value):
+        self._children[()].observe(value)
+
+    def time(self):
+        return _Timer(self._children[()])
+
+    def render(self):
+        lines = []
+        for values, child in list(self._children.items()):
+            cumulative = 0
+            for bound, count in zip(self.bounds + (float('inf'),), list(child.counts)):
+                cumulative += count
+                labels = _format_labels(self.labelnames, values, ('le', _format_value(float(bound))))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {child.sum!r}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+class Collected:
+    """Counter or gauge whose samples are read by ``collect()`` at scrape time
+
+    ``collect`` returns ``{label_values_tuple: value}`` (or a plain number for
+    an unlabelled metric).
+    """
+
+    def __init__(self, name, help, kind, collect, labelnames=()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.collect = collect
+
+    def render(self):
+        samples = self.collect()
+        if not isinstance(samples, dict):
+            samples = {(): samples}
+        return [f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+                for values, value in samples.items() if value is not None]
+
+# ============ REGISTRY ============
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        # Re-registering a name returns the existing metric, so modules that
+        # are imported together can share one
+        return self._metrics.setdefault(metric.name, metric)
+
+    def histogram(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help, labelnames, buckets))
+
+    def counter(self, name, help, collect, labelnames=()):
+        return self._register(Collected(name, help, 'counter', collect, labelnames))
+
+    def gauge(self, name, help, collect, labelnames=()):
+        return self._register(Collected(name, help, 'gauge', collect, labelnames))
+
+    def render(self):
+        lines = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.render()
+            except Exception as e:
+                lines.append(f"# {metric.name} collection failed: {e}")
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(samples)
+        return '\n'.join(lines) + '\n'
+
+# Shared registry for the running process
+registry = Registry()
+
+# Metrics recorded by more than one module
+http_latency = registry.histogram(
+    'http_request_duration_seconds', 'HTTP handler latency by route', ('route', 'method'))
+broker_latency = registry.histogram(
+    'broker_request_duration_seconds', 'Upstream broker call latency', ('provider', 'method'))
+feed_cycle = registry.histogram(
+    'feed_cycle_duration_seconds', 'Duration of one polling feed cycle', ('feed',))
+tick_store_lag = registry.histogram(
+    'tick_store_lag_seconds', 'Exchange timestamp to tick persisted', ('feed',), AGE_BUCKETS)
+
+# ============ INSTRUMENTATION ============
+
+def instrument_flask(app):
+    """Time every request of a Flask app into http_latency by route template"""
+    from flask import g, request
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.teardown_request
+    def _observe(exc=None):
+        start = g.pop('_metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule else 'unmatched'
+            http_latency.labels(route, request.method).observe(time.perf_counter() - start)
+
+class InstrumentedClient:
+    """Proxy that times the named methods of a broker client into broker_latency
+
+    Every other attribute (token setters and the like) passes straight through.
+    """
+
+    def __init__(self, client, provider, methods):
+        self._client = client
+        self._provider = provider
+        self._methods = frozenset(methods)
+
+    def __getattr__(self, name):
+        attr = getattr(self._client, name)
+        if name not in self._methods:
+            return attr
+        child = broker_latency.labels(self._provider, name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                child.observe(time.perf_counter() - start)
+
+        return timed
+
+# ============ COLLECTORS ============
+
+def cache_collectors(name_prefix, caches):
+    """Register hit/miss counters for named TTLCache objects (read at scrape time)"""
+    registry.counter(f'{name_prefix}_hits_total', 'Cache lookups served from cache (fresh or stale)',
+                     lambda: {(n,): c.hits + c.stale_hits + c.coalesced for n, c in caches().items()}, ('cache',))
+    registry.counter(f'{name_prefix}_misses_total', 'Cache lookups that went upstream',
+                     lambda: {(n,): c.misses for n, c in caches().items()}, ('cache',))
+
+def snapshot_collectors(name_prefix, snapshots):
+    """Register read/build counters for named SnapshotCache objects"""
+    registry.counter(f'{name_prefix}_reads_total', 'Snapshot cache reads',
+                     lambda: {(n,): s.reads for n, s in snapshots().items()}, ('snapshot',))
+    registry.counter(f'{name_prefix}_builds_total', 'Snapshot rebuilds (reads that missed)',
+                     lambda: {(n,): s.builds for n, s in snapshots().items()}, ('snapshot',))
+
+# ============ BENCHMARK ============
+
+def benchmark(n=1_000_000):
+    hist = Histogram('bench_seconds', 'benchmark', ('symbol',))
+    child = hist.labels('NIFTY 50')
+    values = [i % 1000 / 1e5 for i in range(1000)]
+
+    start = time.perf_counter()
+    for i in range(n):
+        pass
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for i in range(n):
+        child.observe(0.0042)
+    observe = (time.perf_counter() - start - loop) / n
+
+    start = time.perf_counter()
+    for i in range(n):
+        hist.labels('NIFTY 50').observe(0.0042)
+    labelled = (time.perf_counter() - start - loop) / n
+
+    start = time.perf_counter()
+    for i in range(n // 10):
+        with child.time():
+            pass
+    timed = (time.perf_counter() - start) / (n // 10)
+
+    for v in values:
+        child.observe(v)
+    start = time.perf_counter()
+    text = hist.render()
+    render = time.perf_counter() - start
+
+    print(f"Metrics benchmark ({n:,} observations)")
+    print(f"  observe (cached child) : {observe * 1e9:7.0f} ns")
+    print(f"  labels().observe       : {labelled * 1e9:7.0f} ns")
+    print(f"  with child.time()      : {timed * 1e9:7.0f} ns (includes two perf_counter calls)")
+    print(f"  render one histogram   : {render * 1e6:7.1f} us ({len(text)} lines)")
+
+if __name__ == '__main__':
+    benchmark()
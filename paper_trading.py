@@ -0,0 +1,460 @@
+"""
+Paper Trading Engine
+Order, fill and position state for many simulated accounts, filled against the
+live quote feed. Orders are only accepted for opened accounts, buys need the
+cash and sells the quantity held (no short selling). Net positions live in one array-backed book (one row per
+account and instrument), so mark-to-market P&L for every account is revalued
+in a single vectorized pass instead of a per-position loop.
+
+Run this module directly for a throughput benchmark:
+    python3 paper_trading.py
+"""
+
+import bisect
+import itertools
+import threading
+import time
+
+import numpy as np
+
+INITIAL_BALANCE = 500000  # same starting balance as paper-trading.html
+INITIAL_CAPACITY = 1024
+MAX_ORDERS = 100          # orders kept per account for listing
+
+BUY = 'BUY'
+SELL = 'SELL'
+MARKET = 'MARKET'
+LIMIT = 'LIMIT'
+
+OPEN = 'OPEN'
+FILLED = 'FILLED'
+CANCELLED = 'CANCELLED'
+REJECTED = 'REJECTED'
+
+class OrderError(ValueError):
+    """An order that cannot be accepted"""
+
+class Order:
+    __slots__ = ('id', 'account', 'symbol', 'side', 'quantity', 'order_type', 'limit_price',
+                 'status', 'fill_price', 'reason', 'created', 'filled')
+
+    def __init__(self, order_id, account, symbol, side, quantity, order_type, limit_price):
+        self.id = order_id
+        self.account = account
+        self.symbol = symbol
+        self.side = side
+        self.quantity = quantity
+        self.order_type = order_type
+        self.limit_price = limit_price
+        self.status = OPEN
+        self.fill_price = None
+        self.reason = None
+        self.created = time.time()
+        self.filled = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'account': self.account,
+            'symbol': self.symbol,
+            'side': self.side,
+            'quantity': self.quantity,
+            'order_type': self.order_type,
+            'limit_price': self.limit_price,
+            'status': self.status,
+            'fill_price': self.fill_price,
+            'reason': self.reason,
+            'created': self.created,
+            'filled': self.filled
+        }
+
+def _grow(array, size):
+    grown = np.zeros(max(size, len(array) * 2), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class PaperTradingEngine:
+    """Simulated accounts with a shared, array-backed position book"""
+
+    def __init__(self, initial_balance=INITIAL_BALANCE):
+        self.initial_balance = initial_balance
+
+        # Accounts
+        self.account_ids = []
+        self._account_index = {}
+        self.cash = np.zeros(INITIAL_CAPACITY)
+        self.realized = np.zeros(INITIAL_CAPACITY)
+        self.trades = np.zeros(INITIAL_CAPACITY, dtype=np.int64)  # closing fills
+        self.wins = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+
+        # Instruments and their last traded prices
+        self.symbols = []
+        self._symbol_index = {}
+        self.prices = np.full(INITIAL_CAPACITY, np.nan)
+
+        # Position book: one row per (account, instrument)
+        self.rows = 0
+        self._row_index = {}
+        self._account_rows = []
+        self.pos_account = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.pos_symbol = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.pos_quantity = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.pos_avg_price = np.zeros(INITIAL_CAPACITY)
+
+        # Revaluation results, recomputed when prices or positions change
+        self.unrealized = np.zeros(0)
+        self.market_value = np.zeros(0)
+        self.revaluations = 0
+        self._dirty = True
+
+        # Resting limit orders per symbol: [sorted limits, orders] for each side
+        self.orders = {}
+        self._account_orders = {}
+        self._resting = {}
+        self._order_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    # ============ ACCOUNTS ============
+
+    def open_account(self, account, balance=None):
+        """Create an account (no-op if it exists); returns its index"""
+        with self._lock:
+            return self._account(account, balance)
+
+    def _account(self, account, balance=None):
+        i = self._account_index.get(account)
+        if i is not None:
+            return i
+        i = len(self.account_ids)
+        if i >= len(self.cash):
+            self.cash, self.realized = _grow(self.cash, i + 1), _grow(self.realized, i + 1)
+            self.trades, self.wins = _grow(self.trades, i + 1), _grow(self.wins, i + 1)
+        self.account_ids.append(account)
+        self._account_rows.append([])
+        self._account_index[account] = i
+        self.cash[i] = self.initial_balance if balance is None else balance
+        self._account_orders[account] = []
+        self._dirty = True
+        return i
+
+    def _symbol(self, symbol):
+        i = self._symbol_index.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i >= len(self.prices):
+                grown = np.full(len(self.prices) * 2, np.nan)
+                grown[:i] = self.prices[:i]
+                self.prices = grown
+            self.symbols.append(symbol)
+            self._symbol_index[symbol] = i
+        return i
+
+    def _row(self, account_i, symbol_i):
+        key = (account_i, symbol_i)
+        row = self._row_index.get(key)
+        if row is None:
+            row = self.rows
+            if row >= len(self.pos_quantity):
+                self.pos_account = _grow(self.pos_account, row + 1)
+                self.pos_symbol = _grow(self.pos_symbol, row + 1)
+                self.pos_quantity = _grow(self.pos_quantity, row + 1)
+                self.pos_avg_price = _grow(self.pos_avg_price, row + 1)
+            self.pos_account[row] = account_i
+            self.pos_symbol[row] = symbol_i
+            self._row_index[key] = row
+            self._account_rows[account_i].append(row)
+            self.rows += 1
+        return row
+
+    # ============ PRICES ============
+
+    def on_price(self, symbol, price):
+        """Record a live price in O(1) and fill any resting limit orders it reaches"""
+        if price is None or price <= 0:
+            return 0
+        with self._lock:
+            i = self._symbol_index.get(symbol)
+            if i is None:
+                return 0
+            self.prices[i] = price
+            self._dirty = True
+            return self._match_resting(symbol, price)
+
+    def price(self, symbol):
+        i = self._symbol_index.get(symbol)
+        if i is None or np.isnan(self.prices[i]):
+            return None
+        return float(self.prices[i])
+
+    def watch(self, symbol, price=None):
+        """Start tracking a symbol's price (orders can only fill on watched symbols)"""
+        with self._lock:
+            i = self._symbol(symbol)
+            if price:
+                self.prices[i] = price
+                self._dirty = True
+
+    def clear_prices(self):
+        """Forget every last price, e.g. after a replay; positions are then carried at entry"""
+        with self._lock:
+            self.prices[:] = np.nan
+            self._dirty = True
+
+    # ============ ORDERS ============
+
+    def place_order(self, account, symbol, side, quantity, order_type=MARKET, limit_price=None):
+        """Validate and place an order; market orders fill immediately at the live price"""
+        side = str(side).upper()
+        order_type = str(order_type).upper()
+        if side not in (BUY, SELL):
+            raise OrderError(f"side must be {BUY} or {SELL}")
+        if order_type not in (MARKET, LIMIT):
+            raise OrderError(f"order_type must be {MARKET} or {LIMIT}")
+        quantity = int(quantity)
+        if quantity <= 0:
+            raise OrderError("quantity must be positive")
+        if order_type == LIMIT:
+            if limit_price is None or float(limit_price) <= 0:
+                raise OrderError("limit_price is required for LIMIT orders")
+            limit_price = float(limit_price)
+
+        with self._lock:
+            if account not in self._account_index:
+                raise OrderError(f"No paper account {account}")
+            self._symbol(symbol)
+            order = Order(next(self._order_ids), account, symbol, side, quantity, order_type, limit_price)
+            self.orders[order.id] = order
+            history = self._account_orders[account]
+            history.append(order)
+            if len(history) > MAX_ORDERS and history[0].status != OPEN:
+                self.orders.pop(history.pop(0).id, None)
+
+            price = self.price(symbol)
+            if order_type == MARKET:
+                if price is None:
+                    self._reject(order, "No live quote for symbol")
+                else:
+                    self._fill(order, price)
+            elif price is not None and self._marketable(order, price):
+                self._fill(order, price)
+            elif order.side == SELL and order.quantity > self._held(order):
+                self._reject(order, "Insufficient position")
+            else:
+                self._rest(order)
+            return order
+
+    def cancel_order(self, order_id):
+        with self._lock:
+            order = self.orders.get(order_id)
+            if order is None or order.status != OPEN:
+                return None
+            limits, resting = self._resting[order.symbol][order.side]
+            i = resting.index(order)
+            del limits[i]
+            del resting[i]
+            order.status = CANCELLED
+            return order
+
+    @staticmethod
+    def _marketable(order, price):
+        return price <= order.limit_price if order.side == BUY else price >= order.limit_price
+
+    def _rest(self, order):
+        limits, resting = self._resting.setdefault(order.symbol, {BUY: ([], []), SELL: ([], [])})[order.side]
+        i = bisect.bisect_right(limits, order.limit_price)
+        limits.insert(i, order.limit_price)
+        resting.insert(i, order)
+
+    def _match_resting(self, symbol, price):
+        """Fill buy limits at or above price and sell limits at or below it, at price"""
+        book = self._resting.get(symbol)
+        if not book:
+            return 0
+        limits, resting = book[BUY]
+        i = bisect.bisect_left(limits, price)
+        buys = resting[i:]
+        del limits[i:], resting[i:]
+        limits, resting = book[SELL]
+        i = bisect.bisect_right(limits, price)
+        sells = resting[:i]
+        del limits[:i], resting[:i]
+        for order in buys + sells:
+            self._fill(order, price)
+        return len(buys) + len(sells)
+
+    def _held(self, order):
+        """Quantity of order's symbol its account holds"""
+        row = self._row_index.get((self._account_index[order.account], self._symbol_index[order.symbol]))
+        return int(self.pos_quantity[row]) if row is not None else 0
+
+    def _reject(self, order, reason):
+        order.status = REJECTED
+        order.reason = reason
+
+    def _fill(self, order, price):
+        account_i = self._account_index[order.account]
+        signed = order.quantity if order.side == BUY else -order.quantity
+        if order.side == BUY and order.quantity * price > self.cash[account_i]:
+            self._reject(order, "Insufficient balance")
+            return
+        # Checked again at fill time: a resting sell can outlive the position
+        if order.side == SELL and order.quantity > self._held(order):
+            self._reject(order, "Insufficient position")
+            return
+
+        row = self._row(account_i, self._symbol_index[order.symbol])
+        position, avg = int(self.pos_quantity[row]), float(self.pos_avg_price[row])
+
+        if position == 0 or (position > 0) == (signed > 0):
+            # Opening or adding: volume-weighted entry price
+            new_position = position + signed
+            avg = (avg * abs(position) + price * abs(signed)) / abs(new_position)
+        else:
+            # Reducing, closing or flipping: realize P&L on the closed quantity
+            closed = min(abs(position), abs(signed))
+            pnl = (price - avg) * closed * (1 if position > 0 else -1)
+            self.realized[account_i] += pnl
+            self.trades[account_i] += 1
+            self.wins[account_i] += pnl > 0
+            new_position = position + signed
+            if new_position == 0:
+                avg = 0.0
+            elif (new_position > 0) != (position > 0):
+                avg = price
+
+        self.pos_quantity[row] = new_position
+        self.pos_avg_price[row] = avg
+        self.cash[account_i] -= signed * price
+        self._dirty = True
+
+        order.status = FILLED
+        order.fill_price = price
+        order.filled = time.time()
+
+    # ============ MARK TO MARKET ============
+
+    def revalue(self):
+        """Mark every position to its last price and aggregate per account in one pass"""
+        with self._lock:
+            return self._revalue()
+
+    def _revalue(self):
+        if not self._dirty:
+            return False
+        n = self.rows
+        quantity = self.pos_quantity[:n]
+        prices = self.prices[self.pos_symbol[:n]]
+        # Unpriced positions are carried at their entry price
+        prices = np.where(np.isnan(prices), self.pos_avg_price[:n], prices)
+        accounts = self.pos_account[:n]
+        size = len(self.account_ids)
+        self.market_value = np.bincount(accounts, weights=quantity * prices, minlength=size)
+        self.unrealized = np.bincount(accounts, weights=quantity * (prices - self.pos_avg_price[:n]), minlength=size)
+        self.revaluations += 1
+        self._dirty = False
+        return True
+
+    def account(self, account):
+        """Balance, P&L and open positions of one account, or None if unknown"""
+        with self._lock:
+            i = self._account_index.get(account)
+            if i is None:
+                return None
+            self._revalue()
+            positions = []
+            for row in self._account_rows[i]:
+                if not self.pos_quantity[row]:
+                    continue
+                symbol_i = int(self.pos_symbol[row])
+                quantity, avg = int(self.pos_quantity[row]), float(self.pos_avg_price[row])
+                price = self.prices[symbol_i]
+                price = avg if np.isnan(price) else float(price)
+                positions.append({
+                    'symbol': self.symbols[symbol_i],
+                    'quantity': quantity,
+                    'avg_price': round(avg, 2),
+                    'ltp': price,
+                    'pnl': round(quantity * (price - avg), 2)
+                })
+            return self._summary(i, positions)
+
+    def _summary(self, i, positions=None):
+        trades = int(self.trades[i])
+        summary = {
+            'account': self.account_ids[i],
+            'balance': round(float(self.cash[i]), 2),
+            'equity': round(float(self.cash[i] + self.market_value[i]), 2),
+            'realized_pnl': round(float(self.realized[i]), 2),
+            'unrealized_pnl': round(float(self.unrealized[i]), 2),
+            'total_pnl': round(float(self.realized[i] + self.unrealized[i]), 2),
+            'closed_trades': trades,
+            'win_rate': round(float(self.wins[i]) / trades * 100, 1) if trades else 0
+        }
+        if positions is not None:
+            summary['positions'] = positions
+        return summary
+
+    def leaderboard(self, n=20):
+        """Top n accounts by total P&L"""
+        with self._lock:
+            self._revalue()
+            size = len(self.account_ids)
+            if not size:
+                return []
+            total = self.realized[:size] + self.unrealized
+            top = np.argpartition(-total, min(n, size) - 1)[:n] if n < size else np.arange(size)
+            top = top[np.argsort(-total[top])]
+            return [self._summary(int(i)) for i in top]
+
+    def account_orders(self, account):
+        with self._lock:
+            return [order.to_dict() for order in self._account_orders.get(account, [])]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'accounts': len(self.account_ids),
+                'symbols': len(self.symbols),
+                'positions': int(np.count_nonzero(self.pos_quantity[:self.rows])),
+                'resting_orders': sum(len(side[1]) for book in self._resting.values() for side in book.values()),
+                'revaluations': self.revaluations
+            }
+
+# ============ BENCHMARK ============
+
+def benchmark(accounts=10_000, symbols=200, positions_per_account=5, ticks=2_000):
+    rng = np.random.default_rng(11)
+    engine = PaperTradingEngine()
+    names = [f"NIFTY{i:03d}CE" for i in range(symbols)]
+    for name in names:
+        engine.watch(name, float(rng.uniform(50, 500)))
+
+    orders = 0
+    start = time.perf_counter()
+    for a in range(accounts):
+        account = f"acct{a}"
+        engine.open_account(account)
+        for s in rng.choice(symbols, positions_per_account, replace=False):
+            lots = int(rng.integers(2, 5))
+            engine.place_order(account, names[s], BUY, lots * 25)
+            orders += 1
+            if rng.random() < 0.3:
+                # Partial exit, so closing fills and realized P&L are exercised
+                engine.place_order(account, names[s], SELL, int(rng.integers(1, lots)) * 25)
+                orders += 1
+    place_s = time.perf_counter() - start
+
+    moves = rng.integers(0, symbols, ticks)
+    prices = rng.uniform(50, 500, ticks)
+    start = time.perf_counter()
+    for s, p in zip(moves, prices):
+        engine.on_price(names[s], p)
+        engine.revalue()
+    tick_s = (time.perf_counter() - start) / ticks
+
+    print(f"Paper trading benchmark: {accounts} accounts, {engine.rows} positions, {symbols} symbols")
+    print(f"  order placement : {orders / place_s:12,.0f} orders/s")
+    print(f"  tick + full MTM : {tick_s * 1e6:10.1f} us ({1 / tick_s:,.0f} revaluations/s on one core)")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,278 @@
+"""
+Market-Hours-Aware Poll Scheduler
+Decides when each instrument is polled next instead of a fixed sleep. The
+interval depends on the NSE/BSE session phase (pre-open, open, post-close,
+closed or holiday), on how many clients watch the instrument and on how
+recently its price changed. Failed polls back off exponentially with jitter
+instead of stopping the feed.
+
+Run this module directly to simulate a trading day against fixed 2 s polling:
+    python3 poll_scheduler.py
+"""
+
+import heapq
+import math
+import random
+import threading
+import time
+from datetime import date, datetime, time as dtime, timedelta
+from zoneinfo import ZoneInfo
+
+# ============ SESSION CALENDAR ============
+
+IST = ZoneInfo('Asia/Kolkata')
+
+PRE_OPEN = dtime(9, 0)
+MARKET_OPEN = dtime(9, 15)
+MARKET_CLOSE = dtime(15, 30)
+POST_CLOSE_END = dtime(16, 0)
+
+# NSE/BSE equity and derivative trading holidays (weekdays only); update from
+# the exchange circular every December
+MARKET_HOLIDAYS = frozenset(date.fromisoformat(d) for d in (
+    '2025-02-26', '2025-03-14', '2025-03-31', '2025-04-10', '2025-04-14', '2025-04-18',
+    '2025-05-01', '2025-08-15', '2025-08-27', '2025-10-02', '2025-10-21', '2025-10-22',
+    '2025-11-05', '2025-12-25',
+    '2026-01-26', '2026-03-03', '2026-03-26', '2026-03-31', '2026-04-03', '2026-04-14',
+    '2026-05-01', '2026-05-28', '2026-06-26', '2026-09-14', '2026-10-02', '2026-10-20',
+    '2026-11-10', '2026-11-24', '2026-12-25'
+))
+
+PRE_OPEN_PHASE = 'pre_open'
+OPEN_PHASE = 'open'
+POST_CLOSE_PHASE = 'post_close'
+CLOSED_PHASE = 'closed'
+
+class MarketCalendar:
+    """Session phase of the Indian cash and F&O markets at a point in time"""
+
+    def __init__(self, holidays=MARKET_HOLIDAYS, tz=IST):
+        self.holidays = holidays
+        self.tz = tz
+
+    def is_trading_day(self, day):
+        return day.weekday() < 5 and day not in self.holidays
+
+    def phase(self, now=None):
+        """Phase at epoch seconds ``now`` (default: current time)"""
+        moment = datetime.fromtimestamp(time.time() if now is None else now, self.tz)
+        if not self.is_trading_day(moment.date()):
+            return CLOSED_PHASE
+        clock = moment.time()
+        if PRE_OPEN <= clock < MARKET_OPEN:
+            return PRE_OPEN_PHASE
+        if MARKET_OPEN <= clock < MARKET_CLOSE:
+            return OPEN_PHASE
+        if MARKET_CLOSE <= clock < POST_CLOSE_END:
+            return POST_CLOSE_PHASE
+        return CLOSED_PHASE
+
+    def next_pre_open(self, now=None):
+        """Epoch seconds of the next pre-open session start"""
+        moment = datetime.fromtimestamp(time.time() if now is None else now, self.tz)
+        day = moment.date()
+        if moment.time() >= PRE_OPEN:
+            day += timedelta(days=1)
+        while not self.is_trading_day(day):
+            day += timedelta(days=1)
+        return datetime.combine(day, PRE_OPEN, self.tz).timestamp()
+
+# ============ SCHEDULER ============
+
+# Poll intervals (seconds)
+WATCHED_INTERVAL = 1.0      # open market, one subscriber; more subscribers poll faster
+MIN_INTERVAL = 0.25
+WATCHED_MAX_INTERVAL = 2.0  # a watched instrument is never polled slower than this while open
+UNWATCHED_INTERVAL = 5.0
+UNWATCHED_MAX_INTERVAL = 15.0
+QUIET_GROWTH = 1.5          # interval multiplier per consecutive unchanged poll
+PHASE_INTERVALS = {
+    PRE_OPEN_PHASE: 5.0,
+    POST_CLOSE_PHASE: 30.0,
+    CLOSED_PHASE: 600.0
+}
+
+DEMAND_WINDOW = 30          # seconds a REST read keeps counting as demand
+COALESCE = 0.5              # fraction of its interval an instrument may be polled early to share a batch
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+class PollScheduler:
+    """Per-instrument next-due times for a polling feed loop
+
+    ``demand(symbol)`` returns the number of push subscribers of a symbol;
+    ``touch`` records REST reads, which count as one subscriber for
+    DEMAND_WINDOW seconds. The feed loop calls ``due``, polls those symbols,
+    reports each with ``record`` (or ``failure``), then ``wait``s.
+    """
+
+    def __init__(self, symbols, demand=None, calendar=None, rng=None):
+        self.calendar = calendar or MarketCalendar()
+        self.demand = demand or (lambda symbol: 0)
+        self.rng = rng or random.Random()
+        self.failures = 0
+        self.polls = 0
+        self._quiet = {symbol: 0 for symbol in symbols}
+        self._due = {symbol: 0.0 for symbol in symbols}
+        self._version = {symbol: 0 for symbol in symbols}
+        self._heap = [(0.0, 0, symbol) for symbol in symbols]
+        self._touched = {}
+        self._touched_all = 0.0
+        self._backoff_until = 0.0
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+
+    def touch(self, symbol=None, now=None):
+        """Record a client read of one symbol (or of all of them)"""
+        now = time.time() if now is None else now
+        if symbol is None:
+            first = now - self._touched_all > DEMAND_WINDOW
+            self._touched_all = now
+        else:
+            first = now - self._touched.get(symbol, 0.0) > DEMAND_WINDOW
+            self._touched[symbol] = now
+        if first:
+            self.wake()
+
+    def wake(self):
+        """Re-plan now (for example when a client subscribes)"""
+        with self._lock:
+            for symbol in self._due:
+                self._schedule(symbol, 0.0)
+        self._wake.set()
+
+    def _schedule(self, symbol, at):
+        # Older heap entries of the symbol become stale and are skipped
+        self._due[symbol] = at
+        self._version[symbol] += 1
+        heapq.heappush(self._heap, (at, self._version[symbol], symbol))
+
+    def _drop_stale(self):
+        while self._heap and self._heap[0][1] != self._version[self._heap[0][2]]:
+            heapq.heappop(self._heap)
+
+    def watchers(self, symbol, now):
+        recent = now - max(self._touched.get(symbol, 0.0), self._touched_all) <= DEMAND_WINDOW
+        return self.demand(symbol) + (1 if recent else 0)
+
+    def interval(self, symbol, now):
+        phase = self.calendar.phase(now)
+        if phase != OPEN_PHASE:
+            return PHASE_INTERVALS[phase]
+        watchers = self.watchers(symbol, now)
+        quiet = QUIET_GROWTH ** min(self._quiet.get(symbol, 0), 10)
+        if watchers:
+            return min(max(MIN_INTERVAL, WATCHED_INTERVAL / math.sqrt(watchers)) * quiet, WATCHED_MAX_INTERVAL)
+        return min(UNWATCHED_INTERVAL * quiet, UNWATCHED_MAX_INTERVAL)
+
+    def due(self, now=None):
+        """Symbols to poll now, including those close enough to share the batch"""
+        now = time.time() if now is None else now
+        if now < self._backoff_until:
+            return []
+        with self._lock:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                return []
+            batch = []
+            while self._heap:
+                at, _, symbol = self._heap[0]
+                if at > now and at - now > COALESCE * self.interval(symbol, now):
+                    break
+                heapq.heappop(self._heap)
+                batch.append(symbol)
+                self._drop_stale()
+            # Provisional next poll in case the caller never reports this one
+            for symbol in batch:
+                self._schedule(symbol, now + self.interval(symbol, now))
+            return batch
+
+    def record(self, symbol, changed, now=None):
+        """Report a successful poll of symbol and schedule its next one"""
+        now = time.time() if now is None else now
+        self.polls += 1
+        self.failures = 0
+        with self._lock:
+            self._quiet[symbol] = 0 if changed else self._quiet[symbol] + 1
+            at = now + self.interval(symbol, now)
+            phase = self.calendar.phase(now)
+            if phase == CLOSED_PHASE:
+                at = min(at, max(self.calendar.next_pre_open(now), now + MIN_INTERVAL))
+            self._schedule(symbol, at)
+
+    def failure(self, symbols, now=None):
+        """Report a failed poll; returns the jittered backoff delay in seconds"""
+        now = time.time() if now is None else now
+        self.failures += 1
+        delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (self.failures - 1))
+        delay *= self.rng.uniform(0.5, 1.0)
+        self._backoff_until = now + delay
+        with self._lock:
+            for symbol in symbols:
+                self._schedule(symbol, self._backoff_until)
+        return delay
+
+    def next_wake(self, now=None):
+        """Seconds until the next symbol is due"""
+        now = time.time() if now is None else now
+        with self._lock:
+            self._drop_stale()
+            at = self._heap[0][0] if self._heap else now + PHASE_INTERVALS[CLOSED_PHASE]
+        return max(0.0, max(at, self._backoff_until) - now)
+
+    def wait(self, limit=None):
+        """Sleep until the next symbol is due or ``wake`` is called"""
+        timeout = self.next_wake()
+        if limit is not None:
+            timeout = min(timeout, limit)
+        self._wake.wait(timeout)
+        self._wake.clear()
+
+    def stats(self, now=None):
+        now = time.time() if now is None else now
+        return {
+            'phase': self.calendar.phase(now),
+            'polls': self.polls,
+            'failures': self.failures,
+            'backoff_s': round(max(0.0, self._backoff_until - now), 2),
+            'intervals': {symbol: round(self.interval(symbol, now), 2) for symbol in self._due}
+        }
+
+# ============ SIMULATION ============
+
+def simulate(day='2026-10-16', symbols=('NIFTY 50', 'SENSEX', 'BANK NIFTY'), watched=('NIFTY 50',)):
+    """Replay one calendar day on a simulated clock: batch calls and watched-symbol staleness"""
+    rng = random.Random(7)
+    start = datetime.combine(date.fromisoformat(day), dtime(0, 0), IST).timestamp()
+    end = start + 86400
+
+    def changes(now):
+        # Prices move on most polls while open, never while closed
+        return MarketCalendar().phase(now) == OPEN_PHASE and rng.random() < 0.7
+
+    # Fixed polling: every symbol every 2 s, one batch call per cycle
+    fixed_calls = int((end - start) / 2)
+    fixed_staleness = 1.0  # mean age of a watched quote under a 2 s period
+
+    scheduler = PollScheduler(symbols, demand=lambda s: 3 if s in watched else 0, rng=rng)
+    now, calls = start, 0
+    last_poll, staleness = {}, []
+    while now < end:
+        batch = scheduler.due(now)
+        if batch:
+            calls += 1
+            for symbol in batch:
+                if symbol in watched and scheduler.calendar.phase(now) == OPEN_PHASE and symbol in last_poll:
+                    staleness.append((now - last_poll[symbol]) / 2)
+                last_poll[symbol] = now
+                scheduler.record(symbol, changes(now), now)
+        now += max(scheduler.next_wake(now), 0.01)
+
+    print(f"Poll scheduler simulation for {day} ({len(symbols)} symbols, {len(watched)} watched)")
+    print(f"  fixed 2 s polling : {fixed_calls:7,d} batch calls, watched quote age {fixed_staleness:.2f} s")
+    print(f"  scheduler         : {calls:7,d} batch calls, watched quote age "
+          f"{sum(staleness) / max(len(staleness), 1):.2f} s while open")
+
+if __name__ == '__main__':
+    simulate()
+    simulate(watched=())
@@ -0,0 +1,171 @@
+"""
+Batch Market Prediction Engine
+NumPy port of PredictionEngine in prediction-engine.js that scores a whole
+watchlist at once from a 2-D price matrix (one row per symbol). Thresholds,
+weights and rounding follow the JS engine exactly so both give the same
+scores for the same prices.
+
+Run this module directly for a throughput benchmark:
+    python3 prediction_engine.py
+"""
+
+import time
+
+import numpy as np
+
+PCR_BULLISH_THRESHOLD = 0.7
+PCR_BEARISH_THRESHOLD = 1.3
+MIN_POINTS = 10
+
+WEIGHTS = {
+    'trend': 0.25,
+    'momentum': 0.20,
+    'pcr': 0.30,
+    'rsi': 0.15,
+    'volatility': 0.10
+}
+
+def _js_round(x, digits=0):
+    """Math.round semantics (halves round towards +infinity)"""
+    scale = 10.0 ** digits
+    return np.floor(np.asarray(x) * scale + 0.5) / scale
+
+def _sma(prices, period):
+    period = min(period, prices.shape[1])
+    return prices[:, -period:].mean(axis=1)
+
+def _step_score(values, thresholds, scores, default):
+    """First score whose threshold is exceeded, evaluated top-down like the JS if-chains"""
+    result = np.full(values.shape, float(default))
+    for threshold, score in reversed(list(zip(thresholds, scores))):
+        result = np.where(values > threshold, score, result)
+    return result
+
+def analyze_trend(prices):
+    sma5, sma10, sma20 = _sma(prices, 5), _sma(prices, 10), _sma(prices, 20)
+    current = prices[:, -1]
+    return (np.where(sma5 > sma10, 30, -30)
+            + np.where(sma10 > sma20, 40, -40)
+            + np.where(current > sma20, 30, -30)).astype(np.float64)
+
+def calculate_momentum(prices):
+    period = min(5, prices.shape[1] - 1)
+    current, past = prices[:, -1], prices[:, -1 - period]
+    roc = (current - past) / past * 100
+    return _step_score(roc, (2, 1, 0.5, 0, -0.5, -1, -2), (100, 70, 40, 20, -20, -40, -70), -100)
+
+def calculate_volatility(prices):
+    returns = np.diff(prices, axis=1) / prices[:, :-1]
+    std = returns.std(axis=1)
+    return _step_score(std, (0.02, 0.01), (-30, -10), 10)
+
+def analyze_pcr(pcr):
+    pcr = np.asarray(pcr, dtype=np.float64)
+    return np.where(
+        pcr < PCR_BULLISH_THRESHOLD, 60 + (PCR_BULLISH_THRESHOLD - pcr) * 50,
+        np.where(pcr > PCR_BEARISH_THRESHOLD, -60 - (pcr - PCR_BEARISH_THRESHOLD) * 30, (1.0 - pcr) * 30)
+    )
+
+def calculate_rsi(prices, period=14):
+    """Simple-average RSI over the last period changes, as in the JS engine"""
+    if prices.shape[1] < period + 1:
+        period = prices.shape[1] - 1
+    changes = np.diff(prices, axis=1)[:, -period:]
+    avg_gain = np.where(changes > 0, changes, 0.0).sum(axis=1) / period
+    avg_loss = np.where(changes < 0, -changes, 0.0).sum(axis=1) / period
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+def normalize_rsi(rsi):
+    return _step_score(rsi, (70, 60, 50, 40, 30), (80, 50, 30, -30, -50), -80)
+
+def _signal_label(score):
+    return np.select([score > 60, score > 30, score > -30, score > -60],
+                     ['Strong Bullish', 'Bullish', 'Neutral', 'Bearish'], 'Strong Bearish')
+
+def _pcr_signal(pcr):
+    return np.select([pcr < PCR_BULLISH_THRESHOLD, pcr > PCR_BEARISH_THRESHOLD], ['Bullish', 'Bearish'], 'Neutral')
+
+def _rsi_signal(rsi):
+    return np.select([rsi > 70, rsi < 30, rsi > 50], ['Overbought', 'Oversold', 'Bullish'], 'Bearish')
+
+def predict_batch(prices, pcr):
+    """Score every row of prices (symbols x points, oldest first) in one pass
+
+    ``pcr`` is a scalar or one value per row. Returns a dict of per-row arrays.
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=np.float64))
+    if prices.shape[1] < MIN_POINTS:
+        raise ValueError(f"Need at least {MIN_POINTS} data points")
+    pcr = np.broadcast_to(np.asarray(pcr, dtype=np.float64), prices.shape[:1])
+
+    trend = analyze_trend(prices)
+    momentum = calculate_momentum(prices)
+    volatility = calculate_volatility(prices)
+    pcr_score = analyze_pcr(pcr)
+    rsi = calculate_rsi(prices, 14)
+
+    total = (trend * WEIGHTS['trend'] + momentum * WEIGHTS['momentum'] + pcr_score * WEIGHTS['pcr']
+             + normalize_rsi(rsi) * WEIGHTS['rsi'] + volatility * WEIGHTS['volatility'])
+
+    recent = prices[:, -20:]
+    return {
+        'prediction': np.select([total > 20, total < -20], ['BULLISH', 'BEARISH'], 'NEUTRAL'),
+        'confidence': np.minimum(_js_round(np.abs(total)), 100),
+        'score': _js_round(total, 1),
+        'trend': trend,
+        'momentum': momentum,
+        'volatility': volatility,
+        'pcr_score': pcr_score,
+        'rsi': rsi,
+        'support': _js_round(recent.min(axis=1), 2),
+        'resistance': _js_round(recent.max(axis=1), 2),
+        'pcr': pcr
+    }
+
+def prediction_record(result, i):
+    """Row i of a predict_batch result in the JS engine's output shape"""
+    return {
+        'prediction': str(result['prediction'][i]),
+        'confidence': int(result['confidence'][i]),
+        'score': float(result['score'][i]),
+        'signals': {
+            'trend': str(_signal_label(result['trend'][i])),
+            'momentum': str(_signal_label(result['momentum'][i])),
+            'pcr': str(_pcr_signal(result['pcr'][i])),
+            'rsi': str(_rsi_signal(result['rsi'][i])),
+            'volatility': 'High' if result['volatility'][i] > 0 else 'Low'
+        },
+        'indicators': {
+            'rsi': float(_js_round(result['rsi'][i], 1)),
+            'pcr': float(result['pcr'][i]),
+            'support': float(result['support'][i]),
+            'resistance': float(result['resistance'][i])
+        }
+    }
+
+# ============ BENCHMARK ============
+
+def benchmark(sizes=(1, 10, 100, 1000), points=50, repeats=50):
+    rng = np.random.default_rng(3)
+    print(f"Prediction engine benchmark ({points} points per symbol)")
+    for symbols in sizes:
+        prices = 100 * np.cumprod(1 + rng.normal(0, 0.005, (symbols, points)), axis=1)
+        pcr = rng.uniform(0.5, 1.5, symbols)
+
+        start = time.perf_counter()
+        for _ in range(repeats):
+            predict_batch(prices, pcr)
+        batch_s = (time.perf_counter() - start) / repeats
+
+        start = time.perf_counter()
+        for i in range(symbols):
+            predict_batch(prices[i:i + 1], pcr[i])
+        single_s = time.perf_counter() - start
+
+        print(f"  {symbols:5d} symbols: batch {batch_s * 1e3:8.3f} ms "
+              f"({symbols / batch_s:12,.0f} symbols/s), one-by-one {single_s * 1e3:8.3f} ms")
+
+if __name__ == '__main__':
+    benchmark()
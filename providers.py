@@ -0,0 +1,266 @@
+"""
+Market Data Provider Layer
+Runs the Angel One and TrueData feeds side by side and merges them into one
+symbol space and quote schema. For every instrument the tick with the newest
+exchange timestamp wins, whichever provider it came from; if the provider
+currently serving a symbol stalls, the next tick from any other provider takes
+over. Per-provider latency (receive time minus exchange time) and staleness
+are tracked so the faster source is visible.
+
+Merged quote schema (TrueData / app.js style):
+    {'ltp', 'change', 'changePct', 'volume', 'open', 'high', 'low',
+     'source', 'exchangeTime', 'timestamp'}
+
+Run this module directly for a merge throughput benchmark:
+    python3 providers.py
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from poll_scheduler import IST, MarketCalendar, OPEN_PHASE, PHASE_INTERVALS
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+
+STALL_AFTER = 10           # seconds without a tick before a provider counts as stalled
+LATENCY_SAMPLES = 1024     # recent latency samples kept per provider
+TRUEDATA_POLL_INTERVAL = 2
+
+# Every provider-specific name maps onto one canonical symbol
+SYMBOL_ALIASES = {
+    'NIFTY 50': 'NIFTY',
+    'NIFTY': 'NIFTY',
+    'BANK NIFTY': 'BANKNIFTY',
+    'NIFTY BANK': 'BANKNIFTY',
+    'BANKNIFTY': 'BANKNIFTY',
+    'SENSEX': 'SENSEX',
+    'BSE SENSEX': 'SENSEX'
+}
+
+# Exchange timestamp formats seen in REST quote payloads
+EXCHANGE_TIME_FORMATS = ('%d-%b-%Y %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M:%S')
+
+def canonical_symbol(name):
+    return SYMBOL_ALIASES.get(name, name)
+
+def parse_exchange_time(value):
+    """Epoch ms from an exchange timestamp (epoch ms/s number or a date string), or None
+
+    Date strings carry no zone; they are exchange (IST) times whatever the
+    host's time zone.
+    """
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value * 1000) if value < 1e11 else int(value)
+    for fmt in EXCHANGE_TIME_FORMATS:
+        try:
+            return int(datetime.strptime(str(value)[:19], fmt).replace(tzinfo=IST).timestamp() * 1000)
+        except ValueError:
+            continue
+    return None
+
+# ============ PROVIDER STATS ============
+
+class ProviderStats:
+    """Tick counters, a latency sample ring and the last-seen times of one provider"""
+
+    def __init__(self, name):
+        self.name = name
+        self.ticks = 0
+        self.published = 0     # ticks that were the freshest for their symbol
+        self.superseded = 0    # ticks no newer than what was already published
+        self.failovers = 0     # symbols taken over from a stalled provider
+        self.last_received = None
+        self.last_exchange_ms = None
+        self._latency = np.zeros(LATENCY_SAMPLES, dtype=np.float64)
+        self._samples = 0
+
+    def record(self, received, exchange_ms):
+        self.ticks += 1
+        self.last_received = received
+        if exchange_ms is not None:
+            self.last_exchange_ms = exchange_ms
+            self._latency[self._samples % LATENCY_SAMPLES] = received * 1000 - exchange_ms
+            self._samples += 1
+
+    def stalled(self, now, stall_after=STALL_AFTER):
+        return self.last_received is None or now - self.last_received > stall_after
+
+    def snapshot(self, now, stall_after=STALL_AFTER):
+        samples = self._latency[:min(self._samples, LATENCY_SAMPLES)]
+        p50, p99 = np.percentile(samples, (50, 99)) if len(samples) else (None, None)
+        return {
+            'ticks': self.ticks,
+            'published': self.published,
+            'superseded': self.superseded,
+            'failovers': self.failovers,
+            'win_rate': round(self.published / self.ticks, 3) if self.ticks else None,
+            'latency_ms': {
+                'p50': round(float(p50), 1) if p50 is not None else None,
+                'p99': round(float(p99), 1) if p99 is not None else None,
+                'samples': len(samples)
+            },
+            'staleness_s': round(now - self.last_received, 2) if self.last_received else None,
+            'stalled': self.stalled(now, stall_after)
+        }
+
+# ============ MERGER ============
+
+class FeedMerger:
+    """Freshest-tick merge of several providers into one canonical quote map
+
+    Providers call ``on_quote`` from their own threads. ``on_publish(symbol,
+    quote)`` runs for every tick that becomes the current quote of its symbol.
+    """
+
+    def __init__(self, providers, on_publish=None, stall_after=STALL_AFTER):
+        self.providers = {name: ProviderStats(name) for name in providers}
+        self.on_publish = on_publish
+        self.stall_after = stall_after
+        self.quotes = {}
+        self._current = {}   # symbol -> (exchange ms, provider)
+        self._lock = threading.Lock()
+
+    def on_quote(self, provider, symbol, quote, exchange_ms=None):
+        """Offer one provider quote (either schema); returns True when it was published"""
+        received = time.time()
+        symbol = canonical_symbol(symbol)
+        ltp = quote.get('ltp', quote.get('price'))
+        if not ltp or ltp <= 0:
+            return False
+        # Providers without exchange timestamps are ordered by arrival
+        ts = exchange_ms if exchange_ms is not None else int(received * 1000)
+
+        with self._lock:
+            stats = self.providers[provider]
+            stats.record(received, exchange_ms)
+            current = self._current.get(symbol)
+            if current is not None and ts <= current[0]:
+                owner = self.providers[current[1]]
+                if owner is stats or not owner.stalled(received, self.stall_after):
+                    stats.superseded += 1
+                    return False
+                stats.failovers += 1
+                logger.warning(f"{current[1]} stalled, {provider} takes over {symbol}")
+
+            merged = {
+                'ltp': ltp,
+                'change': quote.get('change', 0),
+                'changePct': quote.get('changePct', 0),
+                'volume': quote.get('volume', 0),
+                'open': quote.get('open', 0),
+                'high': quote.get('high', 0),
+                'low': quote.get('low', 0),
+                'source': provider,
+                'exchangeTime': datetime.fromtimestamp(ts / 1000).isoformat(),
+                'timestamp': datetime.fromtimestamp(received).isoformat()
+            }
+            self._current[symbol] = (ts, provider)
+            self.quotes[symbol] = merged
+            stats.published += 1
+
+        if self.on_publish:
+            self.on_publish(symbol, merged)
+        return True
+
+    def clear(self):
+        """Drop the merged quotes, e.g. after a replay, so the next tick of each symbol is published"""
+        with self._lock:
+            self.quotes.clear()
+            self._current.clear()
+
+    def sources(self):
+        """{symbol: provider currently serving it}"""
+        with self._lock:
+            return {symbol: provider for symbol, (_, provider) in self._current.items()}
+
+    def live(self):
+        now = time.time()
+        return [name for name, stats in self.providers.items() if not stats.stalled(now, self.stall_after)]
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            return {name: stats.snapshot(now, self.stall_after) for name, stats in self.providers.items()}
+
+# ============ PROVIDERS ============
+
+class TrueDataPoller:
+    """Polls TrueData REST quotes and feeds them into a merger
+
+    ``fetch()`` returns ``{symbol: raw TrueData quote or None}`` for every
+    symbol in one concurrent round trip.
+    """
+
+    name = 'truedata'
+
+    def __init__(self, merger, fetch, interval=TRUEDATA_POLL_INTERVAL):
+        self.merger = merger
+        self.fetch = fetch
+        self.interval = interval
+        self.calendar = MarketCalendar()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def poll_once(self):
+        for symbol, data in self.fetch().items():
+            if not data:
+                continue
+            exchange_ms = parse_exchange_time(
+                data.get('exchange_time') or data.get('last_trade_time') or data.get('timestamp'))
+            self.merger.on_quote(self.name, symbol, {
+                'ltp': data.get('ltp', 0),
+                'change': data.get('change', 0),
+                'changePct': data.get('change_percent', 0),
+                'volume': data.get('volume', 0),
+                'open': data.get('open', 0),
+                'high': data.get('high', 0),
+                'low': data.get('low', 0)
+            }, exchange_ms)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except Exception as e:
+                logger.error(f"TrueData provider poll failed: {e}")
+            phase = self.calendar.phase()
+            self._stop.wait(self.interval if phase == OPEN_PHASE else PHASE_INTERVALS[phase])
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="truedata-provider", daemon=True)
+        self._thread.start()
+        logger.info("✓ TrueData provider started")
+
+    def stop(self):
+        self._stop.set()
+
+# ============ BENCHMARK ============
+
+def benchmark(ticks=200_000):
+    merger = FeedMerger(['angel', 'truedata'])
+    quote = {'price': 23500.0, 'change': 10.0, 'changePct': 0.04, 'volume': 1000}
+    names = [('angel', 'NIFTY 50'), ('truedata', 'NIFTY'), ('angel', 'SENSEX'), ('truedata', 'BSE SENSEX')]
+    base = int(time.time() * 1000)
+
+    start = time.perf_counter()
+    for i in range(ticks):
+        provider, name = names[i % len(names)]
+        # TrueData lags Angel by one exchange millisecond on every other tick
+        merger.on_quote(provider, name, quote, base + i // 2 - (provider == 'truedata'))
+    elapsed = time.perf_counter() - start
+
+    print(f"Feed merge benchmark ({ticks:,} ticks, 2 providers)")
+    print(f"  on_quote     : {elapsed / ticks * 1e6:8.2f} us/tick")
+    for name, stats in merger.stats().items():
+        print(f"  {name:9s}    : {stats['published']:,} published, {stats['superseded']:,} superseded")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,76 @@
+"""
+Hedged Quote Fetcher
+Fetches single-symbol quotes from an ordered list of sources over a shared
+keep-alive HTTP pool. The primary source gets a latency budget; if it has not
+answered by then the fallback is started as well and whichever succeeds first
+wins.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# ============ CONFIGURATION ============
+
+HEDGE_DELAY = 0.3       # seconds to wait on the primary before starting the fallback
+HTTP_TIMEOUT = 5        # seconds for fallback HTTP sources
+POOL_SIZE = 32          # keep-alive connections per host
+
+YAHOO_QUOTE_URL = "https://query1.finance.yahoo.com/v10/finance/quoteSummary/{symbol}?modules=price"
+
+# Shared keep-alive session and worker pool for all quote lookups
+http_session = requests.Session()
+http_session.mount("https://", HTTPAdapter(pool_connections=8, pool_maxsize=POOL_SIZE))
+http_session.headers.update({'User-Agent': 'Mozilla/5.0 (TheOptionTrader)'})
+
+executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="quote-fetch")
+
+# Separate pool for fanning out batch lookups, so batch tasks waiting on
+# hedged fetches can never starve the pool those fetches run in
+batch_executor = ThreadPoolExecutor(max_workers=POOL_SIZE, thread_name_prefix="quote-batch")
+
+# ============ SOURCES ============
+
+def fetch_yahoo_quote(symbol):
+    """Quote from Yahoo Finance over the pooled session, or None if not found"""
+    response = http_session.get(YAHOO_QUOTE_URL.format(symbol=symbol), timeout=HTTP_TIMEOUT)
+    if response.status_code == 200:
+        return response.json()
+    return None
+
+def _succeeded(future):
+    return future.exception() is None and future.result() is not None
+
+def hedged_fetch(symbol, sources, hedge_delay=HEDGE_DELAY):
+    """Run sources for symbol with hedging and return (source_name, data)
+
+    ``sources`` is an ordered list of ``(name, fetch)`` pairs where
+    ``fetch(symbol)`` returns data or None. Each further source starts when the
+    previous ones have failed or ``hedge_delay`` passes without an answer.
+    Returns (None, None) when every source fails.
+    """
+    pending = {}
+    remaining = list(sources)
+
+    while remaining or pending:
+        if remaining:
+            name, fetch = remaining.pop(0)
+            pending[executor.submit(fetch, symbol)] = name
+            timeout = hedge_delay if remaining else None
+        else:
+            timeout = None
+
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = pending.pop(future)
+            if _succeeded(future):
+                # Losers keep running in the pool; their results are discarded
+                return name, future.result()
+            if future.exception() is not None:
+                logger.warning(f"{name} quote failed for {symbol}: {future.exception()}")
+
+    return None, None
@@ -0,0 +1,121 @@
+"""
+Quote Push Hub
+Fans out quote updates to Server-Sent Events subscribers. Each update is
+serialized once and handed to every interested client; slow clients only ever
+hold the latest frame per symbol, so their backlog is bounded by the number of
+symbols they watch.
+"""
+
+import json
+import threading
+
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments on an idle stream
+KEEPALIVE_FRAME = b": keepalive\n\n"
+
+def encode_event(symbol, quote):
+    """Serialize one quote as an SSE ``quote`` event"""
+    payload = json.dumps({'symbol': symbol, 'data': quote}, separators=(',', ':'))
+    return f"event: quote\ndata: {payload}\n\n".encode('utf-8')
+
+class Subscription:
+    """Pending frames for one client, coalesced to the latest value per symbol"""
+
+    def __init__(self, symbols=None):
+        self.symbols = frozenset(symbols) if symbols else None
+        self.coalesced = 0
+        self._pending = {}
+        self._cond = threading.Condition()
+
+    def offer(self, symbol, frame):
+        with self._cond:
+            if symbol in self._pending:
+                self.coalesced += 1
+            self._pending[symbol] = frame
+            self._cond.notify()
+
+    def drain(self, timeout=KEEPALIVE_INTERVAL):
+        """Wait for updates and return the pending frames, or [] on timeout"""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            frames = list(self._pending.values())
+            self._pending.clear()
+        return frames
+
+class QuoteHub:
+    """Registry of push subscribers indexed by symbol"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._by_symbol = {}
+        self._wildcard = set()
+        self._latest = {}
+        self.published = 0
+        # Called with the subscription after each new subscriber (e.g. to re-plan polling)
+        self.on_subscribe = None
+
+    @property
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._wildcard) + len({sub for subs in self._by_symbol.values() for sub in subs})
+
+    def demand(self, symbol):
+        """Number of subscribers receiving updates of symbol"""
+        return len(self._wildcard) + len(self._by_symbol.get(symbol, ()))
+
+    def subscribe(self, symbols=None):
+        sub = Subscription(symbols)
+        with self._lock:
+            if sub.symbols is None:
+                self._wildcard.add(sub)
+            else:
+                for symbol in sub.symbols:
+                    self._by_symbol.setdefault(symbol, set()).add(sub)
+            # Prime the client with the current value of everything it watches
+            for symbol, frame in self._latest.items():
+                if sub.symbols is None or symbol in sub.symbols:
+                    sub.offer(symbol, frame)
+        if self.on_subscribe:
+            self.on_subscribe(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._wildcard.discard(sub)
+            for symbol in sub.symbols or ():
+                subs = self._by_symbol.get(symbol)
+                if subs:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._by_symbol[symbol]
+
+    def publish(self, symbol, quote):
+        """Serialize a quote once and offer it to every interested subscriber"""
+        frame = encode_event(symbol, quote)
+        with self._lock:
+            self._latest[symbol] = frame
+            targets = list(self._wildcard)
+            targets.extend(self._by_symbol.get(symbol, ()))
+            self.published += 1
+        for sub in targets:
+            sub.offer(symbol, frame)
+
+    def stream(self, symbols=None):
+        """Generator of SSE bytes for a Flask streaming response"""
+        sub = self.subscribe(symbols)
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                frames = sub.drain()
+                yield b"".join(frames) if frames else KEEPALIVE_FRAME
+        finally:
+            self.unsubscribe(sub)
+
+def parse_symbols(value):
+    """Parse a comma-separated ``symbols`` query argument"""
+    if not value:
+        return None
+    return [s.strip() for s in value.split(',') if s.strip()]
+
+# Shared hub for the running server process
+quote_hub = QuoteHub()
@@ -0,0 +1,265 @@
+"""
+Array-Backed Quote Store
+Latest quote of every instrument in one preallocated NumPy structured array,
+one row per instrument, located through a key -> row dict (index names for
+the indices, tokens for option contracts, as in the tick store). A tick is
+written in place into its row: no dict, rounded float or timestamp string is
+created per tick, and times are kept as int64 epoch nanoseconds. Change and
+percent change are derived from ltp and close only when a snapshot is taken,
+vectorized over all requested rows.
+
+Every update stamps its row with the next value of a store-wide sequence
+number, so readers can ask for only the rows changed since a sequence they
+already hold. Sequences start at the process start time in microseconds and
+therefore keep increasing across restarts.
+
+One feed thread writes; readers copy the rows they need. A row read while it
+is being written can mix old and new fields of that one instrument.
+
+Run this module directly to compare memory and tick cost with dict quotes:
+    python3 quote_store.py
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+DEFAULT_CAPACITY = 1024  # rows preallocated; the array doubles when full
+
+QUOTE_DTYPE = np.dtype([
+    ('ltp', '<f8'),
+    ('close', '<f8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('volume', '<i8'),
+    ('oi', '<i8'),
+    ('ts_ns', '<i8'),
+    ('seq', '<i8')
+])
+
+# Every field is 8 bytes, so a row is also addressable as flat float64 and
+# int64 memoryviews: element row * FIELDS + field
+FIELDS = len(QUOTE_DTYPE.names)
+LTP, CLOSE, OPEN, HIGH, LOW, VOLUME, OI, TS_NS, SEQ = range(FIELDS)
+assert QUOTE_DTYPE.itemsize == FIELDS * 8
+
+class QuoteStore:
+    """Latest quote per key in a structured array, updated in place"""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.records = np.zeros(capacity, dtype=QUOTE_DTYPE)
+        self.keys = []
+        self._slots = {}
+        self._lock = threading.Lock()
+        self.base = self.seq = time.time_ns() // 1000
+        self._bind()
+
+    def _bind(self):
+        # Item assignment through a memoryview costs a fraction of a NumPy
+        # scalar assignment and allocates nothing
+        raw = memoryview(self.records).cast('B')
+        self._f64 = raw.cast('d')
+        self._i64 = raw.cast('q')
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._slots
+
+    def slot(self, key):
+        """Row of key, assigning the next free row (and growing the array) if needed"""
+        slot = self._slots.get(key)
+        if slot is None:
+            with self._lock:
+                slot = self._slots.get(key)
+                if slot is None:
+                    slot = len(self.keys)
+                    if slot >= len(self.records):
+                        grown = np.zeros(len(self.records) * 2, dtype=QUOTE_DTYPE)
+                        grown[:slot] = self.records
+                        self.records = grown
+                        self._bind()
+                    self.keys.append(key)
+                    self._slots[key] = slot
+        return slot
+
+    def reserve(self, keys):
+        """Assign rows for a known universe up front (e.g. every F&O contract)"""
+        for key in keys:
+            self.slot(key)
+
+    # ============ WRITER ============
+
+    def update(self, key, ltp, volume=None, oi=None, ts_ns=None, open=None, high=None, low=None, close=None):
+        """Write one tick into key's row; fields left as None keep their last value"""
+        i = self._slots.get(key)
+        if i is None:
+            i = self.slot(key)
+        row = i * FIELDS
+        seq = self.seq + 1
+        f64, i64 = self._f64, self._i64
+        f64[row + LTP] = ltp
+        if volume is not None:
+            i64[row + VOLUME] = int(volume)
+        if oi is not None:
+            i64[row + OI] = int(oi)
+        if open is not None:
+            f64[row + OPEN] = open
+        if high is not None:
+            f64[row + HIGH] = high
+        if low is not None:
+            f64[row + LOW] = low
+        if close is not None:
+            f64[row + CLOSE] = close
+        i64[row + TS_NS] = ts_ns or time.time_ns()
+        # Published after the row is complete: every row with seq <= self.seq
+        # is fully written
+        i64[row + SEQ] = seq
+        self.seq = seq
+
+    # ============ READERS ============
+
+    def price(self, key):
+        """Last traded price of key, or None"""
+        i = self._slots.get(key)
+        if i is None:
+            return None
+        return self._f64[i * FIELDS + LTP] or None
+
+    def changed(self, since, keys=None):
+        """Keys (optionally among ``keys``) updated after sequence number ``since``"""
+        if keys is None:
+            count = len(self.keys)
+            return [self.keys[i] for i in np.flatnonzero(self.records['seq'][:count] > since).tolist()]
+        i64 = self._i64
+        return [key for key in keys if key in self._slots and i64[self._slots[key] * FIELDS + SEQ] > since]
+
+    def rows(self, keys=None):
+        """(keys, copied records) for the given keys (default all) that are in the store"""
+        if keys is None:
+            count = len(self.keys)
+            return self.keys[:count], self.records[:count].copy()
+        known = [key for key in keys if key in self._slots]
+        return known, self.records[[self._slots[key] for key in known]]
+
+    def columns(self, keys=None):
+        """Column lists for JSON: keys, price, change, changePct, ..., ts (epoch ms)"""
+        keys, rows = self.rows(keys)
+        close = rows['close']
+        change = np.where(close > 0, rows['ltp'] - close, 0.0)
+        change_pct = np.divide(change * 100, close, out=np.zeros(len(rows)), where=close > 0)
+        return {
+            'keys': list(keys),
+            'price': np.round(rows['ltp'], 2).tolist(),
+            'change': np.round(change, 2).tolist(),
+            'changePct': np.round(change_pct, 2).tolist(),
+            'volume': rows['volume'].tolist(),
+            'oi': rows['oi'].tolist(),
+            'open': rows['open'].tolist(),
+            'high': rows['high'].tolist(),
+            'low': rows['low'].tolist(),
+            'ts': (rows['ts_ns'] // 1_000_000).tolist(),
+            'seq': rows['seq'].tolist()
+        }
+
+    def snapshot(self, keys=None):
+        """{key: quote} in the live_data shape, change fields computed on the way out"""
+        columns = self.columns(keys)
+        fields = ('price', 'change', 'changePct', 'volume', 'oi', 'open', 'high', 'low')
+        quotes = {}
+        for key, values, ts in zip(columns['keys'], zip(*(columns[f] for f in fields)), columns['ts']):
+            quote = dict(zip(fields, values))
+            quote['timestamp'] = datetime.fromtimestamp(ts / 1000).isoformat() if ts else None
+            quotes[key] = quote
+        return quotes
+
+    def memory(self):
+        """Bytes held by the rows in use and by the key index"""
+        import sys
+        return {
+            'rows': len(self.keys),
+            'array_bytes': len(self.keys) * QUOTE_DTYPE.itemsize,
+            'index_bytes': sys.getsizeof(self._slots) + sum(sys.getsizeof(key) for key in self.keys)
+        }
+
+# ============ BENCHMARK ============
+
+def _dict_tick(live_data, key, ltp, close, volume):
+    # The per-tick work of the dict layout (server.apply_tick)
+    previous = live_data.get(key, {})
+    change = ltp - close
+    change_pct = (change / close * 100) if close > 0 else 0
+    live_data[key] = {
+        'price': round(ltp, 2),
+        'change': round(change, 2),
+        'changePct': round(change_pct, 2),
+        'volume': volume,
+        'open': previous.get('open', 0),
+        'high': previous.get('high', 0),
+        'low': previous.get('low', 0),
+        'timestamp': datetime.now().isoformat()
+    }
+
+def benchmark(instruments=100_000, ticks=500_000):
+    import tracemalloc
+
+    keys = [str(40000 + i) for i in range(instruments)]
+    prices = np.random.default_rng(3).uniform(5, 500, ticks).tolist()
+    order = np.random.default_rng(4).integers(0, instruments, ticks).tolist()
+
+    # Memory: every instrument holding one quote
+    tracemalloc.start()
+    live_data = {}
+    for key in keys:
+        _dict_tick(live_data, key, 100.0, 99.0, 1000)
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del live_data
+
+    tracemalloc.start()
+    store = QuoteStore(capacity=instruments)
+    for key in keys:
+        store.update(key, 100.0, volume=1000, close=99.0)
+    store_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Tick cost, net of the loop itself: one hot instrument, then random
+    # instruments across the whole universe (dominated by cache misses)
+    def tick_cost(update, picks):
+        start = time.perf_counter()
+        for i in range(ticks):
+            keys[picks[i]], prices[i]
+        loop = time.perf_counter() - start
+        start = time.perf_counter()
+        for i in range(ticks):
+            update(keys[picks[i]], prices[i], i)
+        return (time.perf_counter() - start - loop) / ticks
+
+    live_data = {key: {} for key in keys}
+    costs = {}
+    for label, picks in (('hot', [0] * ticks), ('random', order)):
+        costs[label] = (tick_cost(lambda key, ltp, i: _dict_tick(live_data, key, ltp, 99.0, i), picks),
+                        tick_cost(lambda key, ltp, i: store.update(key, ltp, volume=i), picks))
+
+    def timed(fn, repeat):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        return (time.perf_counter() - start) / repeat
+
+    index_keys = keys[:3]
+    print(f"Quote store benchmark ({instruments:,} instruments, {ticks:,} ticks)")
+    print(f"  memory       : dict {dict_bytes / instruments:7.0f} B/instrument, "
+          f"store {store_bytes / instruments:5.0f} B/instrument (array {QUOTE_DTYPE.itemsize} B/row)")
+    for label, (dict_tick, store_tick) in costs.items():
+        print(f"  tick ({label:6s}): dict {dict_tick * 1e6:7.2f} us, store {store_tick * 1e6:5.2f} us")
+    print(f"  snapshot 3   : {timed(lambda: store.snapshot(index_keys), 2000) * 1e6:7.1f} us")
+    print(f"  columns all  : {timed(lambda: store.columns(), 5) * 1e3:7.1f} ms")
+    print(f"  snapshot all : {timed(lambda: store.snapshot(), 2) * 1e3:7.1f} ms")
+
+if __name__ == '__main__':
+    benchmark()
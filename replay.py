@@ -0,0 +1,312 @@
+"""
+Deterministic Tick Replay
+Replays recorded tick-store days, or a seeded synthetic option-chain session,
+through the same ``on_tick`` callback the live SmartStream feed uses. Replay
+runs at real time (speed=1), N times faster (speed=N) or as fast as possible
+(speed=0). The same input and seed always give the same tick sequence, so
+load problems such as market-open bursts can be reproduced offline.
+
+Run this module directly for a pipeline throughput benchmark:
+    python3 replay.py
+"""
+
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from option_chain import bs_price, RISK_FREE_RATE
+from tick_store import SymbolLog, symbol_filename
+
+logger = logging.getLogger(__name__)
+
+# Underlying -> (spot symbol, starting spot, strike step)
+SYNTHETIC_UNDERLYINGS = {
+    'NIFTY': ('NIFTY 50', 23500.0, 50),
+    'BANKNIFTY': ('BANK NIFTY', 49000.0, 100)
+}
+SYNTHETIC_TOKEN_BASE = 9_000_000
+SPOT_TICK_SHARE = 0.2     # fraction of synthetic ticks on the underlyings
+SPOT_STEP_MS = 100        # resolution of the synthetic spot path
+ANNUAL_VOLATILITY = 0.14
+SECONDS_PER_YEAR = 365 * 24 * 3600
+
+class TickBatch:
+    """Time-ordered ticks of many symbols as parallel columns"""
+
+    def __init__(self, symbols, symbol, ts, price, volume, oi):
+        order = np.argsort(ts, kind='stable')
+        self.symbols = list(symbols)
+        self.symbol = np.asarray(symbol, dtype=np.int64)[order]
+        self.ts = np.asarray(ts, dtype=np.int64)[order]
+        self.price = np.asarray(price, dtype=np.float64)[order]
+        self.volume = np.asarray(volume, dtype=np.int64)[order]
+        self.oi = np.asarray(oi, dtype=np.int64)[order]
+
+    def __len__(self):
+        return len(self.ts)
+
+    @property
+    def duration(self):
+        """Seconds between the first and last tick"""
+        return (int(self.ts[-1]) - int(self.ts[0])) / 1e9 if len(self) else 0.0
+
+    @classmethod
+    def from_store(cls, root, day, symbols=None):
+        """Load one recorded tick-store day (YYYYMMDD), optionally only some symbols"""
+        directory = os.path.join(root, day)
+        if not os.path.isdir(directory):
+            raise FileNotFoundError(f"No recorded ticks for {day} in {root}")
+        names = symbols or sorted(f[:-len('.count')] for f in os.listdir(directory) if f.endswith('.count'))
+
+        found, columns = [], {name: [] for name in ('symbol', 'ts', 'price', 'volume', 'oi')}
+        for name in names:
+            if not os.path.exists(os.path.join(directory, f"{name}.count")):
+                continue
+            view = SymbolLog(directory, name, writable=False).slice()
+            if not view or not len(view['ts']):
+                continue
+            columns['symbol'].append(np.full(len(view['ts']), len(found)))
+            for column in ('ts', 'price', 'volume', 'oi'):
+                columns[column].append(np.array(view[column]))
+            found.append(name)
+        if not found:
+            return cls([], *[[] for _ in range(5)])
+        return cls(found, *[np.concatenate(columns[c]) for c in ('symbol', 'ts', 'price', 'volume', 'oi')])
+
+def _grouped_cumsum(groups, values):
+    """Running total of values within each group, in the original order"""
+    order = np.argsort(groups, kind='stable')
+    totals = np.cumsum(values[order])
+    sorted_groups = groups[order]
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    offsets = np.repeat(totals[starts] - values[order][starts], np.diff(np.r_[starts, len(order)]))
+    result = np.empty_like(totals)
+    result[order] = totals - offsets
+    return result
+
+def synthetic_session(seed=0, duration=60, rate=500, burst=5.0, burst_seconds=10,
+                      underlyings=SYNTHETIC_UNDERLYINGS, strikes_each_side=10, expiry=None,
+                      iv=ANNUAL_VOLATILITY, start=None):
+    """Seeded multi-symbol session: spot random walks plus their option chains
+
+    Ticks arrive as a Poisson process of ``rate`` per second, ``burst`` times
+    denser for the first ``burst_seconds`` (the market-open rush). Option
+    contracts are priced off the spot path with Black-Scholes at a flat IV.
+    Returns (TickBatch, contracts) where contracts are instrument-master
+    style dicts keyed by synthetic token, ready for ChainRegistry.track.
+    """
+    rng = np.random.default_rng(seed)
+    start = start or datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
+    expiry = expiry or (start.date() + timedelta(days=7)).isoformat()
+    t_expiry = max((datetime.combine(date.fromisoformat(expiry), datetime.min.time()) - start).total_seconds()
+                   + 15.5 * 3600, 1.0) / SECONDS_PER_YEAR
+
+    # Symbols: each underlying's spot, then its calls and puts around the money
+    symbols, contracts, spot_of, strikes, is_call = [], [], [], [], []
+    for u, (underlying, (spot_symbol, spot, step)) in enumerate(underlyings.items()):
+        symbols.append(spot_symbol)
+        spot_of.append(u)
+        strikes.append(np.nan)
+        is_call.append(False)
+        atm = round(spot / step) * step
+        expiry_code = date.fromisoformat(expiry).strftime('%d%b%y').upper()
+        for k in range(-strikes_each_side, strikes_each_side + 1):
+            for option_type in ('CE', 'PE'):
+                token = str(SYNTHETIC_TOKEN_BASE + len(symbols))
+                contracts.append({
+                    'token': token, 'symbol': f"{underlying}{expiry_code}{atm + k * step:g}{option_type}",
+                    'underlying': underlying, 'expiry': expiry, 'strike': float(atm + k * step),
+                    'option_type': option_type, 'exchange': 'NFO', 'lot_size': 25
+                })
+                symbols.append(token)
+                spot_of.append(u)
+                strikes.append(atm + k * step)
+                is_call.append(option_type == 'CE')
+    spot_of, strikes, is_call = np.array(spot_of), np.array(strikes), np.array(is_call)
+    is_spot = np.isnan(strikes)
+
+    # Tick arrival times: per-second Poisson counts, uniform within the second
+    rates = np.where(np.arange(duration) < burst_seconds, rate * burst, rate)
+    counts = rng.poisson(rates)
+    seconds = np.repeat(np.arange(duration), counts)
+    offsets = seconds + rng.random(len(seconds))
+    start_ns = int(start.timestamp() * 1e9)
+    ts = start_ns + np.sort((offsets * 1e9).astype(np.int64))
+    n = len(ts)
+
+    # Which symbol each tick belongs to
+    spot_ids, option_ids = np.flatnonzero(is_spot), np.flatnonzero(~is_spot)
+    on_spot = rng.random(n) < SPOT_TICK_SHARE
+    symbol = np.where(on_spot, rng.choice(spot_ids, n), rng.choice(option_ids, n))
+
+    # Spot paths on a fixed grid, then read at every tick's time
+    steps = int(duration * 1000 / SPOT_STEP_MS) + 1
+    sigma = iv * np.sqrt(SPOT_STEP_MS / 1000 / SECONDS_PER_YEAR)
+    base = np.array([spot for _, spot, _ in underlyings.values()])
+    paths = base[:, None] * np.exp(np.cumsum(rng.normal(0, sigma, (len(base), steps)), axis=1))
+    grid = ((ts - start_ns) // (SPOT_STEP_MS * 1_000_000)).clip(0, steps - 1)
+    spot = paths[spot_of[symbol], grid]
+
+    t = np.maximum(t_expiry - (ts - start_ns) / 1e9 / SECONDS_PER_YEAR, 1e-6)
+    option_price = bs_price(spot, np.where(is_spot[symbol], spot, strikes[symbol]), t, RISK_FREE_RATE, iv,
+                            is_call[symbol])
+    price = np.where(is_spot[symbol], spot, np.maximum(np.round(option_price / 0.05) * 0.05, 0.05))
+
+    # Cumulative day volume and open interest per symbol
+    lots = rng.integers(1, 20, n) * 25
+    volume = _grouped_cumsum(symbol, lots) + np.where(is_spot[symbol], 0, 100_000)
+    oi = np.where(is_spot[symbol], 0,
+                  1_000_000 + _grouped_cumsum(symbol, rng.integers(-10, 12, n) * 25))
+
+    return TickBatch(symbols, symbol, ts, np.round(price, 2), volume, oi), contracts
+
+# ============ REPLAY ============
+
+class TickReplay:
+    """Push a TickBatch through ``on_tick`` at a controlled speed
+
+    Ticks are delivered as the dicts tick_stream.decode_tick produces
+    (token, ltp, volume, oi, close, exchange_timestamp in ms). ``tokens`` maps
+    recorded symbol names to feed tokens; unmapped symbols are sent as-is.
+    speed=0 replays as fast as possible.
+    """
+
+    def __init__(self, batch, on_tick, speed=1.0, tokens=None):
+        self.batch = batch
+        self.on_tick = on_tick
+        self.speed = speed
+        self.tokens = tokens or {}
+
+        self.replayed = 0
+        self.errors = 0
+        self.max_lag = 0.0
+        self.started = None
+        self.finished = None
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Replay in a daemon thread"""
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="tick-replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def run(self):
+        """Replay every tick in the calling thread; returns the number delivered"""
+        batch = self.batch
+        # Recorded symbols are file-safe names ('NIFTY 50' is stored as 'NIFTY_50')
+        by_filename = {symbol_filename(name): token for name, token in self.tokens.items()}
+        tokens = [str(self.tokens.get(name, by_filename.get(name, name))) for name in batch.symbols]
+        closes = {}
+        ts0 = int(batch.ts[0]) if len(batch) else 0
+        symbol, ts, price = batch.symbol.tolist(), batch.ts.tolist(), batch.price.tolist()
+        volume, oi = batch.volume.tolist(), batch.oi.tolist()
+
+        self.started = time.perf_counter()
+        self.finished = None
+        for i in range(len(ts)):
+            if self._stop.is_set():
+                break
+            if self.speed:
+                due = self.started + (ts[i] - ts0) / 1e9 / self.speed
+                ahead = due - time.perf_counter()
+                if ahead > 0.001:
+                    self._stop.wait(ahead)
+                elif ahead < -self.max_lag:
+                    self.max_lag = -ahead
+
+            s = symbol[i]
+            token = tokens[s]
+            tick = {
+                'token': token,
+                'ltp': price[i],
+                'volume': volume[i],
+                'oi': oi[i],
+                # The first replayed price stands in for the previous close
+                'close': closes.setdefault(s, price[i]),
+                'exchange_timestamp': ts[i] // 1_000_000
+            }
+            try:
+                self.on_tick(tick)
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"Error replaying tick for {token}: {e}")
+            self.replayed += 1
+        self.finished = time.perf_counter()
+        logger.info(f"Replay finished: {self.replayed} ticks in {self.finished - self.started:.2f}s")
+        return self.replayed
+
+    def stats(self):
+        end = self.finished or time.perf_counter()
+        elapsed = end - self.started if self.started else 0.0
+        return {
+            'running': self.running,
+            'ticks': len(self.batch),
+            'replayed': self.replayed,
+            'errors': self.errors,
+            'speed': self.speed,
+            'elapsed': round(elapsed, 3),
+            'ticks_per_second': round(self.replayed / elapsed) if elapsed else 0,
+            'recorded_duration': round(self.batch.duration, 3),
+            'max_lag_ms': round(self.max_lag * 1000, 3)
+        }
+
+# ============ BENCHMARK ============
+
+def benchmark(seed=1, duration=60, rate=2000):
+    """Market-open burst through the tick store, bar builder, chain aggregates and push hub"""
+    import shutil
+    import tempfile
+
+    from bar_builder import BarBuilder
+    from chain_aggregator import ChainRegistry
+    from quote_hub import QuoteHub
+    from tick_store import TickStore
+
+    batch, contracts = synthetic_session(seed=seed, duration=duration, rate=rate)
+    root = tempfile.mkdtemp(prefix="replay-")
+    try:
+        store, bars, chains, hub = TickStore(root), BarBuilder(), ChainRegistry(), QuoteHub()
+        for underlying in SYNTHETIC_UNDERLYINGS:
+            chain = [c for c in contracts if c['underlying'] == underlying]
+            chains.track(underlying, chain[0]['expiry'], chain)
+        subscriber = hub.subscribe()
+
+        def on_tick(tick):
+            ts = tick['exchange_timestamp'] * 1_000_000
+            store.append(tick['token'], tick['ltp'], tick['volume'], tick['oi'], ts)
+            bars.on_tick(tick['token'], tick['ltp'], tick['volume'], ts / 1e9)
+            if not chains.on_contract(tick['token'], tick['ltp'], tick['oi'], tick['volume']):
+                hub.publish(tick['token'], {'price': tick['ltp']})
+
+        replay = TickReplay(batch, on_tick, speed=0)
+        replay.run()
+        subscriber.drain(0)
+        stats = replay.stats()
+        print(f"Replay benchmark: {len(batch)} ticks over {len(batch.symbols)} symbols "
+              f"({duration}s session, 5x burst for the first 10s)")
+        print(f"  as fast as possible : {stats['ticks_per_second']:10,} ticks/s "
+              f"({stats['elapsed'] / len(batch) * 1e6:.1f} us/tick through store, bars, chains and hub)")
+        print(f"  recorded rate       : {len(batch) / batch.duration:10,.0f} ticks/s "
+              f"-> max replay speed {stats['ticks_per_second'] * batch.duration / len(batch):.1f}x")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,93 @@
+"""
+Multi-Worker Production Server
+Runs server.py in several HTTP worker processes that share one listening
+socket. Quotes live in a shared-memory segment created here; exactly one
+worker wins the feed election and writes it, the others serve reads from it
+and take the feed over if the feed worker dies. Dead workers are restarted.
+
+Everything else that lives in process memory (broker login, alert rules, paper
+accounts, replay, chain aggregates, bars and the merged provider feed) exists
+only in the feed worker; the other workers forward those routes to it over a
+private loopback port (server.feed_process_route).
+
+Usage:
+    python3 serve.py --workers 4 --port 5001
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+
+from shared_quotes import SharedQuoteStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+LISTEN_BACKLOG = 1024
+SUPERVISE_INTERVAL = 1  # seconds between worker liveness checks
+
+def run_worker(fd, args):
+    """Worker process: attach to the quote segment, campaign for the feed, serve HTTP"""
+    from werkzeug.serving import make_server
+    import server
+
+    server.enable_shared_quotes(SharedQuoteStore.attach(args.segment), args.lock)
+    httpd = make_server(args.host, args.port, server.app, threaded=True, fd=fd)
+    logger.info(f"Worker {os.getpid()} serving on {args.host}:{args.port}")
+    httpd.serve_forever()
+
+def listen(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(LISTEN_BACKLOG)
+    sock.set_inheritable(True)
+    return sock
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the Angel One API from several worker processes")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=5001)
+    args = parser.parse_args()
+    args.segment = f"optiontrader-quotes-{args.port}"
+    args.lock = os.path.join(DATA_DIR, f"feed-{args.port}.lock")
+
+    store = SharedQuoteStore.create(args.segment)
+    sock = listen(args.host, args.port)
+    context = multiprocessing.get_context('fork')
+
+    def spawn():
+        process = context.Process(target=run_worker, args=(sock.fileno(), args), daemon=True)
+        process.start()
+        return process
+
+    workers = [spawn() for _ in range(args.workers)]
+    logger.info(f"✓ {args.workers} workers on http://{args.host}:{args.port} (quote segment {args.segment})")
+
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda *_: stopping.append(True))
+    try:
+        while not stopping:
+            time.sleep(SUPERVISE_INTERVAL)
+            for i, process in enumerate(workers):
+                if not process.is_alive():
+                    logger.warning(f"Worker {process.pid} exited ({process.exitcode}), restarting")
+                    workers[i] = spawn()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join(timeout=5)
+        sock.close()
+        store.close()
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,39 @@ Angel One SmartAPI Server for Live Market Data
 This server fetches live market data from Angel One and serves it to the frontend
 """
 
-from flask import Flask, jsonify, request, redirect, session
+from flask import Flask, Response, jsonify, request, redirect, session
 from flask_cors import CORS
 from SmartApi import SmartConnect
+import functools
 import threading
 import logging
+import time
 from datetime import datetime
 import os
 import pyotp
+import numpy as np
+import requests
+from tick_stream import TickStream, SNAP_QUOTE_MODE
+from quote_hub import QuoteHub, quote_hub, parse_symbols
+from snapshot_cache import SnapshotCache, encoded_response
+from ttl_cache import TTLCache
+from quote_fetcher import hedged_fetch, fetch_yahoo_quote, batch_executor
+from instrument_master import InstrumentMaster
+from option_chain import compute_chain, chain_rows, time_to_expiry, implied_volatility, RISK_FREE_RATE
+from chain_aggregator import ChainRegistry
+from tick_store import TickStore
+from quote_store import QuoteStore
+from bar_builder import BarBuilder
+from prediction_engine import predict_batch, prediction_record, MIN_POINTS
+from alert_engine import AlertEngine, options360_rules
+from paper_trading import PaperTradingEngine
+from replay import TickBatch, TickReplay, synthetic_session
+from shared_quotes import FeedElection
+from providers import FeedMerger, TrueDataPoller, parse_exchange_time
+from poll_scheduler import IST, PollScheduler
+from session_manager import SessionManager
+import metrics
+import profiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -19,6 +44,7 @@ logger = logging.getLogger(__name__)
 app = Flask(__name__)
 app.secret_key = os.urandom(24)
 CORS(app)
+metrics.instrument_flask(app)
 
 # ============ CONFIGURATION ============
 # Angel One Credentials
@@ -28,8 +54,10 @@ API_KEY = "Hsx6OX7y"  # API Key from SmartAPI portal
 SECRET_KEY = "03a10594-9df4-41d9-ac75-bf807ab01c6b"  # Secret Key
 TOTP_SECRET = "7CNLDZ42RSAP4SS3J43JJ77JBY"  # TOTP secret for 2FA
 
-# Initialize SmartAPI
-smart_api = SmartConnect(api_key=API_KEY)
+# Initialize SmartAPI; broker round trips are timed into /metrics
+BROKER_METHODS = ('generateSession', 'generateToken', 'getMarketData', 'position', 'holding',
+                  'orderBook', 'getProfile')
+smart_api = metrics.InstrumentedClient(SmartConnect(api_key=API_KEY), 'angel_one', BROKER_METHODS)
 
 # Global variables for live data
 live_data = {
@@ -49,6 +77,179 @@ INSTRUMENT_TOKENS = {
     'BANK NIFTY': '99926009'      # BANK NIFTY Index
 }
 
+# Columnar index built from the Angel One scrip master (see instrument_master.py)
+INSTRUMENT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'instruments')
+
+instrument_master = InstrumentMaster(INSTRUMENT_INDEX_DIR)
+instrument_master.load()
+
+# Every tick is persisted here as per-day columnar files (see tick_store.py).
+# truedata_server.py records under its own data/ticks/truedata
+TICK_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ticks')
+
+tick_store = TickStore(TICK_STORE_DIR)
+
+# 1s/1m/5m/15m OHLCV bars with rolling indicators, fed by the same ticks
+bar_builder = BarBuilder()
+
+# Latest quote of every instrument (indices by name, contracts by token),
+# written in place per tick; see quote_store.py
+quote_store = QuoteStore()
+
+# Reverse lookup used by the tick stream
+TOKEN_NAMES = {token: name for name, token in INSTRUMENT_TOKENS.items()}
+
+# Exchange segment for each instrument (defaults to NSE)
+INSTRUMENT_EXCHANGES = {
+    'SENSEX': 'BSE'
+}
+
+# Bulk market data settings
+MARKET_DATA_MODE = "FULL"       # LTP, OHLC or FULL
+MARKET_DATA_BATCH_SIZE = 50     # Angel One accepts up to 50 tokens per request
+
+# Live feed mode: "stream" (WebSocket ticks), "poll" (bulk REST polling) or
+# "replay" (REPLAY_SOURCE pushed through the tick path, no broker connection)
+FEED_MODE = "stream"
+
+tick_stream = None
+
+# Replay source: "synthetic" (seeded option-chain session) or a recorded day
+# (YYYYMMDD under TICK_STORE_DIR). Speed 1 is real time, 0 as fast as possible.
+REPLAY_SOURCE = "synthetic"
+REPLAY_SPEED = 1.0
+# Replayed ticks are recorded here so they never mix with real recordings
+REPLAY_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'replay')
+
+replay_session = None
+replay_store = None
+# Chains of the replayed session, kept out of the live chain_registry
+replay_chains = None
+# live_data from before the replay, restored when it stops
+replay_saved_quotes = None
+
+# Provider layer: Angel One and TrueData run together and are merged by
+# exchange-timestamp freshness into one canonical feed (see providers.py)
+PROVIDERS = ('angel', 'truedata')
+
+truedata_provider = None
+
+# Multi-worker serving (serve.py): every worker reads quotes from one shared
+# memory segment that only the elected feed process writes. Both stay None
+# when the server runs as a single process.
+shared_quotes = None
+feed_election = None
+SHARED_RELAY_INTERVAL = 0.1  # seconds between shared-segment polls for SSE relay
+# Requests for state kept only in the feed process (login, alert rules, paper
+# accounts, replay, chain aggregates, bars, the merged feed) are forwarded to
+# it over loopback; (connect, read) timeouts in seconds. SSE sends keepalives
+# well inside the read timeout.
+FORWARD_TIMEOUT = (2, 60)
+
+# Account endpoint caching (seconds): fresh TTL and extra stale-while-revalidate window
+ACCOUNT_CACHE_TTLS = {
+    'positions': (2, 10),
+    'holdings': (30, 120),
+    'orderbook': (2, 10),
+    'profile': (300, 600)
+}
+
+# Per-symbol quote cache for /api/quote and /api/quotes (seconds)
+QUOTE_CACHE_TTL = 1
+MAX_BATCH_SYMBOLS = 50
+
+quote_cache = TTLCache('quotes', QUOTE_CACHE_TTL)
+
+# Option chain premiums are re-fetched at most this often (seconds)
+OPTION_CHAIN_TTL = 1
+
+# Live feed instrument carrying the spot price of each F&O underlying
+UNDERLYING_SPOT = {
+    'NIFTY': 'NIFTY 50',
+    'BANKNIFTY': 'BANK NIFTY',
+    'SENSEX': 'SENSEX'
+}
+
+SPOT_UNDERLYINGS = {name: underlying for underlying, name in UNDERLYING_SPOT.items()}
+
+option_premium_cache = TTLCache('option_premiums', OPTION_CHAIN_TTL)
+
+# Option chains whose PCR / straddle / max pain are maintained from the feed
+chain_registry = ChainRegistry()
+
+# Price points (closed bars) scored per symbol by /api/predict, and the PCR
+# used when no option chain is tracked for the symbol's underlying
+PREDICTION_POINTS = 50
+DEFAULT_PCR = 1.0
+
+# (symbol, timeframe, points) -> ((last bar time, pcr), prediction)
+prediction_cache = {}
+
+# Alert rules evaluated against index prices and tracked chain metrics;
+# chain metrics (PCR, ATM IV, straddle jump) are published this often (seconds)
+ALERT_INTERVAL = 1
+alert_engine = AlertEngine()
+
+# Simulated accounts filled against the live feed
+paper_engine = PaperTradingEngine()
+
+# Caches that change when an order is placed
+ORDER_SENSITIVE_CACHES = ('positions', 'holdings', 'orderbook')
+
+account_caches = {
+    name: TTLCache(name, ttl, stale_ttl, cacheable=lambda r: bool(r and r.get('status')))
+    for name, (ttl, stale_ttl) in ACCOUNT_CACHE_TTLS.items()
+}
+
+# ============ FEED PROCESS ROUTING ============
+
+# Headers that describe one hop, or that the forwarding client re-encodes
+HOP_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'content-encoding',
+               'accept-encoding', 'host', 'upgrade'}
+
+def is_feed_process():
+    """True in a single-process server and in the elected worker under serve.py"""
+    return feed_election is None or feed_election.leader
+
+def forward_to_feed_process():
+    """Replay the current request against the feed process and stream its response back"""
+    address = feed_election.leader_address()
+    if not address:
+        return jsonify({'error': 'No feed process is serving yet, retry shortly'}), 503
+    try:
+        upstream = requests.request(
+            request.method, f"http://{address}{request.full_path}",
+            data=request.get_data(),
+            headers={k: v for k, v in request.headers.items() if k.lower() not in HOP_HEADERS},
+            stream=True, allow_redirects=False, timeout=FORWARD_TIMEOUT
+        )
+    except requests.RequestException as e:
+        logger.warning(f"Forwarding {request.path} to the feed process failed: {e}")
+        return jsonify({'error': 'Feed process unavailable, retry shortly'}), 503
+    return Response(
+        upstream.iter_content(chunk_size=None),
+        status=upstream.status_code,
+        headers=[(k, v) for k, v in upstream.headers.items() if k.lower() not in HOP_HEADERS]
+    )
+
+def feed_process_route(view):
+    """Serve a route from the feed process's state, forwarding from the other workers"""
+    @functools.wraps(view)
+    def route(*args, **kwargs):
+        if is_feed_process():
+            return view(*args, **kwargs)
+        return forward_to_feed_process()
+    return route
+
+def serve_forwarded_requests():
+    """Listen on a private loopback port for requests forwarded by the other workers"""
+    from werkzeug.serving import make_server
+
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=httpd.serve_forever, name="feed-forward-server", daemon=True).start()
+    feed_election.advertise(f"127.0.0.1:{httpd.server_port}")
+    logger.info(f"✓ Feed process accepting forwarded requests on 127.0.0.1:{httpd.server_port}")
+
 # ============ AUTHENTICATION ============
 
 def generate_totp():
@@ -61,37 +262,70 @@ def generate_totp():
         logger.error(f"Error generating TOTP: {e}")
     return ""
 
-def authenticate_angel_one():
-    """Authenticate with Angel One and store tokens"""
+def angel_login():
+    """Full Angel One login with password and TOTP; returns the session tokens or None"""
+    totp_code = generate_totp()
+    logger.info(f"Attempting Angel One authentication for {CLIENT_ID}")
+    
+    # Generate session
+    session_data = smart_api.generateSession(CLIENT_ID, PASSWORD, totp_code)
+    
+    if session_data and session_data.get('status'):
+        logger.info(f"✓ Successfully authenticated with Angel One")
+        return {
+            'auth_token': session_data['data']['jwtToken'],
+            'feed_token': session_data['data']['feedToken'],
+            'refresh_token': session_data['data']['refreshToken']
+        }
+    
+    error_msg = session_data.get('message', 'Unknown error') if session_data else 'Invalid response'
+    logger.error(f"✗ Authentication failed: {error_msg}")
+    return None
+
+def angel_refresh(tokens):
+    """New JWT and feed token from the refresh token, without a login"""
+    response = smart_api.generateToken(tokens['refresh_token'])
+    if not (response and response.get('status')):
+        return None
+    data = response['data']
+    jwt = data['jwtToken']
+    return {
+        'auth_token': jwt if jwt.startswith('Bearer ') else f"Bearer {jwt}",
+        'feed_token': data.get('feedToken') or tokens['feed_token'],
+        'refresh_token': data.get('refreshToken') or tokens['refresh_token']
+    }
+
+def adopt_angel_session(broker_session):
+    """Swap renewed tokens in for the REST client, the tick stream and other workers"""
     global auth_token, feed_token, refresh_token
     
-    try:
-        totp_code = generate_totp()
-        logger.info(f"Attempting Angel One authentication for {CLIENT_ID}")
-        
-        # Generate session
-        session_data = smart_api.generateSession(CLIENT_ID, PASSWORD, totp_code)
-        
-        if session_data and session_data.get('status'):
-            auth_token = session_data['data']['jwtToken']
-            feed_token = session_data['data']['feedToken']
-            refresh_token = session_data['data']['refreshToken']
-            
-            logger.info(f"✓ Successfully authenticated with Angel One")
-            logger.info(f"  Auth Token: {auth_token[:20]}...")
-            logger.info(f"  Feed Token: {feed_token}")
-            
-            return True
-        else:
-            error_msg = session_data.get('message', 'Unknown error') if session_data else 'Invalid response'
-            logger.error(f"✗ Authentication failed: {error_msg}")
-            return False
-            
-    except Exception as e:
-        logger.error(f"✗ Authentication error: {e}")
+    first_login = auth_token is None
+    tokens = broker_session.tokens
+    auth_token, feed_token, refresh_token = tokens['auth_token'], tokens['feed_token'], tokens['refresh_token']
+    smart_api.setAccessToken(auth_token.replace("Bearer ", "", 1))
+    smart_api.setRefreshToken(refresh_token)
+    smart_api.setFeedToken(feed_token)
+    if tick_stream:
+        tick_stream.set_tokens(auth_token, feed_token)
+    if first_login:
+        invalidate_account_caches()
+    share_session()
+    mark_live_data_changed()
+    logger.info(f"  Angel One session valid until {datetime.fromtimestamp(broker_session.expires_at):%Y-%m-%d %H:%M}")
+
+# Renews the JWT with the refresh token before it expires (see session_manager.py)
+angel_session = SessionManager('angel_one', angel_login, angel_refresh, adopt_angel_session)
+
+def authenticate_angel_one():
+    """Log in to Angel One (joining any login in flight) and keep the session renewed"""
+    broker_session = angel_session.renew(login=True)
+    if broker_session is None:
         return False
+    angel_session.start()
+    return True
 
 @app.route('/login')
+@feed_process_route
 def login():
     """Login to Angel One"""
     global auth_token
@@ -125,10 +359,9 @@ def login():
         """, 400
 
 @app.route('/authenticate', methods=['POST'])
+@feed_process_route
 def authenticate():
     """Fallback manual authentication endpoint"""
-    global auth_token, feed_token, refresh_token
-    
     try:
         data = request.get_json()
         totp_code = data.get('totp')
@@ -140,9 +373,12 @@ def authenticate():
         session_data = smart_api.generateSession(CLIENT_ID, PASSWORD, totp_code)
         
         if session_data and session_data.get('status'):
-            auth_token = session_data['data']['jwtToken']
-            feed_token = session_data['data']['feedToken']
-            refresh_token = session_data['data']['refreshToken']
+            angel_session.adopt({
+                'auth_token': session_data['data']['jwtToken'],
+                'feed_token': session_data['data']['feedToken'],
+                'refresh_token': session_data['data']['refreshToken']
+            })
+            angel_session.start()
             
             logger.info("✓ Successfully authenticated with Angel One")
             start_live_feed()
@@ -159,14 +395,214 @@ def authenticate():
 
 # ============ LIVE DATA ROUTES ============
 
+def current_quotes():
+    """live_data, or the shared segment's quotes when serving from several workers"""
+    return shared_quotes.snapshot() if shared_quotes is not None else dict(live_data)
+
+def build_indices_payload():
+    """Payload for /api/indices; quote dicts are replaced, never mutated, by the feed"""
+    return {
+        'status': 'success',
+        'data': current_quotes(),
+        'timestamp': datetime.now().isoformat(),
+        'authenticated': auth_token is not None
+    }
+
+indices_cache = SnapshotCache(build_indices_payload)
+
+# A client whose delta would cover more than this fraction of the instruments
+# gets a full resync instead
+DELTA_MAX_FRACTION = 0.5
+
+def indices_since(since):
+    """Payload of the indices changed after sequence ``since``, or a full resync
+
+    The sequence is read before the quotes, so a quote written meanwhile is
+    at worst sent twice, never skipped.
+    """
+    seq = quote_store.seq
+    names = list(INSTRUMENT_TOKENS)
+    # Sequences from before this process started (or not yet issued) cannot be diffed
+    full = not quote_store.base <= since <= seq
+    changed = names if full else quote_store.changed(since, names)
+    if len(changed) > DELTA_MAX_FRACTION * len(names):
+        full, changed = True, names
+    return {
+        'status': 'success',
+        'data': quote_store.snapshot(changed),
+        'seq': seq,
+        'since': since,
+        'full': full,
+        'timestamp': datetime.now().isoformat(),
+        'authenticated': auth_token is not None
+    }
+
 @app.route('/api/indices')
 def get_indices():
-    """Get current index values from live_data"""
+    """Current index values from the cached live_data snapshot
+
+    ?since=<seq> returns only the indices changed after the ``seq`` of the
+    previous response (``full`` is true when everything was resent; start
+    with since=0). Accept: application/msgpack selects MessagePack.
+    """
+    poll_scheduler.touch()
+    since = request.args.get('since', type=int)
+    # Other workers of serve.py read quotes from the shared segment, which
+    # carries no sequence numbers
+    if since is None or shared_quotes is not None:
+        return indices_cache.respond()
+    return encoded_response(indices_since(since))
+
+@app.route('/api/stream')
+def stream_indices():
+    """Push quote changes as Server-Sent Events (optional ?symbols=A,B filter)"""
+    symbols = parse_symbols(request.args.get('symbols'))
+    return Response(
+        quote_hub.stream(symbols),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def fetch_angel_quote(symbol):
+    """Full quote for a known instrument from Angel One, or None"""
+    token = INSTRUMENT_TOKENS.get(symbol)
+    exchange = INSTRUMENT_EXCHANGES.get(symbol, "NSE")
+    if not token and instrument_master.loaded:
+        instrument = instrument_master.index.by_symbol(symbol)
+        if instrument:
+            token, exchange = instrument['token'], instrument['exchange']
+    if not token:
+        return None
+
+    response = smart_api.getMarketData("FULL", {exchange: [token]})
+    if response and response.get('status') and response.get('data'):
+        fetched = response['data'].get('fetched', [])
+        return fetched[0] if fetched else None
+    return None
+
+QUOTE_SOURCES = [
+    ('angel_one', fetch_angel_quote),
+    ('yahoo_finance', fetch_yahoo_quote)
+]
+
+def lookup_quote(symbol):
+    """Cached, hedged quote lookup returning {'source', 'symbol', 'data'} or None"""
+    def load():
+        source, data = hedged_fetch(symbol, QUOTE_SOURCES)
+        if source is None:
+            return None
+        logger.info(f"Fetched {symbol} from {source}")
+        return {'source': source, 'symbol': symbol, 'data': data}
+
+    return quote_cache.get(symbol, load)
+
+def history_key(symbol):
+    """Key used by the tick store and bar builder: option contracts are kept by token"""
+    if symbol not in live_data and instrument_master.loaded:
+        instrument = instrument_master.index.by_symbol(symbol)
+        if instrument:
+            return instrument['token']
+    return symbol
+
+@app.route('/api/bars/<symbol>')
+@feed_process_route
+def get_bars(symbol):
+    """OHLCV bars with SMA/RSI/momentum/volatility (?tf=1s|1m|5m|15m&n=200)"""
+    try:
+        bars = bar_builder.bars(
+            history_key(symbol),
+            request.args.get('tf', '1m'),
+            min(request.args.get('n', default=200, type=int), 2000)
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    if bars is None:
+        return jsonify({'error': f'No bars for {symbol}'}), 404
     return jsonify({
         'status': 'success',
-        'data': live_data,
-        'timestamp': datetime.now().isoformat(),
-        'authenticated': auth_token is not None
+        'symbol': symbol,
+        'timeframe': request.args.get('tf', '1m'),
+        'data': bars
+    })
+
+@app.route('/api/predict')
+@feed_process_route
+def get_predictions():
+    """Score a watchlist with the batch prediction engine (?symbols=A,B&tf=1m&pcr=)"""
+    symbols = parse_symbols(request.args.get('symbols'))
+    if not symbols:
+        return jsonify({'error': 'symbols parameter required'}), 400
+    timeframe = request.args.get('tf', '1m')
+    points = max(MIN_POINTS, min(request.args.get('n', default=PREDICTION_POINTS, type=int), 500))
+    pcr_override = request.args.get('pcr', type=float)
+    
+    results, pending = {}, {}
+    try:
+        for symbol in symbols:
+            bars = bar_builder.bars(history_key(symbol), timeframe, points + 1) or []
+            closed = [bar for bar in bars if not bar.get('forming')][-points:]
+            if len(closed) < MIN_POINTS:
+                results[symbol] = {
+                    'prediction': 'INSUFFICIENT_DATA',
+                    'confidence': 0,
+                    'reason': f'Need at least {MIN_POINTS} data points'
+                }
+                continue
+            
+            pcr = pcr_override or active_chains().pcr(SPOT_UNDERLYINGS.get(symbol, symbol)) or DEFAULT_PCR
+            version = (closed[-1]['time'], pcr)
+            cached = prediction_cache.get((symbol, timeframe, points))
+            if cached and cached[0] == version:
+                results[symbol] = cached[1]
+                continue
+            
+            # Symbols with the same history length are scored together
+            pending.setdefault(len(closed), []).append((symbol, [bar['close'] for bar in closed], pcr, version))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    for group in pending.values():
+        result = predict_batch(np.array([g[1] for g in group]), np.array([g[2] for g in group]))
+        for i, (symbol, _, _, version) in enumerate(group):
+            record = prediction_record(result, i)
+            record['bar_time'] = version[0]
+            prediction_cache[(symbol, timeframe, points)] = (version, record)
+            results[symbol] = record
+    
+    return jsonify({
+        'status': 'success',
+        'timeframe': timeframe,
+        'data': results,
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/ticks/<symbol>')
+def get_ticks(symbol):
+    """Recorded ticks for a symbol (?from=&to= epoch ms, ?day=YYYYMMDD, ?limit=)"""
+    start_ms = request.args.get('from', type=int)
+    end_ms = request.args.get('to', type=int)
+    limit = request.args.get('limit', default=5000, type=int)
+    
+    columns = tick_store.read(
+        history_key(symbol),
+        start_ms * 1_000_000 if start_ms is not None else None,
+        end_ms * 1_000_000 if end_ms is not None else None,
+        day=request.args.get('day')
+    )
+    if columns is None:
+        return jsonify({'error': f'No ticks recorded for {symbol}'}), 404
+    
+    return jsonify({
+        'status': 'success',
+        'symbol': symbol,
+        'count': len(columns['ts'][-limit:]),
+        'data': {
+            'ts': (columns['ts'][-limit:] // 1_000_000).tolist(),
+            'price': columns['price'][-limit:].tolist(),
+            'volume': columns['volume'][-limit:].tolist(),
+            'oi': columns['oi'][-limit:].tolist()
+        }
     })
 
 @app.route('/api/quote/<symbol>')
@@ -176,37 +612,68 @@ def get_quote(symbol):
         if not auth_token:
             return jsonify({'error': 'Not authenticated with Angel One'}), 401
         
-        # Try Angel One first
-        try:
-            response = smart_api.getQuote('NSE', symbol)
-            if response and response.get('status'):
-                logger.info(f"Fetched {symbol} from Angel One")
-                return jsonify({
-                    'source': 'angel_one',
-                    'symbol': symbol,
-                    'data': response.get('data', {})
-                })
-        except Exception as e:
-            logger.warning(f"Angel One quote failed for {symbol}: {e}")
-        
-        # Fallback to Yahoo Finance
-        import requests
-        url = f"https://query1.finance.yahoo.com/v10/finance/quoteSummary/{symbol}?modules=price"
-        response = requests.get(url, timeout=5)
-        if response.status_code == 200:
-            logger.info(f"Fetched {symbol} from Yahoo Finance")
-            return jsonify({
-                'source': 'yahoo_finance',
-                'symbol': symbol,
-                'data': response.json()
-            })
-        else:
-            return jsonify({'error': 'Symbol not found'}), 404
+        quote = lookup_quote(symbol)
+        if quote:
+            return jsonify(quote)
+        return jsonify({'error': 'Symbol not found'}), 404
             
     except Exception as e:
         logger.error(f"Error fetching quote for {symbol}: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/quotes')
+def get_quotes():
+    """Get quotes for several symbols at once (?symbols=A,B,C)"""
+    try:
+        if not auth_token:
+            return jsonify({'error': 'Not authenticated with Angel One'}), 401
+        
+        symbols = parse_symbols(request.args.get('symbols'))
+        if not symbols:
+            return jsonify({'error': 'symbols parameter required'}), 400
+        if len(symbols) > MAX_BATCH_SYMBOLS:
+            return jsonify({'error': f'At most {MAX_BATCH_SYMBOLS} symbols per request'}), 400
+        
+        # Look up all symbols concurrently; each lookup is cached and hedged
+        futures = {symbol: batch_executor.submit(lookup_quote, symbol) for symbol in dict.fromkeys(symbols)}
+        
+        data, missing = {}, []
+        for symbol, future in futures.items():
+            try:
+                quote = future.result()
+            except Exception as e:
+                logger.warning(f"Quote lookup failed for {symbol}: {e}")
+                quote = None
+            if quote:
+                data[symbol] = {'source': quote['source'], 'data': quote['data']}
+            else:
+                missing.append(symbol)
+        
+        return jsonify({
+            'status': 'success',
+            'data': data,
+            'missing': missing,
+            'timestamp': datetime.now().isoformat()
+        })
+            
+    except Exception as e:
+        logger.error(f"Error fetching quotes: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/snapshot')
+def get_snapshot():
+    """Latest quotes of streamed instruments from the array quote store
+
+    ?keys=A,B selects index names / contract tokens (default all);
+    ?format=columns returns column arrays, the cheap shape for thousands of rows.
+    """
+    keys = parse_symbols(request.args.get('keys'))
+    if request.args.get('format') == 'columns':
+        data = quote_store.columns(keys)
+    else:
+        data = quote_store.snapshot(keys)
+    return jsonify({'status': 'success', 'data': data, 'timestamp': datetime.now().isoformat()})
+
 @app.route('/api/positions')
 def get_positions():
     """Get current positions from Angel One"""
@@ -214,7 +681,7 @@ def get_positions():
         if not auth_token:
             return jsonify({'error': 'Not authenticated with Angel One'}), 401
         
-        positions = smart_api.position()
+        positions = account_caches['positions'].get(CLIENT_ID, smart_api.position)
         
         if positions and positions.get('status'):
             logger.info(f"Fetched {len(positions.get('data', []))} positions from Angel One")
@@ -237,7 +704,7 @@ def get_holdings():
         if not auth_token:
             return jsonify({'error': 'Not authenticated with Angel One'}), 401
         
-        holdings = smart_api.holding()
+        holdings = account_caches['holdings'].get(CLIENT_ID, smart_api.holding)
         
         if holdings and holdings.get('status'):
             logger.info(f"Fetched {len(holdings.get('data', []))} holdings from Angel One")
@@ -260,7 +727,7 @@ def get_orders():
         if not auth_token:
             return jsonify({'error': 'Not authenticated with Angel One'}), 401
         
-        orders = smart_api.orderBook()
+        orders = account_caches['orderbook'].get(CLIENT_ID, smart_api.orderBook)
         
         if orders and orders.get('status'):
             logger.info(f"Fetched {len(orders.get('data', []))} orders from Angel One")
@@ -283,7 +750,7 @@ def get_profile():
         if not auth_token or not refresh_token:
             return jsonify({'error': 'Not authenticated with Angel One'}), 401
         
-        profile = smart_api.getProfile(refresh_token)
+        profile = account_caches['profile'].get(CLIENT_ID, lambda: smart_api.getProfile(refresh_token))
         
         if profile and profile.get('status'):
             logger.info("Fetched user profile from Angel One")
@@ -302,87 +769,908 @@ def get_profile():
         logger.error(f"Error fetching profile: {e}")
         return jsonify({'error': str(e)}), 500
 
+# ============ INSTRUMENTS ============
+
+@app.route('/api/instruments/<query>')
+def get_instrument(query):
+    """Look up an instrument by token or trading symbol"""
+    if not instrument_master.loaded:
+        return jsonify({'error': 'Instrument index not built'}), 503
+    
+    index = instrument_master.index
+    instrument = index.by_token(query) if query.isdigit() else index.by_symbol(query)
+    if not instrument:
+        return jsonify({'error': 'Instrument not found'}), 404
+    return jsonify(instrument)
+
+@app.route('/api/instruments/options/<underlying>')
+def get_option_contracts(underlying):
+    """Option contracts for an underlying (?expiry=YYYY-MM-DD&strike_min=&strike_max=&type=CE)"""
+    if not instrument_master.loaded:
+        return jsonify({'error': 'Instrument index not built'}), 503
+    
+    try:
+        contracts = instrument_master.index.options(
+            underlying.upper(),
+            expiry=request.args.get('expiry'),
+            strike_min=request.args.get('strike_min', type=float),
+            strike_max=request.args.get('strike_max', type=float),
+            option_type=request.args.get('type')
+        )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({
+        'status': 'success',
+        'underlying': underlying.upper(),
+        'expiries': instrument_master.index.expiries(underlying.upper()),
+        'data': contracts,
+        'version': instrument_master.index.version
+    })
+
+def fetch_option_premiums(contracts):
+    """Last traded price for each contract, keyed by token, in bulk requests"""
+    instruments = {c['symbol']: c['token'] for c in contracts}
+    exchanges = {c['symbol']: c['exchange'] for c in contracts}
+    fetched = fetch_market_data(instruments, mode="LTP", exchanges=exchanges)
+    return {token: float(record.get('ltp', 0)) for token, record in fetched.items()}
+
+@app.route('/api/optionchain/<underlying>/<expiry>')
+def get_option_chain(underlying, expiry):
+    """Implied volatility and Greeks for every contract of one expiry (?spot= overrides)"""
+    try:
+        if not instrument_master.loaded:
+            return jsonify({'error': 'Instrument index not built'}), 503
+        
+        underlying = underlying.upper()
+        contracts = instrument_master.index.options(underlying, expiry=expiry)
+        if not contracts:
+            return jsonify({'error': f'No option contracts for {underlying} {expiry}'}), 404
+        
+        spot = request.args.get('spot', type=float)
+        if spot is None:
+            spot = live_data.get(UNDERLYING_SPOT.get(underlying, underlying), {}).get('price', 0)
+        if not spot:
+            return jsonify({'error': f'No spot price for {underlying}'}), 503
+        
+        if not auth_token:
+            return jsonify({'error': 'Not authenticated with Angel One'}), 401
+        premiums = option_premium_cache.get((underlying, expiry), lambda: fetch_option_premiums(contracts))
+        
+        t = time_to_expiry(expiry)
+        result = compute_chain(
+            spot,
+            [c['strike'] for c in contracts],
+            [premiums.get(c['token'], 0.0) for c in contracts],
+            [c['option_type'] == 'CE' for c in contracts],
+            t
+        )
+        rows = chain_rows(contracts, result)
+        for row in rows:
+            row['ltp'] = premiums.get(row['token'])
+        
+        return jsonify({
+            'status': 'success',
+            'underlying': underlying,
+            'expiry': expiry,
+            'spot': spot,
+            'time_to_expiry': round(t, 6),
+            'data': rows,
+            'timestamp': datetime.now().isoformat()
+        })
+            
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Error building option chain for {underlying} {expiry}: {e}")
+        return jsonify({'error': str(e)}), 500
+
+def track_chain(underlying, expiry):
+    """Start maintaining aggregates for a chain and subscribe its contracts"""
+    contracts = instrument_master.index.options(underlying, expiry=expiry)
+    if not contracts:
+        return None
+
+    aggregator, created = chain_registry.track(underlying, expiry, contracts)
+    if created:
+        spot = live_data.get(UNDERLYING_SPOT.get(underlying, underlying), {}).get('price', 0)
+        aggregator.update_spot(spot)
+        if tick_stream:
+            tick_stream.subscribe({aggregator.exchange: list(aggregator.slots)}, mode=SNAP_QUOTE_MODE)
+        logger.info(f"Tracking {underlying} {expiry} chain ({len(contracts)} contracts)")
+    return aggregator
+
+@app.route('/api/chainstats/<underlying>/<expiry>')
+@feed_process_route
+def get_chain_stats(underlying, expiry):
+    """PCR, ATM straddle premium and max pain for a chain, maintained tick by tick"""
+    try:
+        underlying = underlying.upper()
+        aggregator = active_chains().get(underlying, expiry)
+        if aggregator is None:
+            if not instrument_master.loaded:
+                return jsonify({'error': 'Instrument index not built'}), 503
+            aggregator = track_chain(underlying, expiry)
+            if aggregator is None:
+                return jsonify({'error': f'No option contracts for {underlying} {expiry}'}), 404
+        
+        return jsonify({'status': 'success', 'data': aggregator.snapshot()})
+            
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/instruments/refresh', methods=['POST'])
+def refresh_instruments():
+    """Rebuild the instrument index in the background"""
+    instrument_master.refresh_async()
+    return jsonify({'success': True, 'message': 'Instrument index refresh started'})
+
+# ============ ACCOUNT CACHE ============
+
+def invalidate_account_caches(names=None):
+    """Drop cached broker responses; call with ORDER_SENSITIVE_CACHES after placing an order"""
+    for name in names or account_caches:
+        if name in account_caches:
+            account_caches[name].invalidate()
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Hit/miss counters for the account endpoint caches"""
+    return jsonify({name: cache.stats() for name, cache in account_caches.items()})
+
+@app.route('/api/cache/invalidate', methods=['POST'])
+def cache_invalidate():
+    """Invalidate account caches, by default the ones affected by order placement"""
+    data = request.get_json(silent=True) or {}
+    names = data.get('caches') or ORDER_SENSITIVE_CACHES
+    invalidate_account_caches(names)
+    return jsonify({'success': True, 'invalidated': list(names)})
+
+# ============ ALERTS ============
+
+def atm_iv(aggregator):
+    """Mean implied volatility (%) of the ATM call and put of a tracked chain"""
+    atm = aggregator.atm_index
+    if atm is None or not aggregator.spot:
+        return None
+    premiums = aggregator.ltp[:, atm]
+    if not premiums.all():
+        return None
+    iv = implied_volatility(premiums, aggregator.spot, aggregator.strikes[atm],
+                            time_to_expiry(aggregator.expiry), RISK_FREE_RATE, np.array([True, False]))
+    iv = iv[~np.isnan(iv)]
+    return round(float(iv.mean()) * 100, 2) if len(iv) else None
+
+def publish_chain_metrics():
+    """Feed PCR, ATM IV and straddle premium of each underlying's nearest chain to the alert engine"""
+    chains = active_chains()
+    for underlying in {name for name, _ in list(chains.chains)}:
+        aggregator = chains.nearest(underlying)
+        if aggregator is None:
+            continue
+        stats = aggregator.snapshot()
+        alert_engine.update(f"{underlying}:pcr", stats['pcr_oi'])
+        alert_engine.update(f"{underlying}:iv", atm_iv(aggregator))
+        alert_engine.update_jump(f"{underlying}:straddle", stats['straddle_premium'])
+
+def prune_expired_chains():
+    """Stop aggregating and streaming the tracked chains that have expired"""
+    expired = chain_registry.prune(datetime.now(IST).date())
+    if expired and tick_stream:
+        by_exchange = {}
+        for aggregator in expired:
+            by_exchange.setdefault(aggregator.exchange, []).extend(aggregator.slots)
+        tick_stream.unsubscribe(by_exchange, mode=SNAP_QUOTE_MODE)
+    for aggregator in expired:
+        logger.info(f"Dropped expired {aggregator.underlying} {aggregator.expiry} chain")
+    return expired
+
+def start_alert_monitor():
+    """Publish chain metrics to the alert engine every ALERT_INTERVAL seconds"""
+    def monitor():
+        day = None
+        while True:
+            try:
+                # Straddle jumps are measured from the day's low
+                today = datetime.now().date()
+                if today != day:
+                    alert_engine.reset_lows()
+                    prune_expired_chains()
+                    day = today
+                publish_chain_metrics()
+            except Exception as e:
+                logger.error(f"Alert monitor error: {e}")
+            time.sleep(ALERT_INTERVAL)
+    
+    threading.Thread(target=monitor, name="alert-monitor", daemon=True).start()
+    logger.info("✓ Alert monitor started")
+
+@app.route('/api/alerts', methods=['GET'])
+@feed_process_route
+def list_alerts():
+    """Alert rules, optionally for one user (?user=)"""
+    return jsonify({
+        'status': 'success',
+        'data': alert_engine.list_rules(request.args.get('user')),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/alerts', methods=['POST'])
+@feed_process_route
+def create_alerts():
+    """Create a rule ({metric, direction, threshold, mode, cooldown, message, inclusive, group, user})
+    or the Options360 preset set ({preset: 'options360', underlying, user})"""
+    data = request.get_json(silent=True) or {}
+    user = data.get('user')
+    if data.get('preset') == 'options360':
+        definitions = options360_rules(data.get('underlying', 'NIFTY').upper())
+    elif data.get('preset'):
+        return jsonify({'error': f"Unknown preset {data['preset']}"}), 400
+    else:
+        definitions = [{key: data[key] for key in ('metric', 'direction', 'threshold', 'mode', 'cooldown', 'message',
+                                                   'inclusive', 'group')
+                        if key in data}]
+    
+    try:
+        rules = [alert_engine.add_rule(user=user, **definition).to_dict() for definition in definitions]
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid alert rule: {e}'}), 400
+    
+    return jsonify({'status': 'success', 'data': rules, 'timestamp': datetime.now().isoformat()}), 201
+
+@app.route('/api/alerts/<int:rule_id>', methods=['DELETE'])
+@feed_process_route
+def delete_alert(rule_id):
+    if not alert_engine.remove_rule(rule_id):
+        return jsonify({'error': f'No alert rule {rule_id}'}), 404
+    return jsonify({'success': True, 'deleted': rule_id})
+
+@app.route('/api/alerts/events')
+@feed_process_route
+def get_alert_events():
+    """Fired alerts newer than ?since=<event id>, optionally for one user"""
+    return jsonify({
+        'status': 'success',
+        'data': alert_engine.recent_events(request.args.get('user'), request.args.get('since', default=0, type=int)),
+        'stats': alert_engine.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+# ============ PAPER TRADING ============
+
+def live_price(key):
+    """Latest price of an index (by name) or streamed option contract (by token)"""
+    return quote_store.price(key)
+
+@app.route('/api/paper/accounts', methods=['POST'])
+@feed_process_route
+def open_paper_account():
+    """Create a paper account ({account, balance})"""
+    data = request.get_json(silent=True) or {}
+    account = data.get('account')
+    if not account:
+        return jsonify({'error': 'account is required'}), 400
+    try:
+        paper_engine.open_account(account, float(data['balance']) if 'balance' in data else None)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'balance must be a number'}), 400
+    return jsonify({'status': 'success', 'data': paper_engine.account(account)}), 201
+
+@app.route('/api/paper/accounts')
+@feed_process_route
+def paper_leaderboard():
+    """Top paper accounts by total P&L (?n=20)"""
+    n = max(1, min(request.args.get('n', default=20, type=int), 500))
+    return jsonify({
+        'status': 'success',
+        'data': paper_engine.leaderboard(n),
+        'stats': paper_engine.stats(),
+        'timestamp': datetime.now().isoformat()
+    })
+
+@app.route('/api/paper/accounts/<account>')
+@feed_process_route
+def get_paper_account(account):
+    """Balance, marked-to-market P&L and positions of a paper account"""
+    summary = paper_engine.account(account)
+    if summary is None:
+        return jsonify({'error': f'No paper account {account}'}), 404
+    return jsonify({'status': 'success', 'data': summary, 'timestamp': datetime.now().isoformat()})
+
+@app.route('/api/paper/orders', methods=['POST'])
+@feed_process_route
+def place_paper_order():
+    """Place a paper order ({account, symbol, side, quantity, order_type, limit_price})"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('account') or not data.get('symbol'):
+        return jsonify({'error': 'account and symbol are required'}), 400
+    
+    key = history_key(data['symbol'])
+    paper_engine.watch(key, live_price(key))
+    try:
+        order = paper_engine.place_order(
+            data['account'], key, data.get('side', 'BUY'), data.get('quantity', 0),
+            data.get('order_type', 'MARKET'), data.get('limit_price')
+        )
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid order: {e}'}), 400
+    
+    return jsonify({'status': 'success', 'data': order.to_dict()}), 201
+
+@app.route('/api/paper/orders/<account>')
+@feed_process_route
+def get_paper_orders(account):
+    return jsonify({'status': 'success', 'data': paper_engine.account_orders(account)})
+
+@app.route('/api/paper/orders/<int:order_id>', methods=['DELETE'])
+@feed_process_route
+def cancel_paper_order(order_id):
+    order = paper_engine.cancel_order(order_id)
+    if order is None:
+        return jsonify({'error': f'No open paper order {order_id}'}), 404
+    return jsonify({'status': 'success', 'data': order.to_dict()})
+
+# ============ REPLAY ============
+
+@app.route('/api/replay', methods=['POST'])
+@feed_process_route
+def replay_start():
+    """Start a replay ({source: 'synthetic' | YYYYMMDD, speed, seed, duration, rate})"""
+    if auth_token and FEED_MODE != "replay":
+        return jsonify({'error': 'Replay is only available when the live feed is not running'}), 409
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        session_ = start_replay(
+            str(data.get('source', REPLAY_SOURCE)),
+            float(data.get('speed', REPLAY_SPEED)),
+            int(data.get('seed', 0)),
+            int(data.get('duration', 60)),
+            float(data.get('rate', 500))
+        )
+    except FileNotFoundError as e:
+        return jsonify({'error': str(e)}), 404
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': f'Invalid replay request: {e}'}), 400
+    
+    return jsonify({'status': 'success', 'data': session_.stats()}), 202
+
+@app.route('/api/replay')
+@feed_process_route
+def replay_status():
+    if replay_session is None:
+        return jsonify({'error': 'No replay has been started'}), 404
+    return jsonify({'status': 'success', 'data': replay_session.stats()})
+
+@app.route('/api/replay', methods=['DELETE'])
+@feed_process_route
+def replay_stop():
+    if replay_session is None:
+        return jsonify({'error': 'No replay has been started'}), 404
+    stop_replay()
+    return jsonify({'status': 'success', 'data': replay_session.stats()})
+
+# ============ MERGED PROVIDER FEED ============
+
+merged_hub = QuoteHub()
+
+def publish_merged(symbol, quote):
+    feed_cache.mark_changed()
+    merged_hub.publish(symbol, quote)
+
+feed_merger = FeedMerger(PROVIDERS, on_publish=publish_merged)
+
+def build_feed_payload():
+    return {
+        'status': 'success',
+        'data': dict(feed_merger.quotes),
+        'timestamp': datetime.now().isoformat()
+    }
+
+feed_cache = SnapshotCache(build_feed_payload)
+
+@app.route('/api/feed')
+@feed_process_route
+def get_feed():
+    """Freshest quote per index across all providers (canonical symbols, ltp schema)"""
+    poll_scheduler.touch()
+    return feed_cache.respond()
+
+@app.route('/api/feed/stream')
+@feed_process_route
+def stream_feed():
+    """Push merged quote changes as Server-Sent Events (optional ?symbols=A,B filter)"""
+    symbols = parse_symbols(request.args.get('symbols'))
+    return Response(
+        merged_hub.stream(symbols),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/providers')
+@feed_process_route
+def get_providers():
+    """Per-provider latency, staleness and win counts, plus who serves each symbol"""
+    live = feed_merger.live()
+    return jsonify({
+        'status': 'success',
+        'data': {'providers': feed_merger.stats(), 'sources': feed_merger.sources()},
+        'authenticated': bool(live),
+        'live': live,
+        'timestamp': datetime.now().isoformat()
+    })
+
+def start_providers():
+    """Start the secondary providers; Angel One ticks arrive through the live feed"""
+    global truedata_provider
+    
+    if 'truedata' in PROVIDERS and truedata_provider is None:
+        import truedata_server
+        truedata_provider = TrueDataPoller(feed_merger, truedata_server.fetch_all_market_data)
+        truedata_provider.start()
+
 # ============ LIVE DATA FEED ============
 
+def build_market_data_batches(instruments, batch_size=MARKET_DATA_BATCH_SIZE, exchanges=None):
+    """Group instrument tokens by exchange and split them into request-sized batches
+
+    Returns a list of ``{exchange: [tokens]}`` dicts as expected by
+    ``SmartConnect.getMarketData``. Each batch holds a single exchange.
+    ``exchanges`` maps names to exchange segments (default INSTRUMENT_EXCHANGES).
+    """
+    exchanges = INSTRUMENT_EXCHANGES if exchanges is None else exchanges
+    by_exchange = {}
+    for name, token in instruments.items():
+        exchange = exchanges.get(name, "NSE")
+        by_exchange.setdefault(exchange, []).append(str(token))
+
+    batches = []
+    for exchange, tokens in by_exchange.items():
+        for start in range(0, len(tokens), batch_size):
+            batches.append({exchange: tokens[start:start + batch_size]})
+    return batches
+
+def fetch_market_data(instruments, mode=MARKET_DATA_MODE, batch_size=MARKET_DATA_BATCH_SIZE, exchanges=None):
+    """Fetch quotes for all instruments using bulk market data requests
+
+    Returns a dict mapping symbol token to the raw quote record from Angel One.
+    A failed batch is logged and skipped so the rest of the universe still updates.
+    """
+    fetched = {}
+    for batch in build_market_data_batches(instruments, batch_size, exchanges):
+        try:
+            response = smart_api.getMarketData(mode, batch)
+        except Exception as e:
+            logger.error(f"Error fetching market data batch {list(batch)}: {e}")
+            continue
+
+        if not (response and response.get('status') and response.get('data')):
+            logger.warning(f"Invalid market data response for {list(batch)}: {response}")
+            continue
+
+        for record in response['data'].get('fetched', []):
+            fetched[str(record.get('symbolToken'))] = record
+
+        unfetched = response['data'].get('unfetched', [])
+        if unfetched:
+            logger.warning(f"Angel One could not fetch {len(unfetched)} tokens: {unfetched}")
+
+    return fetched
+
+def merge_market_data(fetched, instruments=INSTRUMENT_TOKENS):
+    """Convert fetched quote records and merge them into live_data in one pass
+
+    Returns the number of instruments updated.
+    """
+    timestamp = datetime.now().isoformat()
+    updates = {}
+    exchange_times = {}
+
+    for name, token in instruments.items():
+        data = fetched.get(str(token))
+        if not data:
+            continue
+
+        ltp = float(data.get('ltp', 0))
+        if ltp <= 0:
+            continue
+
+        close = float(data.get('close', ltp) or ltp)
+        change = ltp - close
+        change_pct = (change / close * 100) if close > 0 else 0
+
+        tick_store.append(name, ltp, data.get('tradeVolume', 0), data.get('opnInterest', 0))
+        bar_builder.on_tick(name, ltp, data.get('tradeVolume', 0))
+        quote_store.update(name, ltp, data.get('tradeVolume'), data.get('opnInterest'), None,
+                           data.get('open'), data.get('high'), data.get('low'), close)
+        exchange_times[name] = parse_exchange_time(data.get('exchFeedTime'))
+        if exchange_times[name]:
+            poll_store_lag.observe(time.time() - exchange_times[name] / 1000)
+        updates[name] = {
+            'price': round(ltp, 2),
+            'change': round(change, 2),
+            'changePct': round(change_pct, 2),
+            'volume': data.get('tradeVolume', data.get('volume', 0)),
+            'open': data.get('open', 0),
+            'high': data.get('high', 0),
+            'low': data.get('low', 0),
+            'timestamp': timestamp
+        }
+
+        logger.debug(f"{name}: ₹{ltp:.2f} ({change:+.2f}, {change_pct:+.2f}%)")
+
+    live_data.update(updates)
+    if shared_quotes is not None:
+        shared_quotes.write_many(updates)
+    if updates:
+        mark_live_data_changed()
+    for name, quote in updates.items():
+        quote_hub.publish(name, quote)
+        feed_merger.on_quote('angel', name, quote, exchange_times[name])
+        alert_engine.update(f"{name}:price", quote['price'])
+        paper_engine.on_price(name, quote['price'])
+        if name in SPOT_UNDERLYINGS:
+            chain_registry.on_spot(SPOT_UNDERLYINGS[name], quote['price'])
+    return len(updates)
+
+def merge_chain_data(fetched):
+    """Feed FULL-mode quotes of tracked option contracts into the chain aggregators"""
+    for token, data in fetched.items():
+        ltp = float(data.get('ltp', 0))
+        oi = float(data.get('opnInterest', 0))
+        volume = float(data.get('tradeVolume', 0))
+        tick_store.append(token, ltp, volume, oi)
+        bar_builder.on_tick(token, ltp, volume)
+        quote_store.update(token, ltp, volume, oi, close=data.get('close'))
+        chain_registry.on_contract(token, ltp=ltp, oi=oi, volume=volume)
+        paper_engine.on_price(token, ltp)
+
+def apply_tick(tick, store=None, chains=None):
+    """Update live_data (or a tracked option chain) from a single decoded WebSocket tick
+
+    Ticks are persisted to ``store``, by default the live tick store, and
+    option contracts are looked up in ``chains``, by default chain_registry.
+    """
+    store = store or tick_store
+    chains = chains or chain_registry
+    exchange_ms = tick.get('exchange_timestamp')
+    ts = exchange_ms * 1_000_000 if exchange_ms else None
+
+    if chains.on_contract(tick['token'], tick['ltp'], tick.get('oi'), tick.get('volume')):
+        # Option contracts only go to the array stores: nothing is allocated per tick
+        quote_store.update(tick['token'], tick['ltp'], tick.get('volume'), tick.get('oi'), ts,
+                           close=tick.get('close'))
+        store.append(tick['token'], tick['ltp'], tick.get('volume', 0), tick.get('oi', 0), ts)
+        bar_builder.on_tick(tick['token'], tick['ltp'], tick.get('volume'), ts / 1e9 if ts else None)
+        paper_engine.on_price(tick['token'], tick['ltp'])
+        return
+
+    name = TOKEN_NAMES.get(tick['token'])
+    ltp = tick['ltp']
+    if not name or ltp <= 0:
+        return
+
+    store.append(name, ltp, tick.get('volume', 0), tick.get('oi', 0), ts)
+    bar_builder.on_tick(name, ltp, tick.get('volume'), ts / 1e9 if ts else None)
+    if exchange_ms and replay_session is None:
+        stream_store_lag.observe(time.time() - exchange_ms / 1000)
+
+    previous = live_data.get(name, {})
+    close = tick.get('close') or ltp
+    quote_store.update(name, ltp, tick.get('volume'), tick.get('oi'), ts,
+                       tick.get('open'), tick.get('high'), tick.get('low'), close)
+    change = ltp - close
+    change_pct = (change / close * 100) if close > 0 else 0
+
+    quote = {
+        'price': round(ltp, 2),
+        'change': round(change, 2),
+        'changePct': round(change_pct, 2),
+        'volume': tick.get('volume', previous.get('volume', 0)),
+        'open': tick.get('open', previous.get('open', 0)),
+        'high': tick.get('high', previous.get('high', 0)),
+        'low': tick.get('low', previous.get('low', 0)),
+        'timestamp': datetime.now().isoformat()
+    }
+    live_data[name] = quote
+    if shared_quotes is not None:
+        shared_quotes.write(name, quote)
+    mark_live_data_changed()
+    quote_hub.publish(name, quote)
+    feed_merger.on_quote('angel', name, quote, exchange_ms or None)
+    alert_engine.update(f"{name}:price", ltp)
+    paper_engine.on_price(name, ltp)
+    if name in SPOT_UNDERLYINGS:
+        chains.on_spot(SPOT_UNDERLYINGS[name], ltp)
+
+def start_tick_stream():
+    """Subscribe to INSTRUMENT_TOKENS and every tracked chain over the Angel One tick WebSocket"""
+    global tick_stream
+
+    if tick_stream:
+        tick_stream.stop()
+
+    prune_expired_chains()
+
+    tokens_by_exchange = {}
+    for name, token in INSTRUMENT_TOKENS.items():
+        tokens_by_exchange.setdefault(INSTRUMENT_EXCHANGES.get(name, "NSE"), []).append(token)
+
+    # Published before the chains are read, so a chain tracked meanwhile
+    # subscribes on this stream rather than the stopped one
+    tick_stream = TickStream(auth_token, API_KEY, CLIENT_ID, feed_token, on_tick=apply_tick)
+    tick_stream.subscribe(tokens_by_exchange)
+
+    chain_tokens, chain_exchanges = chain_registry.instruments()
+    chain_by_exchange = {}
+    for name, token in chain_tokens.items():
+        chain_by_exchange.setdefault(chain_exchanges[name], []).append(token)
+    if chain_by_exchange:
+        # Chains need open interest
+        tick_stream.subscribe(chain_by_exchange, mode=SNAP_QUOTE_MODE)
+
+    tick_stream.start()
+    logger.info("✓ Live tick stream started")
+
+def start_replay(source=REPLAY_SOURCE, speed=REPLAY_SPEED, seed=0, duration=60, rate=500):
+    """Replay a recorded day or a seeded synthetic session through apply_tick
+
+    Replayed ticks are recorded under REPLAY_STORE_DIR; the live tick store
+    (and /api/ticks) is left untouched. Synthetic chains are tracked in their
+    own registry, so the live stream never subscribes their tokens.
+    """
+    global replay_session, replay_store, replay_chains, replay_saved_quotes
+
+    stop_replay()
+
+    if source == "synthetic":
+        batch, contracts = synthetic_session(seed=seed, duration=duration, rate=rate)
+    else:
+        batch, contracts = TickBatch.from_store(TICK_STORE_DIR, source), []
+
+    chains = ChainRegistry()
+    for underlying in {c['underlying'] for c in contracts}:
+        chain = [c for c in contracts if c['underlying'] == underlying]
+        chains.track(underlying, chain[0]['expiry'], chain)
+
+    replay_chains = chains
+    replay_saved_quotes = {name: dict(quote) for name, quote in live_data.items()}
+    store = replay_store = TickStore(REPLAY_STORE_DIR)
+    replay_session = TickReplay(batch, lambda tick: apply_tick(tick, store, chains), speed=speed,
+                                tokens=INSTRUMENT_TOKENS)
+    replay_session.start()
+    logger.info(f"✓ Replaying {len(batch)} ticks from {source} at {speed or 'max'}x")
+    return replay_session
+
+def stop_replay():
+    """Stop the running replay (if any), flush what it recorded and drop its market state
+
+    The replay's chains are discarded and live_data goes back to what it was
+    before the replay. Quotes, bars, paper trading prices, alert metric values
+    and merged quotes only hold replayed prices by then, so they start over.
+    """
+    global replay_chains, replay_saved_quotes, quote_store, bar_builder
+
+    if replay_session:
+        replay_session.stop()
+    if replay_store:
+        replay_store.flush()
+    if replay_saved_quotes is None:
+        return
+
+    saved, replay_chains, replay_saved_quotes = replay_saved_quotes, None, None
+    for name in [name for name in live_data if name not in saved]:
+        del live_data[name]
+    live_data.update(saved)
+    if shared_quotes is not None:
+        shared_quotes.write_many(saved)
+    mark_live_data_changed()
+    for name, quote in saved.items():
+        quote_hub.publish(name, quote)
+
+    quote_store = QuoteStore()
+    bar_builder = BarBuilder()
+    paper_engine.clear_prices()
+    alert_engine.reset_values()
+    feed_merger.clear()
+    logger.info("✓ Replay state cleared")
+
+def active_chains():
+    """The replay's chain registry while a replay is loaded, else the live one"""
+    return replay_chains if replay_chains is not None else chain_registry
+
 def start_live_feed():
+    """Start the live market data feed from Angel One (plus the other providers)"""
+    if not is_feed_process():
+        # Only the elected worker may poll the broker and write the shared segment
+        logger.warning("Live feed requested in a non-feed worker, ignored")
+        return
+    if FEED_MODE == "replay":
+        start_replay()
+        return
+    # A replay left loaded would keep serving its prices and chains
+    stop_replay()
+    if FEED_MODE == "stream" and feed_token:
+        start_tick_stream()
+    else:
+        start_live_polling()
+    start_providers()
+
+# Polled instruments get their own intervals from the NSE/BSE session phase,
+# subscriber demand and how recently they changed (see poll_scheduler.py)
+OPTION_CHAINS = 'option-chains'  # scheduler key for the tracked option chains
+
+def poll_demand(name):
+    """Push subscribers of an instrument; every tracked option chain counts as one"""
+    if name == OPTION_CHAINS:
+        return len(chain_registry.chains)
+    return quote_hub.demand(name)
+
+poll_scheduler = PollScheduler(list(INSTRUMENT_TOKENS) + [OPTION_CHAINS], demand=poll_demand)
+quote_hub.on_subscribe = lambda sub: poll_scheduler.wake()
+
+def poll_live_data(due):
+    """Fetch and merge the due instruments; False when nothing came back"""
+    instruments = {name: INSTRUMENT_TOKENS[name] for name in due if name in INSTRUMENT_TOKENS}
+    if instruments:
+        before = {name: live_data.get(name, {}).get('price') for name in instruments}
+        if not merge_market_data(fetch_market_data(instruments), instruments):
+            return False
+        for name in instruments:
+            poll_scheduler.record(name, live_data[name].get('price') != before[name])
+    
+    # Tracked option chains need OI and volume, so they use FULL mode
+    if OPTION_CHAINS in due:
+        if chain_registry.chains:
+            chain_tokens, chain_exchanges = chain_registry.instruments()
+            merge_chain_data(fetch_market_data(chain_tokens, mode="FULL", exchanges=chain_exchanges))
+        poll_scheduler.record(OPTION_CHAINS, bool(chain_registry.chains))
+    return True
+
+def start_live_polling():
     """Start polling for live market data from Angel One"""
     def fetch_live_data():
-        import time
-        error_count = 0
-        max_errors = 5
-        
         while True:
+            if not auth_token:
+                logger.warning("Not authenticated, skipping live data fetch")
+                time.sleep(5)
+                continue
+            
+            due = poll_scheduler.due()
+            if not due:
+                poll_scheduler.wait()
+                continue
+            
             try:
-                if not auth_token:
-                    logger.warning("Not authenticated, skipping live data fetch")
-                    time.sleep(5)
-                    continue
-                
-                # Fetch LTP for indices
-                for name, token in INSTRUMENT_TOKENS.items():
-                    try:
-                        # Determine exchange based on index
-                        exchange = "NSE" if name != "SENSEX" else "BSE"
-                        symbol_name = "SENSEX" if name == "SENSEX" else name
-                        
-                        # Get LTP data from Angel One
-                        response = smart_api.ltpData(exchange, symbol_name, token)
-                        
-                        if response and response.get('status') and response.get('data'):
-                            data = response['data']
-                            ltp = float(data.get('ltp', 0))
-                            close = float(data.get('close', ltp))
-                            
-                            if ltp > 0:
-                                change = ltp - close
-                                change_pct = (change / close * 100) if close > 0 else 0
-                                
-                                live_data[name] = {
-                                    'price': round(ltp, 2),
-                                    'change': round(change, 2),
-                                    'changePct': round(change_pct, 2),
-                                    'volume': data.get('volume', 0),
-                                    'open': data.get('open', 0),
-                                    'high': data.get('high', 0),
-                                    'low': data.get('low', 0),
-                                    'timestamp': datetime.now().isoformat()
-                                }
-                                
-                                logger.info(f"{name}: ₹{ltp:.2f} ({change:+.2f}, {change_pct:+.2f}%)")
-                                error_count = 0
-                        else:
-                            logger.warning(f"Invalid response for {name}: {response}")
-                    
-                    except Exception as e:
-                        logger.error(f"Error fetching {name}: {e}")
-                        error_count += 1
-                
-                if error_count > max_errors:
-                    logger.error(f"Too many errors ({error_count}), stopping live feed")
-                    break
-                
-                # Wait 2 seconds before next fetch
-                time.sleep(2)
-                
+                with poll_cycle.time():
+                    ok = poll_live_data(due)
+                if not ok:
+                    delay = poll_scheduler.failure(due)
+                    logger.warning(f"No market data received, retrying in {delay:.1f}s")
             except Exception as e:
-                logger.error(f"Live data fetch error: {e}")
-                error_count += 1
-                if error_count > max_errors:
-                    logger.error("Too many errors, stopping live feed")
-                    break
-                time.sleep(5)
+                delay = poll_scheduler.failure(due)
+                logger.error(f"Live data fetch error: {e}; retrying in {delay:.1f}s")
     
     # Start in background thread
-    feed_thread = threading.Thread(target=fetch_live_data, daemon=True)
+    feed_thread = threading.Thread(target=fetch_live_data, name="angel-feed", daemon=True)
     feed_thread.start()
     logger.info("✓ Live data feed thread started")
 
+# ============ MULTI-WORKER SERVING ============
+
+def share_session():
+    """Publish the broker session to the other workers (feed process only)"""
+    if shared_quotes is not None and feed_election and feed_election.leader:
+        shared_quotes.set_session({'auth_token': auth_token, 'feed_token': feed_token,
+                                   'refresh_token': refresh_token})
+
+@app.before_request
+def sync_shared_session():
+    """Adopt the session the feed process logged in with (non-feed workers only)"""
+    global auth_token, feed_token, refresh_token
+    
+    if shared_quotes is None or feed_election.leader:
+        return
+    broker_session = shared_quotes.session()
+    if not broker_session or broker_session['auth_token'] == auth_token:
+        return
+    auth_token, feed_token, refresh_token = (broker_session['auth_token'], broker_session['feed_token'],
+                                             broker_session['refresh_token'])
+    smart_api.setAccessToken(auth_token.replace("Bearer ", "", 1))
+    smart_api.setRefreshToken(refresh_token)
+    smart_api.setFeedToken(feed_token)
+    smart_api.setUserId(CLIENT_ID)
+    invalidate_account_caches()
+
+def start_shared_quote_relay():
+    """Re-publish shared-segment changes to this worker's SSE subscribers"""
+    def relay():
+        generation, stamps = None, {}
+        while True:
+            time.sleep(SHARED_RELAY_INTERVAL)
+            if feed_election.leader or shared_quotes.generation == generation:
+                continue
+            generation = shared_quotes.generation
+            for name, quote in shared_quotes.snapshot().items():
+                if stamps.get(name) != quote['timestamp']:
+                    stamps[name] = quote['timestamp']
+                    quote_hub.publish(name, quote)
+    
+    threading.Thread(target=relay, name="shared-quote-relay", daemon=True).start()
+
+def start_feed_producer():
+    """Start everything only the elected feed process runs"""
+    serve_forwarded_requests()
+    if shared_quotes is not None:
+        shared_quotes.write_many(live_data)
+    if not instrument_master.loaded:
+        instrument_master.refresh_async()
+    instrument_master.start_daily_refresh()
+    start_alert_monitor()
+    if FEED_MODE == "replay" or authenticate_angel_one():
+        start_live_feed()
+    else:
+        logger.warning("Feed worker could not authenticate; POST /authenticate to log in")
+
+def enable_shared_quotes(store, lock_path):
+    """Serve quotes from a shared segment and campaign to become the feed process"""
+    global shared_quotes, feed_election, indices_cache
+    
+    shared_quotes = store
+    feed_election = FeedElection(lock_path)
+    indices_cache = SnapshotCache(build_indices_payload, version=lambda: store.generation)
+    start_shared_quote_relay()
+    feed_election.start(start_feed_producer)
+
+# ============ METRICS ============
+
+# Hot-path histogram children, bound once (see metrics.py)
+poll_cycle = metrics.feed_cycle.labels('angel_one')
+poll_store_lag = metrics.tick_store_lag.labels('angel_one_poll')
+stream_store_lag = metrics.tick_store_lag.labels('angel_one_stream')
+
+def quote_ages():
+    """Seconds since each index quote was last updated, read at scrape time"""
+    now = time.time()
+    ages = {}
+    for name, quote in current_quotes().items():
+        if quote.get('timestamp'):
+            ages[(name,)] = round(now - datetime.fromisoformat(quote['timestamp']).timestamp(), 3)
+    return ages
+
+metrics.registry.gauge('quote_age_seconds', 'Seconds since the index quote was last updated',
+                       quote_ages, ('symbol',))
+metrics.registry.gauge('provider_staleness_seconds', 'Seconds since the provider last delivered a tick',
+                       lambda: {(name,): round(time.time() - stats.last_received, 3)
+                                for name, stats in feed_merger.providers.items() if stats.last_received},
+                       ('provider',))
+metrics.cache_collectors('broker_cache', lambda: {**account_caches, 'quotes': quote_cache,
+                                                  'option_premiums': option_premium_cache})
+metrics.snapshot_collectors('snapshot', lambda: {'indices': indices_cache, 'feed': feed_cache})
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of latency histograms, staleness and cache counters
+
+    Under serve.py each worker keeps its own counters, so a scrape reflects
+    the worker that answered it.
+    """
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+# ============ PROFILING ============
+
+# /api/admin/profile start, status and stop (see profiler.py)
+profiler.register(app)
+
 # ============ HEALTH CHECK ============
 
-@app.route('/health')
-def health():
-    """Health check endpoint with detailed status"""
-    return jsonify({
+def mark_live_data_changed():
+    """Invalidate cached snapshots after live_data or auth state changes"""
+    indices_cache.mark_changed()
+
+def build_health_payload():
+    """Payload for /health"""
+    return {
         'status': 'operational',
         'timestamp': datetime.now().isoformat(),
         'authentication': {
@@ -390,18 +1678,57 @@ def health():
             'client_id': CLIENT_ID,
             'has_auth_token': bool(auth_token),
             'has_feed_token': bool(feed_token),
-            'has_refresh_token': bool(refresh_token)
+            'has_refresh_token': bool(refresh_token),
+            'session': angel_session.stats()
         },
-        'live_data': live_data,
+        'feed': {
+            'mode': FEED_MODE,
+            'stream_connected': bool(tick_stream and tick_stream.connected.is_set()),
+            'ticks_received': tick_stream.tick_count if tick_stream else 0,
+            'reconnects': tick_stream.reconnects if tick_stream else 0,
+            'push_subscribers': quote_hub.subscriber_count,
+            'market_phase': poll_scheduler.calendar.phase()
+        },
+        'live_data': current_quotes(),
         'available_endpoints': [
-            '/api/indices - Live index prices',
+            '/api/indices?since=<seq> - Live index prices (only changes since seq; msgpack via Accept)',
+            '/api/stream?symbols=<a,b> - Live price push (Server-Sent Events)',
+            '/api/feed - Freshest quote per index across Angel One and TrueData',
+            '/api/feed/stream?symbols=<a,b> - Merged feed push (Server-Sent Events)',
+            '/api/providers - Per-provider latency, staleness and failovers',
+            '/api/ticks/<symbol>?from=&to= - Recorded ticks (epoch ms range)',
+            '/api/bars/<symbol>?tf=5m&n=200 - OHLCV bars with indicators',
+            '/api/predict?symbols=<a,b> - Batch trend prediction',
+            '/api/alerts - Alert rules (GET, POST, DELETE /api/alerts/<id>)',
+            '/api/alerts/events?since=<id> - Fired alerts',
+            '/api/paper/orders - Paper trading orders (POST, GET /<account>, DELETE /<id>)',
+            '/api/paper/accounts/<account> - Paper account P&L and positions',
+            '/api/replay - Tick replay (POST to start, GET status, DELETE to stop)',
             '/api/quote/<symbol> - Quote for specific symbol',
+            '/api/quotes?symbols=<a,b> - Quotes for several symbols',
+            '/api/snapshot?keys=<a,b>&format=columns - Latest quote of every streamed instrument',
+            '/api/instruments/<token|symbol> - Instrument lookup',
+            '/api/instruments/options/<underlying> - Option contracts by expiry/strike',
+            '/api/optionchain/<underlying>/<expiry> - Option chain with IV and Greeks',
+            '/api/chainstats/<underlying>/<expiry> - PCR, ATM straddle and max pain',
             '/api/positions - Your positions',
             '/api/holdings - Your holdings',
             '/api/orderbook - Order history',
-            '/api/profile - Your profile'
+            '/api/profile - Your profile',
+            '/api/cache/stats - Account cache hit/miss counters',
+            '/metrics - Prometheus latency histograms, staleness and cache counters',
+            '/api/admin/profile - Sampling profiler (POST to start, GET status, DELETE to stop and dump)'
         ]
-    })
+    }
+
+@app.route('/health')
+def health():
+    """Health check endpoint with detailed status
+
+    Built on every request: stream, session and market-phase state change
+    without a quote arriving, so it cannot be cached on the quote version.
+    """
+    return jsonify(build_health_payload())
 
 @app.route('/')
 def home():
@@ -562,6 +1889,7 @@ TOTP_SECRET = "your_totp" # (if you have 2FA)</div>
             <div class="endpoints">
                 <h3 style="margin-bottom: 15px;">📡 Available API Endpoints</h3>
                 <div class="endpoint"><span class="endpoint-method">GET</span>/api/indices</div>
+                <div class="endpoint"><span class="endpoint-method">GET</span>/api/stream?symbols=NIFTY 50</div>
                 <div class="endpoint"><span class="endpoint-method">GET</span>/api/quote/RELIANCE</div>
                 <div class="endpoint"><span class="endpoint-method">GET</span>/api/positions</div>
                 <div class="endpoint"><span class="endpoint-method">GET</span>/api/holdings</div>
@@ -589,15 +1917,26 @@ if __name__ == '__main__':
     print(f"📊 Health Check: http://localhost:5001/health")
     print("=" * 70)
     
-    # Try auto-authentication on startup
-    print("\n⏳ Attempting auto-authentication...")
-    if authenticate_angel_one():
-        print("✓ Auto-authentication successful!")
+    # Build the instrument index on first run, then refresh it daily before market open
+    if not instrument_master.loaded:
+        instrument_master.refresh_async()
+    instrument_master.start_daily_refresh()
+    start_alert_monitor()
+    
+    if FEED_MODE == "replay":
+        # Replay needs no broker session
+        print(f"\n⏪ Replay mode: {REPLAY_SOURCE} at {REPLAY_SPEED or 'max'}x")
         start_live_feed()
     else:
-        print("⚠️  Auto-authentication failed. Please click /login to authenticate manually.")
+        # Try auto-authentication on startup
+        print("\n⏳ Attempting auto-authentication...")
+        if authenticate_angel_one():
+            print("✓ Auto-authentication successful!")
+            start_live_feed()
+        else:
+            print("⚠️  Auto-authentication failed. Please click /login to authenticate manually.")
     
     print("\n⚠️  Security Note: Keep PASSWORD and API_KEY secure!")
     print("=" * 70 + "\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5001, use_reloader=False)
+    app.run(debug=True, host='0.0.0.0', port=5001, use_reloader=False, threaded=True)
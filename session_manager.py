@@ -0,0 +1,188 @@
+"""
+Broker Session Manager
+Keeps a broker session valid in the background so neither the feed thread nor
+HTTP handlers wait on a login round trip. Token expiry is read from the JWT
+(or assumed from a configured lifetime), and the session is renewed shortly
+before it expires, with the broker's refresh token where one is available and
+a full login otherwise. Only one renewal is ever in flight: every caller that
+needs a fresh session waits on the same future, and the new session replaces
+the old one in a single assignment.
+"""
+
+import base64
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIFETIME = 8 * 3600  # seconds, for tokens that carry no expiry
+REFRESH_MARGIN = 600         # renew this long before expiry...
+REFRESH_FRACTION = 0.8       # ...or after this fraction of the lifetime, whichever is earlier
+RETRY_BASE = 5               # seconds before the first retry of a failed renewal
+RETRY_MAX = 300
+
+def jwt_expiry(token):
+    """``exp`` claim (epoch seconds) of a JWT, or None if the token is not a JWT"""
+    try:
+        payload = str(token).replace('Bearer ', '', 1).split('.')[1]
+        claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+        return float(claims['exp'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+class BrokerSession:
+    """One set of broker tokens with the time they stop being valid"""
+
+    __slots__ = ('tokens', 'obtained_at', 'expires_at')
+
+    def __init__(self, tokens, lifetime=DEFAULT_LIFETIME):
+        self.tokens = dict(tokens)
+        self.obtained_at = time.time()
+        self.expires_at = jwt_expiry(self.tokens.get('auth_token')) or self.obtained_at + lifetime
+
+    @property
+    def token(self):
+        return self.tokens.get('auth_token')
+
+    def renew_at(self):
+        lifetime = self.expires_at - self.obtained_at
+        return min(self.expires_at - REFRESH_MARGIN, self.obtained_at + lifetime * REFRESH_FRACTION)
+
+    def valid(self, now=None):
+        return (time.time() if now is None else now) < self.expires_at
+
+class SessionManager:
+    """Single-flight, ahead-of-expiry renewal of one broker session
+
+    ``login()`` and ``refresh(tokens)`` return a token dict (with at least
+    ``auth_token``) or None; ``refresh`` is optional. ``on_renewed(session)``
+    runs after every new session is installed.
+    """
+
+    def __init__(self, name, login, refresh=None, on_renewed=None, lifetime=DEFAULT_LIFETIME):
+        self.name = name
+        self.login = login
+        self.refresh = refresh
+        self.on_renewed = on_renewed
+        self.lifetime = lifetime
+        self.session = None
+        self.logins = 0
+        self.refreshes = 0
+        self.failures = 0
+        self._inflight = None
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+
+    def adopt(self, tokens):
+        """Install tokens obtained elsewhere (e.g. a manual TOTP login)"""
+        self._install(BrokerSession(tokens, self.lifetime))
+        return self.session
+
+    def _install(self, session):
+        self.session = session
+        self._changed.set()
+        if self.on_renewed:
+            self.on_renewed(session)
+
+    def renew(self, rejected=None, login=False, wait=True):
+        """Start (or join) the in-flight renewal
+
+        ``rejected`` is a token the broker refused; if the current session
+        already holds a different one, it is returned without renewing.
+        ``login`` skips the refresh token. Returns the new session (or None on
+        failure), or the Future itself when ``wait`` is False.
+        """
+        with self._lock:
+            current = self.session
+            if rejected is not None and current and current.token != rejected and current.valid():
+                future = Future()
+                future.set_result(current)
+            elif self._inflight is not None:
+                future = self._inflight
+            else:
+                future = self._inflight = Future()
+                threading.Thread(target=self._renew, args=(future, login), name=f"{self.name}-session-renew",
+                                 daemon=True).start()
+        return future.result() if wait else future
+
+    def _renew(self, future, login):
+        session = None
+        try:
+            current = self.session
+            if not login and self.refresh and current and current.valid():
+                try:
+                    tokens = self.refresh(current.tokens)
+                except Exception as e:
+                    logger.warning(f"{self.name} token refresh error: {e}")
+                    tokens = None
+                if tokens:
+                    self.refreshes += 1
+                    session = BrokerSession({**current.tokens, **tokens}, self.lifetime)
+                else:
+                    logger.warning(f"{self.name} token refresh failed, logging in again")
+            if session is None:
+                tokens = self.login()
+                if tokens:
+                    self.logins += 1
+                    session = BrokerSession(tokens, self.lifetime)
+            if session is None:
+                self.failures += 1
+            else:
+                self.failures = 0
+                self._install(session)
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"{self.name} session renewal error: {e}")
+        finally:
+            with self._lock:
+                self._inflight = None
+            future.set_result(session)
+
+    def current(self):
+        """A valid session, renewing (and waiting) only if there is none"""
+        session = self.session
+        if session is not None and session.valid():
+            return session
+        return self.renew()
+
+    def start(self):
+        """Renew in the background ahead of every expiry"""
+        if self._thread is not None:
+            return
+
+        def refresher():
+            while True:
+                session = self.session
+                if session is None:
+                    # Nothing to keep alive until someone logs in
+                    self._changed.wait()
+                    self._changed.clear()
+                    continue
+                if self.failures:
+                    delay = min(RETRY_MAX, RETRY_BASE * 2 ** (self.failures - 1))
+                else:
+                    delay = session.renew_at() - time.time()
+                if delay > 0 and self._changed.wait(delay):
+                    self._changed.clear()
+                    continue
+                logger.info(f"Renewing {self.name} session ahead of expiry")
+                self.renew()
+
+        self._thread = threading.Thread(target=refresher, name=f"{self.name}-session-refresher", daemon=True)
+        self._thread.start()
+
+    def stats(self):
+        session = self.session
+        return {
+            'authenticated': bool(session and session.valid()),
+            'expires_in_s': round(session.expires_at - time.time()) if session else None,
+            'renews_in_s': round(session.renew_at() - time.time()) if session else None,
+            'logins': self.logins,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'renewing': self._inflight is not None
+        }
@@ -0,0 +1,346 @@
+"""
+Shared-Memory Quote Store
+One fixed-layout quote segment shared by every HTTP worker process. A single
+elected feed process writes records; any number of workers read them without
+locks. Each record carries a seqlock counter: the writer makes it odd before
+changing the record and even afterwards, and a reader retries any record whose
+counter was odd or changed while it was being copied. A segment-wide
+generation counter tells readers when anything changed, so they can keep
+serving a cached snapshot until it moves.
+
+The feed election uses an exclusive flock on a lock file. The OS releases the
+lock when its holder dies, so a standby worker takes the feed over. The winner
+writes its pid and a private loopback address into the lock file, so the other
+workers can forward requests for feed-process state to it.
+
+Run this module directly for a read/write throughput benchmark:
+    python3 shared_quotes.py
+"""
+
+import fcntl
+import json
+import logging
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+from multiprocessing import shared_memory
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = 0x51554F5445533031  # "QUOTES01"
+DEFAULT_CAPACITY = 256
+SESSION_BYTES = 4096
+SYMBOL_BYTES = 32
+ELECTION_INTERVAL = 2  # seconds between takeover attempts by standby workers
+
+HEADER_DTYPE = np.dtype([
+    ('magic', '<u8'),
+    ('capacity', '<u8'),
+    ('count', '<u8'),          # slots assigned so far (writer only)
+    ('generation', '<u8'),     # bumped after every record or session write
+    ('session_seq', '<u8'),    # seqlock over the session blob
+    ('writer_pid', '<u8'),
+    ('session_length', '<u8'),
+    ('session', f'S{SESSION_BYTES}')
+])
+
+RECORD_DTYPE = np.dtype([
+    ('seq', '<u8'),
+    ('ts_ns', '<i8'),
+    ('price', '<f8'),
+    ('change', '<f8'),
+    ('change_pct', '<f8'),
+    ('volume', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('symbol', f'S{SYMBOL_BYTES}')
+])
+
+# Record body after the seq counter, packed in one store per write
+_BODY = struct.Struct('<qdddqddd')  # ts_ns, price, change, change_pct, volume, open, high, low
+
+def _segment_size(capacity):
+    return HEADER_DTYPE.itemsize + capacity * RECORD_DTYPE.itemsize
+
+class SharedQuoteStore:
+    """Quote records in a named shared-memory segment
+
+    Use ``create`` in the process that owns the segment's lifetime and
+    ``attach`` everywhere else. Only one process may call the write methods.
+    """
+
+    def __init__(self, shm, owner=False):
+        self.shm = shm
+        self.owner = owner
+        self.header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        capacity = int(self.header['capacity'])
+        self.records = np.ndarray((capacity,), dtype=RECORD_DTYPE, buffer=shm.buf, offset=HEADER_DTYPE.itemsize)
+        # Plain uint64 views of the hot counters avoid structured-field lookups
+        self._seq = np.ndarray((capacity,), dtype='<u8', buffer=shm.buf, offset=HEADER_DTYPE.itemsize,
+                               strides=(RECORD_DTYPE.itemsize,))
+        self._generation = np.ndarray((1,), dtype='<u8', buffer=shm.buf,
+                                      offset=HEADER_DTYPE.fields['generation'][1])
+        self._slots = {}
+        self._names = []
+        self._session_seq = None
+        self._session = None
+        # An attached store may already hold records, and may later take the
+        # writer role over from a process that assigned them
+        self._sync_names()
+
+    @classmethod
+    def create(cls, name, capacity=DEFAULT_CAPACITY):
+        """Create (or recreate) the segment; the creator unlinks it on close"""
+        try:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        shm = shared_memory.SharedMemory(name=name, create=True, size=_segment_size(capacity))
+        shm.buf[:_segment_size(capacity)] = bytes(_segment_size(capacity))
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)
+        header['capacity'] = capacity
+        header['magic'] = MAGIC
+        del header
+        return cls(shm, owner=True)
+
+    @classmethod
+    def attach(cls, name):
+        shm = shared_memory.SharedMemory(name=name)
+        if int(np.ndarray((), dtype=HEADER_DTYPE, buffer=shm.buf)['magic']) != MAGIC:
+            shm.close()
+            raise ValueError(f"Shared memory segment {name} is not a quote store")
+        return cls(shm)
+
+    def close(self):
+        self.header = self.records = self._seq = self._generation = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    @property
+    def generation(self):
+        return int(self._generation[0])
+
+    def _sync_names(self, count=None):
+        """Learn the symbols of records assigned since the last call (by any process)"""
+        count = int(self.header['count']) if count is None else count
+        for raw in self.records['symbol'][len(self._names):count].tolist():
+            name = raw.decode('utf-8')
+            self._slots[name] = len(self._names)
+            self._names.append(name)
+
+    # ============ WRITER ============
+
+    def _slot(self, symbol):
+        slot = self._slots.get(symbol)
+        if slot is None:
+            self._sync_names()
+            slot = self._slots.get(symbol)
+            if slot is not None:
+                return slot
+            slot = int(self.header['count'])
+            if slot >= len(self.records):
+                raise ValueError(f"Quote store is full ({len(self.records)} symbols)")
+            record = self.records[slot:slot + 1]
+            record['symbol'] = symbol.encode('utf-8')[:SYMBOL_BYTES]
+            self.header['count'] = slot + 1
+            self._slots[symbol] = slot
+            self._names.append(symbol)
+        return slot
+
+    def write(self, symbol, quote):
+        """Store one quote dict (the live_data shape) under the record's seqlock"""
+        slot = self._slot(symbol)
+        body = _BODY.pack(
+            time.time_ns(), quote.get('price') or 0, quote.get('change') or 0, quote.get('changePct') or 0,
+            int(quote.get('volume') or 0), quote.get('open') or 0, quote.get('high') or 0, quote.get('low') or 0
+        )
+        start = HEADER_DTYPE.itemsize + slot * RECORD_DTYPE.itemsize + 8
+        seq = int(self._seq[slot])
+        self._seq[slot] = seq + 1
+        self.shm.buf[start:start + _BODY.size] = body
+        self._seq[slot] = seq + 2
+        self._generation[0] += 1
+
+    def write_many(self, quotes):
+        for symbol, quote in quotes.items():
+            self.write(symbol, quote)
+
+    def set_session(self, session):
+        """Publish broker session tokens (a small JSON-serializable dict) to readers"""
+        blob = json.dumps(session).encode('utf-8')
+        if len(blob) > SESSION_BYTES:
+            raise ValueError("Session does not fit the shared segment")
+        seq = int(self.header['session_seq'])
+        self.header['session_seq'] = seq + 1
+        self.header['session'] = blob
+        self.header['session_length'] = len(blob)
+        self.header['writer_pid'] = os.getpid()
+        self.header['session_seq'] = seq + 2
+        self._generation[0] += 1
+
+    # ============ READERS ============
+
+    def snapshot(self):
+        """{symbol: quote} of every record, each copied consistently"""
+        count = int(self.header['count'])
+        start = HEADER_DTYPE.itemsize
+        while True:
+            copy = np.frombuffer(bytes(self.shm.buf[start:start + count * RECORD_DTYPE.itemsize]), RECORD_DTYPE)
+            # Records being written (odd) or rewritten while copying are copied again
+            if not ((copy['seq'] & 1).any() or (copy['seq'] != self._seq[:count]).any()):
+                break
+            time.sleep(0)
+
+        if len(self._names) < count:
+            self._sync_names(count)
+        quotes = {}
+        for i, (_, ts_ns, price, change, change_pct, volume, open_, high, low, _symbol) in enumerate(copy.tolist()):
+            quotes[self._names[i]] = {
+                'price': price,
+                'change': change,
+                'changePct': change_pct,
+                'volume': volume,
+                'open': open_,
+                'high': high,
+                'low': low,
+                'timestamp': datetime.fromtimestamp(ts_ns / 1e9).isoformat() if ts_ns else None
+            }
+        return quotes
+
+    def session(self):
+        """Latest published session dict, or None; (re)parsed only when it changed"""
+        while True:
+            seq = int(self.header['session_seq'])
+            if seq == self._session_seq:
+                return self._session
+            if seq & 1:
+                time.sleep(0)
+                continue
+            length = int(self.header['session_length'])
+            blob = bytes(self.header['session'])[:length]
+            if int(self.header['session_seq']) == seq:
+                self._session_seq = seq
+                self._session = json.loads(blob) if length else None
+                return self._session
+
+# ============ FEED ELECTION ============
+
+class FeedElection:
+    """Exactly one process holds the feed lock; the others wait to take it over"""
+
+    def __init__(self, path, interval=ELECTION_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.leader = False
+        self._file = None
+
+    def try_acquire(self):
+        if self.leader:
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        handle = open(self.path, 'a+')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._file = handle
+        self.leader = True
+        return True
+
+    def advertise(self, address):
+        """Publish the host:port the leader serves forwarded requests on"""
+        self._file.seek(0)
+        self._file.truncate()
+        self._file.write(f"{os.getpid()} {address}")
+        self._file.flush()
+
+    def leader_address(self):
+        """host:port advertised by the current leader, or None before it has advertised"""
+        try:
+            with open(self.path) as f:
+                fields = f.read().split()
+        except FileNotFoundError:
+            return None
+        return fields[1] if len(fields) == 2 else None
+
+    def start(self, on_elected):
+        """Call on_elected once this process wins; standby processes keep retrying"""
+        def campaign():
+            while not self.try_acquire():
+                time.sleep(self.interval)
+            logger.info(f"✓ Process {os.getpid()} elected feed producer")
+            on_elected()
+
+        threading.Thread(target=campaign, name="feed-election", daemon=True).start()
+
+# ============ BENCHMARK ============
+
+def _reader(name, seconds, counter):
+    store = SharedQuoteStore.attach(name)
+    reads, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        store.snapshot()
+        reads += 1
+    with counter.get_lock():
+        counter.value += reads
+    store.close()
+
+def benchmark(symbols=3, seconds=2.0, max_readers=None):
+    import multiprocessing
+
+    name = f"quotes-bench-{os.getpid()}"
+    store = SharedQuoteStore.create(name)
+    quote = {'price': 23500.0, 'change': 10.0, 'changePct': 0.04, 'volume': 1000,
+             'open': 23490.0, 'high': 23510.0, 'low': 23480.0}
+    names = ['NIFTY 50', 'SENSEX', 'BANK NIFTY'][:symbols] + [f"SYM{i}" for i in range(symbols - 3)]
+    try:
+        start = time.perf_counter()
+        for i in range(100_000):
+            store.write(names[i % len(names)], quote)
+        write_us = (time.perf_counter() - start) / 100_000 * 1e6
+
+        start = time.perf_counter()
+        for _ in range(20_000):
+            store.snapshot()
+        read_us = (time.perf_counter() - start) / 20_000 * 1e6
+
+        print(f"Shared quote store benchmark ({len(names)} symbols, {os.cpu_count()} CPUs)")
+        print(f"  write        : {write_us:8.2f} us/quote")
+        print(f"  snapshot     : {read_us:8.2f} us/read (single process, no writer)")
+
+        # Concurrent readers in separate processes while this process keeps writing
+        context = multiprocessing.get_context('fork')
+        readers = 1
+        while readers <= (max_readers or os.cpu_count() or 1):
+            counter = context.Value('q', 0)
+            procs = [context.Process(target=_reader, args=(name, seconds, counter)) for _ in range(readers)]
+            for p in procs:
+                p.start()
+            writes, deadline = 0, time.perf_counter() + seconds
+            while time.perf_counter() < deadline:
+                store.write(names[writes % len(names)], quote)
+                writes += 1
+                time.sleep(0.0005)
+            for p in procs:
+                p.join()
+            print(f"  {readers:2d} reader process(es): {counter.value / seconds:12,.0f} snapshots/s "
+                  f"with {writes / seconds:,.0f} writes/s")
+            readers *= 2
+    finally:
+        store.close()
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,180 @@
+"""
+Versioned Snapshot Cache
+Holds the latest payload of a read-heavy endpoint as ready-to-send JSON bytes.
+The feed marks the cache as changed; the next request builds one immutable
+snapshot (body, ETag and lazily a gzip copy) that every later request for the
+same version is served from. Clients sending a matching If-None-Match get 304.
+Clients that list application/msgpack in Accept above JSON get a MessagePack
+body instead, when the optional msgpack package is installed.
+
+Run this module directly to compare JSON and MessagePack payloads:
+    python3 snapshot_cache.py
+"""
+
+import gzip
+import hashlib
+import itertools
+import json
+import threading
+import time
+
+from flask import Response, request
+
+try:
+    import msgpack
+except ImportError:  # optional: JSON is served to everyone without it
+    msgpack = None
+
+GZIP_MIN_SIZE = 512  # bytes; smaller bodies are sent uncompressed
+MSGPACK_MIMETYPE = 'application/msgpack'
+MSGPACK_MIMETYPES = (MSGPACK_MIMETYPE, 'application/x-msgpack')
+
+def encode_json(payload):
+    return json.dumps(payload, separators=(',', ':')).encode('utf-8')
+
+def wants_msgpack():
+    """Whether the request's Accept header prefers MessagePack over JSON"""
+    if msgpack is None:
+        return False
+    # JSON is listed first so that */* and missing Accept headers keep JSON
+    best = request.accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+def encoded_response(payload, status=200):
+    """Uncached payload as JSON or, when negotiated, MessagePack"""
+    if wants_msgpack():
+        response = Response(msgpack.packb(payload), status=status, mimetype=MSGPACK_MIMETYPE)
+    else:
+        response = Response(encode_json(payload), status=status, mimetype='application/json')
+    response.headers['Vary'] = 'Accept'
+    return response
+
+class Snapshot:
+    """One immutable version of an endpoint payload"""
+
+    __slots__ = ('version', 'payload', 'body', 'etag', '_gzipped', '_packed', '_lock')
+
+    def __init__(self, version, payload):
+        self.version = version
+        self.payload = payload
+        self.body = encode_json(payload)
+        self.etag = hashlib.blake2b(self.body, digest_size=8).hexdigest()
+        self._gzipped = None
+        self._packed = None
+        self._lock = threading.Lock()
+
+    @property
+    def gzipped(self):
+        """Gzip body, compressed at most once per version"""
+        if self._gzipped is None:
+            with self._lock:
+                if self._gzipped is None:
+                    self._gzipped = gzip.compress(self.body, compresslevel=5)
+        return self._gzipped
+
+    @property
+    def packed(self):
+        """MessagePack body, encoded at most once per version"""
+        if self._packed is None:
+            with self._lock:
+                if self._packed is None:
+                    self._packed = msgpack.packb(self.payload)
+        return self._packed
+
+class SnapshotCache:
+    """Rebuilds a snapshot from ``build()`` only when the data has changed
+
+    ``build`` must return a JSON-serializable payload made of objects the feed
+    never mutates in place (the feed replaces quote dicts instead).
+    """
+
+    def __init__(self, build, version=None):
+        self._build = build
+        # Optional callable returning an external data version (for example a
+        # shared-memory generation counter) used instead of mark_changed()
+        self._source = version
+        self._changes = itertools.count(1)
+        self._version = next(self._changes)
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.builds = 0
+
+    @property
+    def version(self):
+        return self._source() if self._source else self._version
+
+    def mark_changed(self):
+        """Called by the feed after it replaces data; cheap and lock-free"""
+        self._version = next(self._changes)
+
+    def get(self):
+        self.reads += 1
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == self.version:
+            return snapshot
+
+        with self._lock:
+            version = self.version
+            if self._snapshot is None or self._snapshot.version != version:
+                self._snapshot = Snapshot(version, self._build())
+                self.builds += 1
+            return self._snapshot
+
+    def respond(self):
+        """Flask response for the current snapshot honouring ETag, gzip and Accept"""
+        snapshot = self.get()
+        binary = wants_msgpack()
+        etag = f"{snapshot.etag}-mp" if binary else snapshot.etag
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        elif binary:
+            response = Response(snapshot.packed, mimetype=MSGPACK_MIMETYPE)
+        elif len(snapshot.body) >= GZIP_MIN_SIZE and 'gzip' in request.accept_encodings:
+            response = Response(snapshot.gzipped, mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+        else:
+            response = Response(snapshot.body, mimetype='application/json')
+
+        response.set_etag(etag)
+        response.headers['Vary'] = 'Accept-Encoding, Accept'
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Snapshot-Version'] = str(snapshot.version)
+        return response
+
+# ============ BENCHMARK ============
+
+def benchmark(universes=(3, 1_000, 100_000), changed=0.01):
+    from datetime import datetime
+
+    def quotes(count):
+        now = datetime.now().isoformat()
+        names = ['NIFTY 50', 'SENSEX', 'BANK NIFTY'][:count] + [str(40000 + i) for i in range(count - 3)]
+        return {
+            name: {'price': round(23500.05 + i * 0.35, 2), 'change': 12.4, 'changePct': 0.05,
+                   'volume': 1_250_000 + i, 'open': 23480.0, 'high': 23530.5, 'low': 23470.25, 'timestamp': now}
+            for i, name in enumerate(names)
+        }
+
+    def timed(encode, payload):
+        repeat = max(1, 20_000 // len(payload['data']))
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = encode(payload)
+        return len(body), (time.perf_counter() - start) / repeat * 1e3
+
+    print(f"Snapshot encoding benchmark (delta = {changed:.0%} of instruments changed)")
+    print(f"  {'payload':20s} {'json B':>11s} {'gzip B':>9s} {'msgpack B':>11s} {'json ms':>9s} {'msgpack ms':>10s}")
+    for count in universes:
+        data = quotes(count)
+        delta = dict(list(data.items())[:max(1, int(count * changed))])
+        for label, subset, full in ((f"full {count:,}", data, True), (f"delta {len(delta):,}/{count:,}", delta, False)):
+            payload = {'status': 'success', 'data': subset, 'seq': 1_760_000_000_000_000, 'full': full}
+            json_size, json_ms = timed(encode_json, payload)
+            gzip_size = len(gzip.compress(encode_json(payload), compresslevel=5))
+            packed_size, packed_ms = timed(msgpack.packb, payload) if msgpack else (0, 0.0)
+            print(f"  {label:20s} {json_size:11,d} {gzip_size:9,d} {packed_size:11,d} {json_ms:9.3f} {packed_ms:10.3f}")
+
+if __name__ == '__main__':
+    benchmark()
@@ -0,0 +1,10 @@
+"""
+Test configuration
+The application is a set of flat top-level modules; make them importable
+from the tests directory.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
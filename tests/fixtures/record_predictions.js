@@ -0,0 +1,22 @@
+/**
+ * Records PredictionEngine outputs for the parity test
+ * Regenerate after changing prediction-engine.js (from the repo root):
+ *   node tests/fixtures/record_predictions.js
+ */
+
+const fs = require('fs');
+const path = require('path');
+const PredictionEngine = require('../../prediction-engine.js');
+
+const inputs = JSON.parse(fs.readFileSync(path.join(__dirname, 'prediction_inputs.json'), 'utf8'));
+const engine = new PredictionEngine();
+
+const outputs = inputs.map(({ name, pcr, prices }) => {
+  const priceData = prices.map((price, i) => ({ price, timestamp: i }));
+  // analysis and timestamp are prose and wall clock, not scores
+  const { analysis, timestamp, ...result } = engine.predict(priceData, pcr);
+  return { name, ...result };
+});
+
+fs.writeFileSync(path.join(__dirname, 'prediction_expected.json'), JSON.stringify(outputs, null, 1) + '\n');
+console.log(`Recorded ${outputs.length} predictions`);
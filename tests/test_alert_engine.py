@@ -0,0 +1,92 @@
+"""
+Alert rule engine
+The Options360 preset against the checks in alerts.js: IV and PCR compare
+strictly, straddle jump tiers compare with >= and, like the JS else-if chain,
+fire only the highest tier reached.
+"""
+
+import pytest
+
+import server
+from alert_engine import ABOVE, BELOW, CROSS, AlertEngine, options360_rules
+
+@pytest.fixture
+def engine():
+    engine = AlertEngine()
+    for definition in options360_rules('NIFTY'):
+        engine.add_rule(user='alice', **definition)
+    return engine
+
+def thresholds(events):
+    return [e['threshold'] for e in events]
+
+def jump(engine, percent, now):
+    """Straddle premium percent above a running low of 100"""
+    return engine.update_jump('NIFTY:straddle', 100.0 + percent, now=now)
+
+def test_straddle_fires_only_highest_tier(engine):
+    jump(engine, 0, now=0)
+    assert thresholds(jump(engine, 35, now=1)) == [30.0]
+
+@pytest.mark.parametrize('percent, tier', [(10, 10.0), (20, 20.0), (30, 30.0), (19.99, 10.0)])
+def test_straddle_tiers_are_inclusive(engine, percent, tier):
+    jump(engine, 0, now=0)
+    assert thresholds(jump(engine, percent, now=1)) == [tier]
+
+def test_straddle_below_first_tier_is_quiet(engine):
+    jump(engine, 0, now=0)
+    assert jump(engine, 9.9, now=1) == []
+
+def test_covered_tiers_wait_for_the_winner_cooldown(engine):
+    jump(engine, 0, now=0)
+    assert thresholds(jump(engine, 35, now=1)) == [30.0]
+    # Still above every tier inside the cooldown: nothing cascades down the tiers
+    assert jump(engine, 36, now=60) == []
+    assert jump(engine, 34, now=300) == []
+    # After the 600 s cooldown the chain is evaluated again
+    assert thresholds(jump(engine, 25, now=601)) == [20.0]
+    assert jump(engine, 26, now=700) == []
+    assert thresholds(jump(engine, 32, now=1202)) == [30.0]
+
+def test_straddle_groups_are_per_user(engine):
+    for definition in options360_rules('NIFTY'):
+        engine.add_rule(user='bob', **definition)
+    jump(engine, 0, now=0)
+    events = jump(engine, 22, now=1)
+    assert sorted((e['user'], e['threshold']) for e in events) == [('alice', 20.0), ('bob', 20.0)]
+
+def test_iv_and_pcr_stay_strict(engine):
+    assert engine.update('NIFTY:iv', 20.0, now=0) == []
+    assert [e['metric'] for e in engine.update('NIFTY:iv', 20.5, now=1)] == ['NIFTY:iv']
+
+    engine.update('NIFTY:pcr', 0.9, now=0)
+    assert engine.update('NIFTY:pcr', 1.0, now=1) == []
+    assert [e['direction'] for e in engine.update('NIFTY:pcr', 1.1, now=2)] == [ABOVE]
+
+def test_ungrouped_rules_all_fire():
+    engine = AlertEngine()
+    for threshold in (1, 2, 3):
+        engine.add_rule('X', ABOVE, threshold, mode=CROSS, cooldown=0)
+    engine.add_rule('X', BELOW, 0.5, mode=CROSS, cooldown=0, inclusive=True)
+    engine.update('X', 0.0, now=0)
+    assert thresholds(engine.update('X', 2.5, now=1)) == [1.0, 2.0]
+    assert thresholds(engine.update('X', 0.5, now=2)) == [0.5]
+
+@pytest.mark.parametrize('threshold', [float('nan'), float('inf'), float('-inf'), 'nan', 'inf'])
+def test_non_finite_threshold_is_rejected(threshold):
+    engine = AlertEngine()
+    with pytest.raises(ValueError, match='finite'):
+        engine.add_rule('NIFTY:pcr', ABOVE, threshold)
+    assert engine.rules == {}
+
+def test_nan_cooldown_is_rejected():
+    with pytest.raises(ValueError, match='cooldown'):
+        AlertEngine().add_rule('NIFTY:pcr', ABOVE, 1.0, cooldown=float('nan'))
+
+def test_route_maps_non_finite_threshold_to_400(monkeypatch):
+    monkeypatch.setattr(server, 'feed_election', None)
+    monkeypatch.setattr(server, 'alert_engine', AlertEngine())
+    response = server.app.test_client().post('/api/alerts', json={'metric': 'NIFTY:pcr', 'direction': ABOVE,
+                                                                    'threshold': 'NaN'})
+    assert response.status_code == 400
+    assert 'finite' in response.get_json()['error']
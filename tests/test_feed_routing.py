@@ -0,0 +1,91 @@
+"""
+Feed process routing under serve.py
+Only the elected feed worker logs in, runs the feed and holds alert, paper
+trading and replay state; the other workers forward those routes to the
+address it advertises in the election lock file.
+"""
+
+import json
+import threading
+
+import pytest
+from flask import Flask, Response, request
+from werkzeug.serving import make_server
+
+import server
+from shared_quotes import FeedElection
+
+class StandbyElection:
+    """A worker that lost the election; the leader advertised ``address``"""
+
+    leader = False
+
+    def __init__(self, address):
+        self.address = address
+
+    def leader_address(self):
+        return self.address
+
+@pytest.fixture
+def feed_process():
+    """Stand-in feed process that echoes what it was forwarded"""
+    app = Flask('feed-process')
+
+    @app.route('/<path:path>', methods=['GET', 'POST', 'DELETE'])
+    def echo(path):
+        body = json.dumps({'path': f"/{path}", 'method': request.method, 'query': request.query_string.decode(),
+                           'body': request.get_data(as_text=True), 'token': request.headers.get('X-Admin-Token')})
+        return Response(body, status=201 if request.method == 'POST' else 200, mimetype='application/json',
+                        headers={'X-Served-By': 'feed'})
+
+    httpd = make_server('127.0.0.1', 0, app, threaded=True)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"127.0.0.1:{httpd.server_port}"
+    httpd.shutdown()
+
+def test_election_advertises_address(tmp_path):
+    path = str(tmp_path / 'feed.lock')
+    leader, standby = FeedElection(path), FeedElection(path)
+    assert leader.try_acquire()
+    assert not standby.try_acquire()
+    assert standby.leader_address() is None
+
+    leader.advertise('127.0.0.1:40123')
+    assert standby.leader_address() == '127.0.0.1:40123'
+
+def test_standby_forwards_stateful_routes(monkeypatch, feed_process):
+    monkeypatch.setattr(server, 'feed_election', StandbyElection(feed_process))
+    client = server.app.test_client()
+
+    response = client.post('/api/paper/orders?dry=1', json={'account': 'a', 'symbol': 'NIFTY 50'},
+                           headers={'X-Admin-Token': 't'})
+    assert response.status_code == 201
+    assert response.headers['X-Served-By'] == 'feed'
+    forwarded = response.get_json()
+    assert (forwarded['path'], forwarded['method'], forwarded['query']) == ('/api/paper/orders', 'POST', 'dry=1')
+    assert json.loads(forwarded['body']) == {'account': 'a', 'symbol': 'NIFTY 50'}
+    assert forwarded['token'] == 't'
+
+    for method, path in (('get', '/login'), ('post', '/authenticate'), ('get', '/api/alerts'),
+                         ('delete', '/api/alerts/3'), ('get', '/api/paper/accounts/a'), ('get', '/api/replay')):
+        assert getattr(client, method)(path).get_json()['path'] == path
+
+def test_standby_without_leader_address_is_unavailable(monkeypatch):
+    monkeypatch.setattr(server, 'feed_election', StandbyElection(None))
+    response = server.app.test_client().get('/api/alerts')
+    assert response.status_code == 503
+
+def test_feed_process_serves_locally(monkeypatch):
+    monkeypatch.setattr(server, 'feed_election', None)
+    response = server.app.test_client().get('/api/alerts')
+    assert response.status_code == 200
+    assert response.get_json()['status'] == 'success'
+
+def test_standby_never_starts_the_feed(monkeypatch):
+    started = []
+    monkeypatch.setattr(server, 'feed_election', StandbyElection(None))
+    for name in ('start_tick_stream', 'start_live_polling', 'start_providers', 'start_replay'):
+        monkeypatch.setattr(server, name, lambda *args, name=name: started.append(name))
+    server.start_live_feed()
+    assert started == []
@@ -0,0 +1,128 @@
+"""
+Instrument master index
+Builds the columnar index from a 20-row scrip master fixture (NIFTY options on
+two expiries, BANKNIFTY options, a future, indices and an equity, in shuffled
+order) and checks the lookups the server relies on, plus refresh versioning.
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from instrument_master import CURRENT_FILE, InstrumentMaster
+
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'scrip_master.json')
+
+@pytest.fixture
+def master(tmp_path):
+    master = InstrumentMaster(str(tmp_path / 'index'))
+    assert master.refresh(FIXTURE)
+    return master
+
+def test_build_and_load(master):
+    assert master.loaded
+    assert len(master.index) == 20
+
+    reloaded = InstrumentMaster(master.index_dir)
+    assert reloaded.load()
+    assert reloaded.index.version == master.index.version
+    assert len(reloaded.index) == 20
+
+def test_load_without_index(tmp_path):
+    master = InstrumentMaster(str(tmp_path / 'empty'))
+    assert not master.load()
+    assert not master.loaded
+
+def test_by_token(master):
+    assert master.index.by_token('35001') == {
+        'token': '35001',
+        'symbol': 'NIFTY28NOV2423900CE',
+        'name': 'NIFTY',
+        'exchange': 'NFO',
+        'instrument_type': 'OPTIDX',
+        'expiry': '2024-11-28',
+        'strike': 23900.0,
+        'option_type': 'CE',
+        'lot_size': 25,
+        'tick_size': 0.05
+    }
+    assert master.index.by_token(26000)['symbol'] == 'Nifty 50'
+    assert master.index.by_token('1') is None
+
+def test_by_symbol(master):
+    future = master.index.by_symbol('NIFTY28NOV24FUT')
+    assert (future['token'], future['instrument_type'], future['option_type']) == ('35101', 'FUTIDX', None)
+    assert future['strike'] == 0.0
+
+    equity = master.index.by_symbol('SBIN-EQ')
+    assert (equity['token'], equity['exchange'], equity['expiry']) == ('3045', 'NSE', None)
+    assert master.index.by_symbol('SENSEX')['exchange'] == 'BSE'
+    assert master.index.by_symbol('NOSUCH-EQ') is None
+
+def test_expiries(master):
+    assert master.index.expiries('NIFTY') == ['2024-11-28', '2024-12-05']
+    assert master.index.expiries('BANKNIFTY') == ['2024-11-27']
+    assert master.index.expiries('SBIN') == []
+    assert master.index.expiries('UNKNOWN') == []
+
+def test_options_for_expiry(master):
+    contracts = master.index.options('NIFTY', expiry='2024-11-28')
+    # Options only (the future shares the expiry), sorted by strike then CE/PE
+    assert [(c['strike'], c['option_type']) for c in contracts] == [
+        (23900.0, 'CE'), (23900.0, 'PE'), (24000.0, 'CE'), (24000.0, 'PE'), (24100.0, 'CE'), (24100.0, 'PE')
+    ]
+    assert {c['expiry'] for c in contracts} == {'2024-11-28'}
+
+def test_strike_range_is_inclusive(master):
+    contracts = master.index.options('NIFTY', expiry='2024-12-05', strike_min=24000, strike_max=24100)
+    assert sorted({c['strike'] for c in contracts}) == [24000.0, 24100.0]
+    assert len(contracts) == 4
+
+    assert master.index.options('NIFTY', expiry='2024-12-05', strike_min=24050, strike_max=24060) == []
+
+def test_strike_range_across_expiries(master):
+    contracts = master.index.options('NIFTY', strike_min=24000, strike_max=24000, option_type='pe')
+    assert [(c['expiry'], c['symbol']) for c in contracts] == [
+        ('2024-11-28', 'NIFTY28NOV2424000PE'), ('2024-12-05', 'NIFTY05DEC2424000PE')
+    ]
+
+def test_option_type_filter(master):
+    calls = master.index.options('BANKNIFTY', expiry='2024-11-27', option_type='CE')
+    assert [c['symbol'] for c in calls] == ['BANKNIFTY27NOV2451500CE', 'BANKNIFTY27NOV2452000CE']
+    assert master.index.options('UNKNOWN', expiry='2024-11-27') == []
+
+def test_refresh_unchanged_source_keeps_index(master):
+    index = master.index
+    assert not master.refresh(FIXTURE)
+    assert master.index is index
+
+def test_refresh_changed_source_swaps_version(master, tmp_path):
+    old = master.index
+    with open(FIXTURE) as f:
+        records = json.load(f)
+    records.append({'token': '35201', 'symbol': 'NIFTY05DEC2424200CE', 'name': 'NIFTY', 'expiry': '05DEC2024',
+                    'strike': '2420000.000000', 'lotsize': '25', 'instrumenttype': 'OPTIDX',
+                    'exch_seg': 'NFO', 'tick_size': '5.000000'})
+    changed = tmp_path / 'scrip_master.json'
+    changed.write_text(json.dumps(records))
+
+    assert master.refresh(str(changed))
+    assert master.index.version != old.version
+    assert len(master.index) == 21
+    assert master.index.by_token('35201')['strike'] == 24200.0
+    # The replaced version is kept on disk for readers still holding it
+    assert old.by_token('35201') is None
+    assert os.path.isdir(old.path)
+    with open(os.path.join(master.index_dir, CURRENT_FILE)) as f:
+        assert f.read() == master.index.version
+
+def test_refresh_failure_keeps_index(master, tmp_path):
+    index = master.index
+    broken = tmp_path / 'broken.json'
+    shutil.copy(FIXTURE, broken)
+    with open(broken, 'a') as f:
+        f.write('{')
+    assert not master.refresh(str(broken))
+    assert master.index is index
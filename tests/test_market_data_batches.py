@@ -0,0 +1,90 @@
+"""
+Bulk market data fetching
+A recording fake SmartConnect shows that the number of getMarketData calls
+grows with the number of 50-token batches per exchange, not with the number
+of symbols, and that every fetched token is merged back into live_data.
+"""
+
+import math
+
+import pytest
+
+import server
+from tick_store import TickStore
+
+class RecordingSmartConnect:
+    """Answers getMarketData for every requested token and records each call"""
+
+    def __init__(self):
+        self.calls = []
+
+    def getMarketData(self, mode, exchange_tokens):
+        self.calls.append((mode, {exchange: list(tokens) for exchange, tokens in exchange_tokens.items()}))
+        fetched = [
+            {'exchange': exchange, 'symbolToken': token, 'ltp': 100.0 + i, 'close': 100.0,
+             'open': 100.0, 'high': 101.0 + i, 'low': 99.0, 'tradeVolume': 10, 'opnInterest': 0}
+            for exchange, tokens in exchange_tokens.items()
+            for i, token in enumerate(tokens)
+        ]
+        return {'status': True, 'message': 'SUCCESS', 'data': {'fetched': fetched, 'unfetched': []}}
+
+def universe(nse, bse):
+    """Instrument names -> tokens, plus the exchange map for the BSE names"""
+    instruments = {f"NSE{i}": str(10_000 + i) for i in range(nse)}
+    instruments.update({f"BSE{i}": str(90_000 + i) for i in range(bse)})
+    exchanges = {f"BSE{i}": "BSE" for i in range(bse)}
+    return instruments, exchanges
+
+@pytest.fixture
+def broker(monkeypatch, tmp_path):
+    fake = RecordingSmartConnect()
+    monkeypatch.setattr(server, 'smart_api', fake)
+    monkeypatch.setattr(server, 'tick_store', TickStore(str(tmp_path)))
+    monkeypatch.setattr(server, 'live_data', {})
+    return fake
+
+@pytest.mark.parametrize('nse,bse', [(1, 0), (50, 0), (51, 1), (120, 49), (500, 75)])
+def test_calls_scale_with_batches_not_symbols(broker, nse, bse):
+    instruments, exchanges = universe(nse, bse)
+
+    fetched = server.fetch_market_data(instruments, exchanges=exchanges)
+
+    calls_by_exchange = {}
+    for mode, batch in broker.calls:
+        assert mode == server.MARKET_DATA_MODE
+        assert len(batch) == 1, "each request holds a single exchange"
+        (exchange, tokens), = batch.items()
+        assert len(tokens) <= server.MARKET_DATA_BATCH_SIZE
+        calls_by_exchange[exchange] = calls_by_exchange.get(exchange, 0) + 1
+
+    expected = {exchange: math.ceil(count / server.MARKET_DATA_BATCH_SIZE)
+                for exchange, count in (('NSE', nse), ('BSE', bse)) if count}
+    assert calls_by_exchange == expected
+    assert set(fetched) == set(instruments.values())
+
+def test_every_token_is_merged_back(broker):
+    instruments, exchanges = universe(120, 30)
+
+    updated = server.merge_market_data(server.fetch_market_data(instruments, exchanges=exchanges), instruments)
+
+    assert updated == len(instruments)
+    assert set(server.live_data) == set(instruments)
+    for name, quote in server.live_data.items():
+        assert quote['price'] > 0
+        assert quote['change'] == round(quote['price'] - 100.0, 2)
+
+def test_failed_batch_does_not_drop_the_others(broker):
+    instruments, exchanges = universe(120, 0)
+    answer = broker.getMarketData
+
+    def flaky(mode, exchange_tokens):
+        if len(broker.calls) == 1:
+            broker.calls.append((mode, exchange_tokens))
+            raise ConnectionError("batch timed out")
+        return answer(mode, exchange_tokens)
+
+    broker.getMarketData = flaky
+    fetched = server.fetch_market_data(instruments, exchanges=exchanges)
+
+    assert len(broker.calls) == 3
+    assert len(fetched) == len(instruments) - server.MARKET_DATA_BATCH_SIZE
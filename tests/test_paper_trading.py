@@ -0,0 +1,56 @@
+"""
+Paper trading engine
+Fills against live prices: buys need the cash, sells the quantity held, and
+orders are only accepted for accounts that were opened.
+"""
+
+import pytest
+
+from paper_trading import BUY, FILLED, LIMIT, OPEN, REJECTED, SELL, OrderError, PaperTradingEngine
+
+@pytest.fixture
+def engine():
+    engine = PaperTradingEngine(initial_balance=100_000)
+    engine.open_account('alice')
+    engine.watch('NIFTY24N24000CE', 100.0)
+    return engine
+
+def test_unknown_account_is_rejected(engine):
+    with pytest.raises(OrderError, match='No paper account bob'):
+        engine.place_order('bob', 'NIFTY24N24000CE', BUY, 25)
+    assert engine.account('bob') is None
+    assert engine.stats()['accounts'] == 1
+
+def test_sell_without_position_is_rejected(engine):
+    order = engine.place_order('alice', 'NIFTY24N24000CE', SELL, 5_000)
+    assert (order.status, order.reason) == (REJECTED, 'Insufficient position')
+    # Proceeds of the rejected sell never reach the cash balance
+    assert engine.account('alice')['balance'] == 100_000
+    assert engine.place_order('alice', 'NIFTY24N24000CE', BUY, 5_000).status == REJECTED
+
+def test_sell_up_to_the_held_quantity(engine):
+    assert engine.place_order('alice', 'NIFTY24N24000CE', BUY, 50).status == FILLED
+    assert engine.place_order('alice', 'NIFTY24N24000CE', SELL, 75).status == REJECTED
+    engine.on_price('NIFTY24N24000CE', 110.0)
+    assert engine.place_order('alice', 'NIFTY24N24000CE', SELL, 50).status == FILLED
+
+    summary = engine.account('alice')
+    assert summary['positions'] == []
+    assert summary['realized_pnl'] == 500.0
+    assert summary['balance'] == 100_500.0
+
+def test_resting_sell_rechecked_at_fill(engine):
+    engine.place_order('alice', 'NIFTY24N24000CE', BUY, 50)
+    first = engine.place_order('alice', 'NIFTY24N24000CE', SELL, 50, LIMIT, 120.0)
+    second = engine.place_order('alice', 'NIFTY24N24000CE', SELL, 50, LIMIT, 120.0)
+    assert first.status == second.status == OPEN
+
+    engine.on_price('NIFTY24N24000CE', 125.0)
+    assert first.status == FILLED
+    assert (second.status, second.reason) == (REJECTED, 'Insufficient position')
+    assert engine.account('alice')['positions'] == []
+
+def test_limit_sell_beyond_position_does_not_rest(engine):
+    order = engine.place_order('alice', 'NIFTY24N24000CE', SELL, 25, LIMIT, 150.0)
+    assert order.status == REJECTED
+    assert engine.stats()['resting_orders'] == 0
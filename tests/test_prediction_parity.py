@@ -0,0 +1,59 @@
+"""
+Prediction engine parity
+predict_batch against PredictionEngine.predict outputs recorded with node
+(tests/fixtures/record_predictions.js), both one series at a time and with
+series of equal length scored together in one batch.
+"""
+
+import json
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from prediction_engine import predict_batch, prediction_record
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+INPUTS = json.loads((FIXTURES / 'prediction_inputs.json').read_text())
+EXPECTED = {case['name']: case for case in json.loads((FIXTURES / 'prediction_expected.json').read_text())}
+
+# Both engines round the same float64 arithmetic; allow one step of the
+# output rounding for summation-order differences
+SCORE_TOLERANCE = 0.1
+CONFIDENCE_TOLERANCE = 1
+RSI_TOLERANCE = 0.1
+PRICE_TOLERANCE = 0.01
+
+def assert_matches(actual, expected):
+    assert actual['prediction'] == expected['prediction']
+    assert actual['score'] == pytest.approx(expected['score'], abs=SCORE_TOLERANCE)
+    assert abs(actual['confidence'] - expected['confidence']) <= CONFIDENCE_TOLERANCE
+    assert actual['signals'] == expected['signals']
+    indicators, recorded = actual['indicators'], expected['indicators']
+    assert indicators['rsi'] == pytest.approx(recorded['rsi'], abs=RSI_TOLERANCE)
+    assert indicators['pcr'] == pytest.approx(recorded['pcr'])
+    assert indicators['support'] == pytest.approx(recorded['support'], abs=PRICE_TOLERANCE)
+    assert indicators['resistance'] == pytest.approx(recorded['resistance'], abs=PRICE_TOLERANCE)
+
+def test_fixtures_cover_every_input():
+    assert sorted(EXPECTED) == sorted(case['name'] for case in INPUTS)
+
+@pytest.mark.parametrize('case', INPUTS, ids=[case['name'] for case in INPUTS])
+def test_single_series_matches_js(case):
+    result = predict_batch([case['prices']], case['pcr'])
+    assert_matches(prediction_record(result, 0), EXPECTED[case['name']])
+
+def test_batch_matches_js():
+    by_length = defaultdict(list)
+    for case in INPUTS:
+        by_length[len(case['prices'])].append(case)
+
+    for cases in by_length.values():
+        result = predict_batch(np.array([case['prices'] for case in cases]), [case['pcr'] for case in cases])
+        for i, case in enumerate(cases):
+            assert_matches(prediction_record(result, i), EXPECTED[case['name']])
+
+def test_too_few_points_rejected():
+    with pytest.raises(ValueError):
+        predict_batch([[100.0] * 9], 1.0)
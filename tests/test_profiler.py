@@ -0,0 +1,39 @@
+"""
+Profiler admin endpoints
+Both servers get the same /api/admin/profile routes from profiler.register.
+"""
+
+import time
+
+import pytest
+
+import profiler
+import server
+import truedata_server
+
+@pytest.fixture(params=[server.app, truedata_server.app], ids=['server', 'truedata_server'])
+def client(request, monkeypatch):
+    monkeypatch.setattr(profiler, 'ADMIN_TOKEN', None)
+    monkeypatch.setattr(profiler, 'sampler', profiler.SamplingProfiler())
+    return request.param.test_client()
+
+def test_profile_start_status_stop(client):
+    assert client.delete('/api/admin/profile').status_code == 404
+
+    response = client.post('/api/admin/profile', json={'duration': 5, 'interval_ms': 1})
+    assert response.status_code == 202
+    assert response.get_json()['data']['running']
+    assert client.post('/api/admin/profile', json={}).status_code == 409
+    assert client.get('/api/admin/profile').get_json()['data']['running']
+    time.sleep(0.05)
+
+    result = client.delete('/api/admin/profile').get_json()['data']
+    assert result['samples'] > 0
+    assert client.get('/api/admin/profile').get_json()['data'] == result
+    collapsed = client.get('/api/admin/profile?format=collapsed')
+    assert collapsed.mimetype == 'text/plain'
+    assert collapsed.get_data(as_text=True) == result['collapsed'] + '\n'
+
+def test_profile_requires_admin(client):
+    assert client.get('/api/admin/profile', environ_base={'REMOTE_ADDR': '10.0.0.5'}).status_code == 403
+    assert client.post('/api/admin/profile', json={'duration': 'soon'}).status_code == 400
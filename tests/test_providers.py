@@ -0,0 +1,32 @@
+"""
+Provider timestamps
+Exchange times in REST payloads are IST wall-clock strings; they must give the
+same epoch whatever time zone the server runs in.
+"""
+
+import time
+
+import pytest
+
+from providers import parse_exchange_time
+
+# 28 Nov 2024 10:00:00 IST is 04:30:00 UTC
+EPOCH_MS = 1732768200000
+
+@pytest.fixture(params=['UTC', 'America/New_York', 'Asia/Kolkata'])
+def host_zone(request, monkeypatch):
+    monkeypatch.setenv('TZ', request.param)
+    time.tzset()
+    yield request.param
+    monkeypatch.undo()
+    time.tzset()
+
+@pytest.mark.parametrize('value', ['28-Nov-2024 10:00:00', '2024-11-28T10:00:00', '2024-11-28 10:00:00.250'])
+def test_date_strings_are_ist(host_zone, value):
+    assert parse_exchange_time(value) == EPOCH_MS
+
+def test_epoch_numbers_pass_through(host_zone):
+    assert parse_exchange_time(EPOCH_MS) == EPOCH_MS
+    assert parse_exchange_time(EPOCH_MS / 1000) == EPOCH_MS
+    assert parse_exchange_time('') is None
+    assert parse_exchange_time('not a time') is None
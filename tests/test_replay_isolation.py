@@ -0,0 +1,63 @@
+"""
+Replay isolation
+A replay drives the same tick path as the live feed. Its synthetic chains are
+tracked apart from the live chain registry, and stopping it drops every price
+it produced, so a later login streams and serves live data only.
+"""
+
+import pytest
+
+import server
+from alert_engine import AlertEngine
+from chain_aggregator import ChainRegistry
+from paper_trading import PaperTradingEngine
+from providers import FeedMerger
+from tests.test_stream_subscriptions import RecordingTickStream
+from tick_stream import QUOTE_MODE
+
+@pytest.fixture
+def replay(monkeypatch, tmp_path):
+    monkeypatch.setattr(server, 'REPLAY_STORE_DIR', str(tmp_path))
+    monkeypatch.setattr(server, 'chain_registry', ChainRegistry())
+    monkeypatch.setattr(server, 'live_data', {'NIFTY 50': {'price': 0, 'change': 0, 'changePct': 0}})
+    monkeypatch.setattr(server, 'quote_store', server.QuoteStore())
+    monkeypatch.setattr(server, 'bar_builder', server.BarBuilder())
+    monkeypatch.setattr(server, 'paper_engine', PaperTradingEngine())
+    monkeypatch.setattr(server, 'alert_engine', AlertEngine())
+    monkeypatch.setattr(server, 'feed_merger', FeedMerger(server.PROVIDERS))
+    monkeypatch.setattr(server, 'TickStream', RecordingTickStream)
+    monkeypatch.setattr(server, 'tick_stream', None)
+    server.paper_engine.watch('NIFTY 50')
+
+    session = server.start_replay('synthetic', speed=0, duration=2, rate=200)
+    session._thread.join(10)
+    yield session
+    server.stop_replay()
+
+def test_replay_chains_stay_out_of_the_live_registry(replay):
+    assert replay.replayed == len(replay.batch)
+    assert server.chain_registry.chains == {}
+    assert server.active_chains() is server.replay_chains
+    assert server.active_chains().nearest('NIFTY') is not None
+    assert server.live_data['NIFTY 50']['price'] > 0
+
+def test_stop_replay_drops_replayed_state(replay):
+    assert server.quote_store.price('NIFTY 50')
+    assert server.paper_engine.price('NIFTY 50')
+    assert server.alert_engine.values
+    assert server.feed_merger.quotes
+
+    server.stop_replay()
+
+    assert server.active_chains() is server.chain_registry
+    assert server.live_data == {'NIFTY 50': {'price': 0, 'change': 0, 'changePct': 0}}
+    assert server.quote_store.price('NIFTY 50') is None
+    assert server.bar_builder.bars('NIFTY 50', '1m') is None
+    assert server.paper_engine.price('NIFTY 50') is None
+    assert server.alert_engine.values == {}
+    assert server.feed_merger.quotes == {}
+
+def test_stream_after_replay_subscribes_live_tokens_only(replay):
+    server.stop_replay()
+    server.start_tick_stream()
+    assert [mode for mode, _ in server.tick_stream.subscriptions] == [QUOTE_MODE]
@@ -0,0 +1,64 @@
+"""
+Shared-memory quote store
+A worker that attached to the segment and later wins the feed election must
+keep writing into the rows the previous writer assigned, not add duplicates.
+"""
+
+import os
+import uuid
+
+import pytest
+
+from shared_quotes import SharedQuoteStore
+
+def quote(price):
+    return {'price': price, 'change': 1.0, 'changePct': 0.5, 'volume': 10, 'open': price, 'high': price, 'low': price}
+
+@pytest.fixture
+def segment():
+    name = f"quotes-test-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    owner = SharedQuoteStore.create(name, capacity=8)
+    yield name, owner
+    owner.close()
+
+def test_attached_reader_sees_writes(segment):
+    name, writer = segment
+    writer.write('NIFTY 50', quote(24000.0))
+    reader = SharedQuoteStore.attach(name)
+    writer.write('SENSEX', quote(80000.0))
+
+    snapshot = reader.snapshot()
+    assert list(snapshot) == ['NIFTY 50', 'SENSEX']
+    assert snapshot['SENSEX']['price'] == 80000.0
+    reader.close()
+
+def test_failover_writer_reuses_existing_rows(segment):
+    name, first_writer = segment
+    first_writer.write('NIFTY 50', quote(24000.0))
+    standby = SharedQuoteStore.attach(name)
+    # Assigned after the standby attached, and never read by it
+    first_writer.write('SENSEX', quote(80000.0))
+
+    # The standby takes the feed over and writes the same universe
+    standby.write('NIFTY 50', quote(24010.0))
+    standby.write('SENSEX', quote(80010.0))
+    standby.write('BANK NIFTY', quote(52000.0))
+
+    assert int(standby.header['count']) == 3
+    snapshot = first_writer.snapshot()
+    assert list(snapshot) == ['NIFTY 50', 'SENSEX', 'BANK NIFTY']
+    assert [q['price'] for q in snapshot.values()] == [24010.0, 80010.0, 52000.0]
+    assert standby.snapshot() == snapshot
+    standby.close()
+
+def test_attach_rejects_foreign_segment():
+    from multiprocessing import shared_memory
+
+    name = f"not-quotes-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    shm = shared_memory.SharedMemory(name=name, create=True, size=8192)
+    try:
+        with pytest.raises(ValueError):
+            SharedQuoteStore.attach(name)
+    finally:
+        shm.close()
+        shm.unlink()
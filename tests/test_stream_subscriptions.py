@@ -0,0 +1,90 @@
+"""
+Tick stream (re)starts
+start_tick_stream() runs again after every re-login. The new stream has to
+carry the index tokens and every chain tracked so far, the chains in
+SNAP_QUOTE mode for open interest; chains past their expiry are dropped.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import server
+from chain_aggregator import ChainRegistry
+from poll_scheduler import IST
+from tick_stream import QUOTE_MODE, SNAP_QUOTE_MODE
+
+class RecordingTickStream:
+    """Records subscribe/start/stop instead of opening a socket"""
+
+    def __init__(self, *args, on_tick=None, mode=QUOTE_MODE, **kwargs):
+        self.mode = mode
+        self.subscriptions = []
+        self.unsubscriptions = []
+        self.started = self.stopped = False
+
+    def subscribe(self, tokens_by_exchange, mode=None):
+        self.subscriptions.append((mode or self.mode, {e: list(t) for e, t in tokens_by_exchange.items()}))
+
+    def unsubscribe(self, tokens_by_exchange, mode=None):
+        self.unsubscriptions.append((mode or self.mode, {e: list(t) for e, t in tokens_by_exchange.items()}))
+
+    def start(self):
+        self.started = True
+
+    def stop(self):
+        self.stopped = True
+
+def expiry(days):
+    """Expiry ``days`` from today on the exchange calendar"""
+    return (datetime.now(IST).date() + timedelta(days=days)).isoformat()
+
+def contracts(underlying, exchange, first_token):
+    return [{'token': str(first_token + i), 'strike': strike, 'option_type': kind, 'exchange': exchange,
+             'underlying': underlying}
+            for i, (strike, kind) in enumerate((s, k) for s in (24000.0, 24100.0) for k in ('CE', 'PE'))]
+
+@pytest.fixture
+def registry(monkeypatch):
+    registry = ChainRegistry()
+    monkeypatch.setattr(server, 'chain_registry', registry)
+    monkeypatch.setattr(server, 'TickStream', RecordingTickStream)
+    monkeypatch.setattr(server, 'tick_stream', None)
+    return registry
+
+def test_restart_resubscribes_tracked_chains(registry):
+    registry.track('NIFTY', expiry(7), contracts('NIFTY', 'NFO', 40000))
+    registry.track('SENSEX', expiry(8), contracts('SENSEX', 'BFO', 80000))
+    server.start_tick_stream()
+    first = server.tick_stream
+
+    registry.track('BANKNIFTY', expiry(6), contracts('BANKNIFTY', 'NFO', 50000))
+    server.start_tick_stream()
+    stream = server.tick_stream
+
+    assert first.stopped and stream.started and stream is not first
+    modes = dict(stream.subscriptions)
+    indices = {exchange: sorted(tokens) for exchange, tokens in modes[QUOTE_MODE].items()}
+    assert indices == {'NSE': ['99926000', '99926009'], 'BSE': ['99919000']}
+    chains = {exchange: sorted(tokens) for exchange, tokens in modes[SNAP_QUOTE_MODE].items()}
+    assert chains == {'NFO': [str(t) for t in (40000, 40001, 40002, 40003, 50000, 50001, 50002, 50003)],
+                      'BFO': ['80000', '80001', '80002', '80003']}
+
+def test_start_without_chains_subscribes_indices_only(registry):
+    server.start_tick_stream()
+    assert [mode for mode, _ in server.tick_stream.subscriptions] == [QUOTE_MODE]
+
+def test_expired_chains_are_dropped(registry):
+    registry.track('NIFTY', expiry(-1), contracts('NIFTY', 'NFO', 40000))
+    registry.track('NIFTY', expiry(0), contracts('NIFTY', 'NFO', 41000))
+    server.start_tick_stream()
+    stream = server.tick_stream
+
+    assert list(registry.chains) == [('NIFTY', expiry(0))]
+    assert dict(stream.subscriptions)[SNAP_QUOTE_MODE] == {'NFO': ['41000', '41001', '41002', '41003']}
+
+    # Rolled over while streaming: the chain is unsubscribed as well
+    registry.track('BANKNIFTY', expiry(-2), contracts('BANKNIFTY', 'NFO', 50000))
+    server.prune_expired_chains()
+    assert stream.unsubscriptions == [(SNAP_QUOTE_MODE, {'NFO': ['50000', '50001', '50002', '50003']})]
+    assert not registry.on_contract('50000', ltp=10.0)
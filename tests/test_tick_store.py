@@ -0,0 +1,51 @@
+"""
+Tick store
+Range reads binary-search the timestamp column, so it has to stay sorted even
+when one symbol's ticks come from clocks that disagree: exchange time on the
+stream, wall-clock time when polled.
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+import server
+import truedata_server
+from tick_store import TickStore
+
+DAY = int(datetime(2024, 11, 28, 10, 0).timestamp() * 1e9)
+SECOND = 1_000_000_000
+
+def test_backwards_tick_is_clamped(tmp_path):
+    store = TickStore(str(tmp_path))
+    store.append('NIFTY 50', 24000.0, ts=DAY + 5 * SECOND)     # polled, wall clock
+    store.append('NIFTY 50', 24001.0, ts=DAY + 3 * SECOND)     # streamed, exchange time behind
+    store.append('NIFTY 50', 24002.0, ts=DAY + 6 * SECOND)
+
+    view = store.read('NIFTY 50', DAY, DAY + 10 * SECOND)
+    assert list(view['ts']) == [DAY + 5 * SECOND] * 2 + [DAY + 6 * SECOND]
+    assert list(view['price']) == [24000.0, 24001.0, 24002.0]
+    assert store.clamped == 1
+    assert list(store.read('NIFTY 50', DAY + 6 * SECOND, DAY + 7 * SECOND)['price']) == [24002.0]
+
+def test_symbols_are_ordered_independently(tmp_path):
+    store = TickStore(str(tmp_path))
+    store.append('NIFTY 50', 24000.0, ts=DAY + 5 * SECOND)
+    store.append('SENSEX', 80000.0, ts=DAY + 3 * SECOND)
+    assert store.clamped == 0
+    assert list(store.read('SENSEX', DAY, DAY + SECOND * 10)['ts']) == [DAY + 3 * SECOND]
+
+def test_late_tick_does_not_roll_back_the_day(tmp_path):
+    store = TickStore(str(tmp_path))
+    store.append('SENSEX', 80000.0, ts=DAY + 5 * SECOND)
+    store.append('SENSEX', 79990.0, ts=DAY - 86_400 * SECOND)
+    view = store.read('SENSEX', day='20241128')
+    assert len(view['ts']) == 2 and np.all(np.diff(view['ts']) >= 0)
+    assert store.read('SENSEX', day='20241127') is None
+    assert store.clamped == 1
+
+def test_servers_record_under_separate_roots():
+    roots = {server.TICK_STORE_DIR, truedata_server.TICK_STORE_DIR}
+    assert len(roots) == 2
+    assert server.tick_store.root == server.TICK_STORE_DIR
+    assert truedata_server.tick_store.root == truedata_server.TICK_STORE_DIR
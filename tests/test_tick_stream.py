@@ -0,0 +1,224 @@
+"""
+SmartStream tick ingestion
+TickStream runs against a local aiohttp WebSocket server that speaks the
+SmartStream wire format: binary LTP (51-byte), QUOTE (123-byte) and
+SNAP_QUOTE (147-byte) frames, JSON subscription requests, and a server-side
+drop that the client has to recover from by reconnecting and replaying every
+subscription.
+"""
+
+import asyncio
+import json
+import queue
+import struct
+import threading
+import time
+
+import pytest
+from aiohttp import WSMsgType, web
+
+from tick_stream import LTP_MODE, QUOTE_MODE, SNAP_QUOTE_MODE, TickStream, decode_tick
+
+TIMEOUT = 5  # seconds; a reconnect waits 1 s of backoff first
+
+def frame(mode, exchange_type, token, ltp, sequence=1, exchange_ts=1_700_000_000_000,
+          quote=None, snap=None):
+    """One SmartStream packet; prices are given in rupees and sent in paise"""
+    packet = struct.pack("<BB25sqqq", mode, exchange_type, token.encode('ascii'),
+                         sequence, exchange_ts, round(ltp * 100))
+    if quote is not None:
+        packet += struct.pack("<qqqddqqqq", quote['ltq'], round(quote['atp'] * 100), quote['volume'],
+                              quote['buy_qty'], quote['sell_qty'], round(quote['open'] * 100),
+                              round(quote['high'] * 100), round(quote['low'] * 100), round(quote['close'] * 100))
+    if snap is not None:
+        packet += struct.pack("<qqq", snap['last_traded_ts'], snap['oi'], snap['oi_change_pct'])
+    return packet
+
+QUOTE = {'ltq': 75, 'atp': 24510.25, 'volume': 1_234_567, 'buy_qty': 1500.0, 'sell_qty': 900.0,
+         'open': 24480.0, 'high': 24560.5, 'low': 24455.1, 'close': 24470.0}
+SNAP = {'last_traded_ts': 1_700_000_000_123, 'oi': 5_400_000, 'oi_change_pct': 3}
+
+LTP_FRAME = frame(LTP_MODE, 1, '26000', 24512.35, sequence=11)
+QUOTE_FRAME = frame(QUOTE_MODE, 1, '26009', 51820.4, sequence=12, quote=QUOTE)
+SNAP_FRAME = frame(SNAP_QUOTE_MODE, 2, '43512', 182.75, sequence=13, quote=QUOTE, snap=SNAP)
+
+# ============ LOCAL SMARTSTREAM SERVER ============
+
+class SmartStreamServer:
+    """WebSocket server on an ephemeral loopback port, driven from the test thread
+
+    ``connections`` holds one entry per accepted client with its request
+    headers and the JSON requests it sent, in order.
+    """
+
+    def __init__(self):
+        self.connections = []
+        self._sockets = []
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="smartstream-server", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        port = self._call(self._serve())
+        self.url = f"ws://127.0.0.1:{port}/smart-stream"
+
+    def stop(self):
+        self._call(self._runner.cleanup())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=TIMEOUT)
+
+    def _call(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(TIMEOUT)
+
+    async def _serve(self):
+        app = web.Application()
+        app.router.add_get('/smart-stream', self._handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        return self._runner.addresses[0][1]
+
+    async def _handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        connection = {'headers': dict(request.headers), 'requests': []}
+        self.connections.append(connection)
+        self._sockets.append(ws)
+        async for message in ws:
+            if message.type == WSMsgType.TEXT:
+                connection['requests'].append(json.loads(message.data))
+        return ws
+
+    def send(self, packet):
+        """Send a binary frame to the newest client"""
+        self._call(self._sockets[-1].send_bytes(packet))
+
+    def drop(self):
+        """Close every client connection from the server side"""
+        for ws in list(self._sockets):
+            self._call(ws.close())
+
+def wait_for(condition, timeout=TIMEOUT):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return False
+
+def subscribed(connection):
+    """{mode: {exchangeType: set(tokens)}} from a connection's subscribe requests"""
+    result = {}
+    for request in connection['requests']:
+        assert request['action'] == 1
+        by_exchange = result.setdefault(request['params']['mode'], {})
+        for entry in request['params']['tokenList']:
+            by_exchange.setdefault(entry['exchangeType'], set()).update(entry['tokens'])
+    return result
+
+@pytest.fixture
+def server():
+    server = SmartStreamServer()
+    server.start()
+    yield server
+    server.stop()
+
+@pytest.fixture
+def stream(server):
+    ticks = queue.Queue()
+    stream = TickStream('auth-1', 'api-key', 'C123', 'feed-1', ticks.put, url=server.url)
+    stream.ticks = ticks
+    yield stream
+    stream.stop()
+
+# ============ TESTS ============
+
+def test_frame_sizes():
+    assert (len(LTP_FRAME), len(QUOTE_FRAME), len(SNAP_FRAME)) == (51, 123, 147)
+
+def test_decode_ltp_frame():
+    assert decode_tick(LTP_FRAME) == {
+        'mode': LTP_MODE, 'exchange_type': 1, 'token': '26000', 'sequence': 11,
+        'exchange_timestamp': 1_700_000_000_000, 'ltp': 24512.35
+    }
+
+def test_decode_quote_frame():
+    tick = decode_tick(QUOTE_FRAME)
+    assert tick['token'] == '26009'
+    assert tick['ltp'] == 51820.4
+    assert tick['volume'] == 1_234_567
+    assert tick['average_price'] == 24510.25
+    assert (tick['open'], tick['high'], tick['low'], tick['close']) == (24480.0, 24560.5, 24455.1, 24470.0)
+    assert 'oi' not in tick
+
+def test_decode_snap_quote_frame():
+    tick = decode_tick(SNAP_FRAME)
+    assert (tick['exchange_type'], tick['token'], tick['ltp']) == (2, '43512', 182.75)
+    assert tick['close'] == 24470.0
+    assert (tick['oi'], tick['oi_change_pct'], tick['last_traded_timestamp']) == (5_400_000, 3, 1_700_000_000_123)
+
+def test_decode_rejects_short_packet():
+    assert decode_tick(LTP_FRAME[:50]) is None
+
+def test_stream_subscribes_and_decodes(server, stream):
+    stream.subscribe({'NSE': ['26000', '26009']})
+    stream.subscribe({'NFO': ['43512']}, mode=SNAP_QUOTE_MODE)
+    stream.start()
+
+    assert wait_for(lambda: server.connections and len(server.connections[0]['requests']) == 2)
+    connection = server.connections[0]
+    assert connection['headers']['Authorization'] == 'auth-1'
+    assert connection['headers']['x-feed-token'] == 'feed-1'
+    assert subscribed(connection) == {QUOTE_MODE: {1: {'26000', '26009'}}, SNAP_QUOTE_MODE: {2: {'43512'}}}
+
+    for packet in (LTP_FRAME, QUOTE_FRAME, SNAP_FRAME):
+        server.send(packet)
+    ticks = [stream.ticks.get(timeout=TIMEOUT) for _ in range(3)]
+    assert [tick['token'] for tick in ticks] == ['26000', '26009', '43512']
+    assert ticks[2]['oi'] == 5_400_000
+    assert stream.tick_count == 3
+
+def test_stream_reconnects_and_resubscribes(server, stream):
+    stream.subscribe({'NSE': ['26000', '26009'], 'BSE': ['99919000']})
+    stream.start()
+    assert wait_for(lambda: server.connections and server.connections[0]['requests'])
+
+    # Tokens added while connected are sent at once and replayed after a drop
+    stream.subscribe({'NFO': ['43512', '43513']}, mode=SNAP_QUOTE_MODE)
+    assert wait_for(lambda: len(server.connections[0]['requests']) == 2)
+    stream.set_tokens('auth-2', 'feed-2')
+
+    server.drop()
+    assert wait_for(lambda: len(server.connections) == 2 and len(server.connections[1]['requests']) == 2)
+    assert stream.reconnects == 1
+
+    first, second = server.connections
+    assert subscribed(second) == subscribed(first) == {
+        QUOTE_MODE: {1: {'26000', '26009'}, 3: {'99919000'}},
+        SNAP_QUOTE_MODE: {2: {'43512', '43513'}}
+    }
+    assert second['headers']['Authorization'] == 'auth-2'
+    assert second['headers']['x-feed-token'] == 'feed-2'
+
+    assert wait_for(stream.connected.is_set)
+    server.send(SNAP_FRAME)
+    assert stream.ticks.get(timeout=TIMEOUT)['token'] == '43512'
+
+def test_unsubscribed_tokens_stay_dropped_after_reconnect(server, stream):
+    stream.subscribe({'NSE': ['26000']})
+    stream.subscribe({'NFO': ['43512', '43513']}, mode=SNAP_QUOTE_MODE)
+    stream.start()
+    assert wait_for(lambda: server.connections and len(server.connections[0]['requests']) == 2)
+    assert wait_for(stream.connected.is_set)
+
+    stream.unsubscribe({'NFO': ['43512', '43513']}, mode=SNAP_QUOTE_MODE)
+    assert wait_for(lambda: len(server.connections[0]['requests']) == 3)
+    request = server.connections[0]['requests'][2]
+    assert request['action'] == 0
+    assert request['params']['tokenList'] == [{'exchangeType': 2, 'tokens': ['43512', '43513']}]
+
+    server.drop()
+    assert wait_for(lambda: len(server.connections) == 2 and server.connections[1]['requests'])
+    time.sleep(0.1)
+    assert subscribed(server.connections[1]) == {QUOTE_MODE: {1: {'26000'}}}
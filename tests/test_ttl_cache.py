@@ -0,0 +1,87 @@
+"""
+TTL cache
+Single-flight loading, and invalidation racing a load that is still in
+flight: a result fetched before the invalidation must not be cached.
+"""
+
+import threading
+
+from ttl_cache import TTLCache
+
+class BlockingLoader:
+    """Loader that returns its values in order, each call held until released"""
+
+    def __init__(self, *values):
+        self.values = list(values)
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        value = self.values[self.calls]
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        return value
+
+def get_in_thread(cache, key, loader):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', cache.get(key, loader)))
+    thread.start()
+    return thread, result
+
+def test_concurrent_misses_share_one_load():
+    cache = TTLCache('test', ttl=60)
+    loader = BlockingLoader('funds')
+    threads = [get_in_thread(cache, 'rms', loader) for _ in range(5)]
+    loader.started.wait(5)
+    loader.release.set()
+    for thread, result in threads:
+        thread.join(5)
+        assert result['value'] == 'funds'
+    assert loader.calls == 1
+    assert cache.misses + cache.coalesced == 5
+
+def test_invalidate_discards_load_in_flight():
+    cache = TTLCache('test', ttl=60)
+    before = BlockingLoader('positions before order')
+    thread, result = get_in_thread(cache, 'positions', before)
+    assert before.started.wait(5)
+
+    # An order fills while the old positions are being fetched
+    cache.invalidate('positions')
+    assert cache.get('positions', lambda: 'positions after order') == 'positions after order'
+
+    before.release.set()
+    thread.join(5)
+    # The caller that asked before the fill gets its answer, but it is not cached
+    assert result['value'] == 'positions before order'
+    assert cache.get('positions', lambda: 'reloaded') == 'positions after order'
+
+def test_invalidate_all_discards_every_load_in_flight():
+    cache = TTLCache('test', ttl=60)
+    loaders = {key: BlockingLoader(f"old {key}") for key in ('holdings', 'orders')}
+    threads = [get_in_thread(cache, key, loader) for key, loader in loaders.items()]
+    for loader in loaders.values():
+        assert loader.started.wait(5)
+
+    cache.invalidate()
+    for loader in loaders.values():
+        loader.release.set()
+    for thread, _ in threads:
+        thread.join(5)
+
+    assert cache.stats()['entries'] == 0
+    assert cache.get('orders', lambda: 'new orders') == 'new orders'
+
+def test_invalidate_discards_background_refresh():
+    cache = TTLCache('test', ttl=0, stale_ttl=60)
+    cache.get('funds', lambda: 'v1')
+    refresh = BlockingLoader('v2 from before invalidation')
+    # Past the TTL: served stale while one background refresh runs
+    assert cache.get('funds', refresh) == 'v1'
+    assert refresh.started.wait(5)
+
+    cache.invalidate('funds')
+    refresh.release.set()
+    assert cache.get('funds', lambda: 'v3') == 'v3'
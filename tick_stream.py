@@ -0,0 +1,258 @@
+"""
+Angel One SmartStream Tick Ingestion
+Subscribes to instrument tokens over the binary tick WebSocket, decodes each
+packet and hands it to a callback as soon as it arrives
+"""
+
+import json
+import logging
+import struct
+import threading
+import time
+
+import websocket
+
+logger = logging.getLogger(__name__)
+
+# ============ PROTOCOL ============
+
+SMART_STREAM_URL = "wss://smartapisocket.angelone.in/smart-stream"
+HEARTBEAT_MESSAGE = "ping"
+HEARTBEAT_INTERVAL = 10  # seconds
+
+# Subscription modes
+LTP_MODE = 1
+QUOTE_MODE = 2
+SNAP_QUOTE_MODE = 3
+
+# Exchange types used by SmartStream
+EXCHANGE_TYPES = {
+    'NSE': 1,   # NSE cash
+    'NFO': 2,   # NSE F&O
+    'BSE': 3,   # BSE cash
+    'BFO': 4,   # BSE F&O
+    'MCX': 5,
+    'CDS': 13
+}
+
+# Packet layouts (little-endian). Prices are sent in paise.
+_HEADER = struct.Struct("<BB25sqqq")           # mode, exchange, token, seq, exch ts, ltp
+_QUOTE = struct.Struct("<qqqddqqqq")           # ltq, atp, volume, buy qty, sell qty, o, h, l, c
+_SNAP_QUOTE = struct.Struct("<qqq")            # last traded ts, OI, OI change %
+
+HEADER_SIZE = _HEADER.size                     # 51 bytes
+QUOTE_SIZE = HEADER_SIZE + _QUOTE.size         # 123 bytes
+SNAP_QUOTE_SIZE = QUOTE_SIZE + _SNAP_QUOTE.size
+
+def decode_tick(packet):
+    """Decode one binary SmartStream packet into a tick dict
+
+    Prices are converted from paise to rupees. Returns None for packets that are
+    too short to hold a header.
+    """
+    if len(packet) < HEADER_SIZE:
+        return None
+
+    mode, exchange_type, raw_token, sequence, exchange_ts, ltp = _HEADER.unpack_from(packet, 0)
+    tick = {
+        'mode': mode,
+        'exchange_type': exchange_type,
+        'token': raw_token.split(b'\x00', 1)[0].decode('ascii'),
+        'sequence': sequence,
+        'exchange_timestamp': exchange_ts,
+        'ltp': ltp / 100.0
+    }
+
+    if mode >= QUOTE_MODE and len(packet) >= QUOTE_SIZE:
+        (ltq, atp, volume, buy_qty, sell_qty,
+         open_, high, low, close) = _QUOTE.unpack_from(packet, HEADER_SIZE)
+        tick.update({
+            'last_traded_quantity': ltq,
+            'average_price': atp / 100.0,
+            'volume': volume,
+            'total_buy_quantity': buy_qty,
+            'total_sell_quantity': sell_qty,
+            'open': open_ / 100.0,
+            'high': high / 100.0,
+            'low': low / 100.0,
+            'close': close / 100.0
+        })
+
+    if mode == SNAP_QUOTE_MODE and len(packet) >= SNAP_QUOTE_SIZE:
+        last_traded_ts, oi, oi_change_pct = _SNAP_QUOTE.unpack_from(packet, QUOTE_SIZE)
+        tick.update({
+            'last_traded_timestamp': last_traded_ts,
+            'oi': oi,
+            'oi_change_pct': oi_change_pct
+        })
+
+    return tick
+
+def build_subscription(tokens_by_exchange, mode=QUOTE_MODE, action=1, correlation_id="optiontrader"):
+    """Build the JSON subscribe (action=1) or unsubscribe (action=0) request"""
+    return json.dumps({
+        'correlationID': correlation_id,
+        'action': action,
+        'params': {
+            'mode': mode,
+            'tokenList': [
+                {'exchangeType': EXCHANGE_TYPES.get(exchange, exchange), 'tokens': list(tokens)}
+                for exchange, tokens in tokens_by_exchange.items()
+            ]
+        }
+    })
+
+# ============ STREAM CLIENT ============
+
+class TickStream:
+    """Background WebSocket client that keeps a SmartStream subscription alive
+
+    ``on_tick`` is called from the socket thread with every decoded tick. The
+    connection is re-established with exponential backoff whenever it drops, and
+    all subscriptions are replayed on every new connection.
+    """
+
+    def __init__(self, auth_token, api_key, client_code, feed_token, on_tick,
+                 url=SMART_STREAM_URL, mode=QUOTE_MODE, max_backoff=30):
+        self.url = url
+        self.mode = mode
+        self.on_tick = on_tick
+        self.max_backoff = max_backoff
+        self.headers = {
+            'Authorization': auth_token,
+            'x-api-key': api_key,
+            'x-client-code': client_code,
+            'x-feed-token': feed_token
+        }
+
+        self.subscriptions = {}  # mode -> {exchange: [tokens]}
+        self.connected = threading.Event()
+        self.tick_count = 0
+        self.reconnects = 0
+
+        self._ws = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, tokens_by_exchange, mode=None):
+        """Add tokens to the subscription, sending them now if connected
+
+        ``mode`` defaults to the stream's mode; SNAP_QUOTE_MODE adds open interest.
+        """
+        mode = mode or self.mode
+        with self._lock:
+            by_exchange = self.subscriptions.setdefault(mode, {})
+            for exchange, tokens in tokens_by_exchange.items():
+                known = by_exchange.setdefault(exchange, [])
+                known.extend(str(t) for t in tokens if str(t) not in known)
+        if self.connected.is_set():
+            self._send(build_subscription(tokens_by_exchange, mode))
+
+    def unsubscribe(self, tokens_by_exchange, mode=None):
+        """Drop tokens from the subscription, telling the server now if connected"""
+        mode = mode or self.mode
+        with self._lock:
+            by_exchange = self.subscriptions.get(mode, {})
+            for exchange, tokens in tokens_by_exchange.items():
+                dropped = {str(t) for t in tokens}
+                by_exchange[exchange] = [t for t in by_exchange.get(exchange, []) if t not in dropped]
+                if not by_exchange[exchange]:
+                    del by_exchange[exchange]
+            if not by_exchange:
+                self.subscriptions.pop(mode, None)
+        if self.connected.is_set():
+            self._send(build_subscription(tokens_by_exchange, mode, action=0))
+
+    def set_tokens(self, auth_token, feed_token):
+        """Use renewed session tokens from the next (re)connect on"""
+        self.headers = {**self.headers, 'Authorization': auth_token, 'x-feed-token': feed_token}
+
+    def start(self):
+        """Start the connect/reconnect loop in a daemon thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="tick-stream", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Close the socket and stop reconnecting"""
+        self._stop.set()
+        ws = self._ws
+        if ws:
+            ws.keep_running = False
+            # Shut the socket down instead of closing it: the socket thread is
+            # parked in epoll, which forgets a descriptor closed under it and
+            # would only notice at its 10 s timeout. It closes the socket itself
+            # once woken.
+            if ws.sock:
+                ws.sock.abort()
+        if self._thread:
+            self._thread.join(timeout=5)
+
+    def _send(self, message):
+        try:
+            self._ws.send(message)
+        except Exception as e:
+            logger.warning(f"Tick stream send failed: {e}")
+
+    def _run(self):
+        backoff = 1
+        while not self._stop.is_set():
+            self._ws = websocket.WebSocketApp(
+                self.url,
+                header=self.headers,
+                on_open=self._on_open,
+                on_message=self._on_message,
+                on_error=self._on_error,
+                on_close=self._on_close
+            )
+            started = time.monotonic()
+            self._ws.run_forever(ping_interval=HEARTBEAT_INTERVAL, ping_payload=HEARTBEAT_MESSAGE)
+            self.connected.clear()
+
+            if self._stop.is_set():
+                break
+
+            # A connection that stayed up for a while resets the backoff
+            if time.monotonic() - started > self.max_backoff:
+                backoff = 1
+            self.reconnects += 1
+            logger.warning(f"Tick stream disconnected, reconnecting in {backoff}s")
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, self.max_backoff)
+
+    def _on_open(self, ws):
+        logger.info("✓ Tick stream connected")
+        with self._lock:
+            subscriptions = {
+                mode: {exchange: list(tokens) for exchange, tokens in by_exchange.items()}
+                for mode, by_exchange in self.subscriptions.items()
+            }
+        for mode, by_exchange in subscriptions.items():
+            self._send(build_subscription(by_exchange, mode))
+        self.connected.set()
+
+    def _on_message(self, ws, message):
+        if isinstance(message, str):
+            # Heartbeat replies and control messages
+            if message != "pong":
+                logger.debug(f"Tick stream message: {message}")
+            return
+
+        tick = decode_tick(message)
+        if tick is None:
+            return
+        self.tick_count += 1
+        try:
+            self.on_tick(tick)
+        except Exception as e:
+            logger.error(f"Error handling tick for {tick['token']}: {e}")
+
+    def _on_error(self, ws, error):
+        logger.error(f"Tick stream error: {error}")
+
+    def _on_close(self, ws, status_code=None, message=None):
+        self.connected.clear()
+        logger.info(f"Tick stream closed ({status_code})")
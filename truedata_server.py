@@ -3,13 +3,24 @@ True Data API Server for Live Market Data
 Fetches real-time market data from True Data and serves it to the frontend
 """
 
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
-import requests
+import aiohttp
+import asyncio
 import threading
 import logging
+import random
 import time
+import os
 from datetime import datetime
+from quote_hub import QuoteHub, parse_symbols
+from snapshot_cache import SnapshotCache
+from tick_store import TickStore
+from poll_scheduler import PollScheduler
+from session_manager import SessionManager
+from providers import parse_exchange_time
+import metrics
+import profiler
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -17,6 +28,7 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 CORS(app)
+metrics.instrument_flask(app)
 
 # ============ TRUE DATA CONFIGURATION ============
 TRUE_DATA_CONFIG = {
@@ -35,6 +47,19 @@ live_data = {
 auth_token = None
 is_authenticated = False
 
+# Push subscribers of this server. The hub is its own instance: server.py
+# imports this module for the merged feed and keeps its own hub and hook
+quote_hub = QuoteHub()
+
+# Every update is persisted as per-day columnar tick files. The root is this
+# server's own: server.py records under data/ticks, and a tick store has one writer
+TICK_STORE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ticks', 'truedata')
+
+tick_store = TickStore(TICK_STORE_DIR)
+
+# Fallback price simulation; set TRUEDATA_SIMULATION_SEED for a reproducible walk
+simulation_rng = random.Random(os.getenv('TRUEDATA_SIMULATION_SEED'))
+
 # Symbol mapping for True Data
 SYMBOL_MAP = {
     'NIFTY': 'NIFTY 50',
@@ -42,86 +67,192 @@ SYMBOL_MAP = {
     'BANKNIFTY': 'NIFTY BANK'
 }
 
+# Epoch seconds each symbol was last updated from True Data (for /metrics)
+updated_at = {}
+
+# Hot-path histogram children, bound once (see metrics.py)
+quote_latency = metrics.broker_latency.labels('truedata', 'quote')
+login_latency = metrics.broker_latency.labels('truedata', 'login')
+feed_cycle = metrics.feed_cycle.labels('truedata')
+store_lag = metrics.tick_store_lag.labels('truedata')
+
+# ============ CONCURRENT FETCHING ============
+
+FETCH_CONCURRENCY = 8   # simultaneous quote requests (and pooled connections)
+HTTP_TIMEOUT = 10       # seconds per request
+KEEPALIVE_TIMEOUT = 60  # seconds an idle pooled connection is kept open
+
+class TrueDataFetcher:
+    """Fetches quotes for many symbols at once on a background asyncio loop
+
+    All requests share one keep-alive connection pool and a concurrency limit.
+    The token is renewed ahead of expiry by truedata_session; a request that
+    still gets a 401 awaits that manager's single in-flight renewal instead of
+    logging in on its own, then retries once.
+    """
+
+    def __init__(self, concurrency=FETCH_CONCURRENCY, timeout=HTTP_TIMEOUT):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._loop = None
+        self._session = None
+        self._semaphore = None
+        self._start_lock = threading.Lock()
+
+    def run(self, coro):
+        """Run a coroutine on the fetcher loop from any thread and wait for its result"""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="truedata-fetch", daemon=True).start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def _client(self):
+        if self._session is None:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=KEEPALIVE_TIMEOUT),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._session
+
+    async def login(self, rejected_token=None):
+        """Wait for a session unless another request already replaced ``rejected_token``"""
+        if auth_token and auth_token != rejected_token:
+            return True
+        session = await asyncio.wrap_future(truedata_session.renew(rejected_token, wait=False))
+        return session is not None
+
+    async def request_token(self):
+        """Log in to True Data; returns the session tokens or None"""
+        try:
+            logger.info(f"Attempting True Data authentication for {TRUE_DATA_CONFIG['userId']}")
+            
+            # True Data login endpoint
+            login_url = f"{TRUE_DATA_CONFIG['base_url']}/auth/login"
+            payload = {
+                'username': TRUE_DATA_CONFIG['userId'],
+                'password': TRUE_DATA_CONFIG['password']
+            }
+            
+            with login_latency.time():
+                async with self._client().post(login_url, json=payload) as response:
+                    if response.status == 200:
+                        data = await response.json(content_type=None)
+                        if data.get('token'):
+                            logger.info(f"✓ Successfully authenticated with True Data")
+                            return {'auth_token': data['token']}
+                    
+                    logger.error(f"✗ Authentication failed: {response.status}")
+                    logger.error(f"Response: {await response.text()}")
+            
+        except Exception as e:
+            logger.error(f"✗ Authentication error: {e}")
+        return None
+
+    async def fetch(self, symbol):
+        """Quote for one True Data symbol, or None; re-authenticates at most once"""
+        session = self._client()
+        for attempt in range(2):
+            token = auth_token
+            if not token:
+                logger.warning("No auth token, attempting to authenticate...")
+                if not await self.login(token):
+                    return None
+                token = auth_token
+            
+            # True Data quote endpoint
+            quote_url = f"{TRUE_DATA_CONFIG['base_url']}/quotes/{symbol}"
+            headers = {
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'application/json'
+            }
+            
+            try:
+                async with self._semaphore:
+                    with quote_latency.time():
+                        async with session.get(quote_url, headers=headers) as response:
+                            if response.status == 200:
+                                return await response.json(content_type=None)
+                            status = response.status
+            except Exception as e:
+                logger.error(f"Error fetching market data for {symbol}: {e}")
+                return None
+            
+            if status != 401 or attempt:
+                logger.error(f"Failed to fetch data for {symbol}: {status}")
+                return None
+            
+            # Token expired: every request that saw it rejected shares one renewal
+            logger.info("Token expired, re-authenticating...")
+            if not await self.login(token):
+                return None
+        return None
+
+    async def fetch_all(self, symbols):
+        quotes = await asyncio.gather(*(self.fetch(symbol) for symbol in symbols))
+        return dict(zip(symbols, quotes))
+
+    def fetch_many(self, symbols):
+        """{symbol: quote or None} for all symbols, fetched concurrently"""
+        return self.run(self.fetch_all(list(symbols)))
+
+    def close(self):
+        """Close the pooled connections"""
+        if self._session is not None:
+            self.run(self._session.close())
+            self._session = None
+
+fetcher = TrueDataFetcher()
+
 # ============ AUTHENTICATION ============
 
-def authenticate_truedata():
-    """Authenticate with True Data API"""
-    global auth_token, is_authenticated
+def truedata_login():
+    global is_authenticated
     
-    try:
-        logger.info(f"Attempting True Data authentication for {TRUE_DATA_CONFIG['userId']}")
-        
-        # True Data login endpoint
-        login_url = f"{TRUE_DATA_CONFIG['base_url']}/auth/login"
-        
-        payload = {
-            'username': TRUE_DATA_CONFIG['userId'],
-            'password': TRUE_DATA_CONFIG['password']
-        }
-        
-        response = requests.post(login_url, json=payload, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            if data.get('token'):
-                auth_token = data['token']
-                is_authenticated = True
-                logger.info(f"✓ Successfully authenticated with True Data")
-                return True
-        
-        logger.error(f"✗ Authentication failed: {response.status_code}")
-        logger.error(f"Response: {response.text}")
-        is_authenticated = False
-        return False
-            
-    except Exception as e:
-        logger.error(f"✗ Authentication error: {e}")
+    tokens = fetcher.run(fetcher.request_token())
+    if tokens is None:
         is_authenticated = False
+    return tokens
+
+def adopt_truedata_session(session):
+    """Swap the renewed token in; in-flight requests finish with the old one"""
+    global auth_token, is_authenticated
+    
+    auth_token = session.token
+    is_authenticated = True
+
+# True Data has no refresh token, so the session is renewed by logging in
+# again in the background before the token's lifetime runs out
+truedata_session = SessionManager('truedata', truedata_login, on_renewed=adopt_truedata_session)
+
+def authenticate_truedata():
+    """Authenticate with True Data API and keep the session renewed"""
+    if truedata_session.renew(login=True) is None:
         return False
+    truedata_session.start()
+    return True
 
 def get_market_data(symbol):
     """Fetch market data for a symbol from True Data"""
-    global auth_token
-    
-    try:
-        if not auth_token:
-            logger.warning("No auth token, attempting to authenticate...")
-            if not authenticate_truedata():
-                return None
-        
-        # True Data quote endpoint
-        quote_url = f"{TRUE_DATA_CONFIG['base_url']}/quotes/{symbol}"
-        
-        headers = {
-            'Authorization': f'Bearer {auth_token}',
-            'Content-Type': 'application/json'
-        }
-        
-        response = requests.get(quote_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            return response.json()
-        elif response.status_code == 401:
-            # Token expired, re-authenticate
-            logger.info("Token expired, re-authenticating...")
-            if authenticate_truedata():
-                return get_market_data(symbol)  # Retry
-        
-        logger.error(f"Failed to fetch data for {symbol}: {response.status_code}")
-        return None
-            
-    except Exception as e:
-        logger.error(f"Error fetching market data for {symbol}: {e}")
-        return None
+    return fetcher.run(fetcher.fetch(symbol))
 
-def update_live_data():
-    """Update live market data for all symbols"""
+def fetch_all_market_data(symbols=None):
+    """Raw True Data quotes keyed by SYMBOL_MAP key (None where a fetch failed)"""
+    names = {key: SYMBOL_MAP[key] for key in (symbols or SYMBOL_MAP)}
+    fetched = fetcher.fetch_many(names.values())
+    return {symbol_key: fetched[symbol_name] for symbol_key, symbol_name in names.items()}
+
+def update_live_data(symbols=None):
+    """Update live market data for the given symbols (default all); returns how many came from True Data"""
     global live_data
     
-    for symbol_key, symbol_name in SYMBOL_MAP.items():
-        data = get_market_data(symbol_name)
-        
+    # One concurrent round trip for the whole symbol list
+    fetched = 0
+    for symbol_key, data in fetch_all_market_data(symbols).items():
+        previous = live_data[symbol_key]['ltp']
         if data:
+            fetched += 1
             live_data[symbol_key] = {
                 'ltp': data.get('ltp', 0),
                 'change': data.get('change', 0),
@@ -131,10 +262,19 @@ def update_live_data():
                 'low': data.get('low', 0),
                 'open': data.get('open', 0)
             }
-            logger.info(f"Updated {symbol_key}: {live_data[symbol_key]['ltp']}")
+            tick_store.append(symbol_key, live_data[symbol_key]['ltp'], live_data[symbol_key]['volume'])
+            updated_at[symbol_key] = time.time()
+            exchange_ms = parse_exchange_time(data.get('exchange_time') or data.get('last_trade_time'))
+            if exchange_ms:
+                store_lag.observe(updated_at[symbol_key] - exchange_ms / 1000)
+            indices_cache.mark_changed()
+            quote_hub.publish(symbol_key, live_data[symbol_key])
+            logger.debug(f"Updated {symbol_key}: {live_data[symbol_key]['ltp']}")
         else:
             # Use simulated data as fallback
             simulate_price_movement(symbol_key)
+        poll_scheduler.record(symbol_key, live_data[symbol_key]['ltp'] != previous)
+    return fetched
 
 def simulate_price_movement(symbol):
     """Simulate realistic price movement as fallback"""
@@ -144,35 +284,66 @@ def simulate_price_movement(symbol):
         'BANKNIFTY': 49000
     }
     
-    if symbol not in live_data or live_data[symbol]['ltp'] == 0:
-        live_data[symbol]['ltp'] = base_prices.get(symbol, 0)
-        live_data[symbol]['open'] = base_prices.get(symbol, 0)
+    # Work on a copy and swap it in so readers never see a half-updated quote
+    quote = dict(live_data.get(symbol, {'ltp': 0, 'open': 0}))
+    if quote['ltp'] == 0:
+        quote['ltp'] = base_prices.get(symbol, 0)
+        quote['open'] = base_prices.get(symbol, 0)
     
     # Simulate small price movement
     volatility = 0.0003
-    movement = (random.uniform(-1, 1) * volatility)
-    live_data[symbol]['ltp'] *= (1 + movement)
+    movement = (simulation_rng.uniform(-1, 1) * volatility)
+    quote['ltp'] *= (1 + movement)
+    
+    change = quote['ltp'] - quote['open']
+    quote['change'] = change
+    quote['changePct'] = (change / quote['open']) * 100
     
-    change = live_data[symbol]['ltp'] - live_data[symbol]['open']
-    live_data[symbol]['change'] = change
-    live_data[symbol]['changePct'] = (change / live_data[symbol]['open']) * 100
+    live_data[symbol] = quote
+    indices_cache.mark_changed()
+    quote_hub.publish(symbol, quote)
+
+# Per-symbol poll intervals from the market session, subscriber demand and
+# recent price changes (see poll_scheduler.py)
+poll_scheduler = PollScheduler(SYMBOL_MAP, demand=quote_hub.demand)
+quote_hub.on_subscribe = lambda sub: poll_scheduler.wake()
 
 def live_feed_worker():
-    """Background worker to update live feed periodically"""
+    """Background worker polling each symbol when the scheduler says it is due"""
     while True:
+        due = poll_scheduler.due()
+        if not due:
+            poll_scheduler.wait()
+            continue
         try:
-            update_live_data()
-            time.sleep(2)  # Update every 2 seconds
+            with feed_cycle.time():
+                fetched = update_live_data(due)
+            if not fetched:
+                delay = poll_scheduler.failure(due)
+                logger.warning(f"No True Data quotes received, retrying in {delay:.1f}s")
         except Exception as e:
-            logger.error(f"Error in live feed worker: {e}")
-            time.sleep(5)
+            delay = poll_scheduler.failure(due)
+            logger.error(f"Error in live feed worker: {e}; retrying in {delay:.1f}s")
 
 # ============ API ENDPOINTS ============
 
+indices_cache = SnapshotCache(lambda: dict(live_data))
+
 @app.route('/api/indices')
 def get_indices():
-    """Get current indices data"""
-    return jsonify(live_data)
+    """Get current indices data from the cached snapshot"""
+    poll_scheduler.touch()
+    return indices_cache.respond()
+
+@app.route('/api/stream')
+def stream_indices():
+    """Push quote changes as Server-Sent Events (optional ?symbols=A,B filter)"""
+    symbols = parse_symbols(request.args.get('symbols'))
+    return Response(
+        quote_hub.stream(symbols),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/api/status')
 def get_status():
@@ -180,9 +351,21 @@ def get_status():
     return jsonify({
         'authenticated': is_authenticated,
         'timestamp': datetime.now().isoformat(),
-        'symbols': list(live_data.keys())
+        'symbols': list(live_data.keys()),
+        'polling': poll_scheduler.stats(),
+        'session': truedata_session.stats()
     })
 
+metrics.registry.gauge('truedata_quote_age_seconds', 'Seconds since the symbol was last updated from True Data',
+                       lambda: {(symbol,): round(time.time() - at, 3) for symbol, at in updated_at.items()},
+                       ('symbol',))
+metrics.snapshot_collectors('truedata_snapshot', lambda: {'indices': indices_cache})
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of latency histograms and quote staleness"""
+    return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/health')
 def health_check():
     """Health check endpoint"""
@@ -217,20 +400,23 @@ def index():
     </html>
     """
 
+# ============ PROFILING ============
+
+# /api/admin/profile start, status and stop (see profiler.py)
+profiler.register(app)
+
 # ============ STARTUP ============
 
 if __name__ == '__main__':
-    import random
-    
     logger.info("Starting True Data Server...")
     
     # Authenticate on startup
     authenticate_truedata()
     
     # Start background worker
-    worker_thread = threading.Thread(target=live_feed_worker, daemon=True)
+    worker_thread = threading.Thread(target=live_feed_worker, name="truedata-feed", daemon=True)
     worker_thread.start()
     logger.info("Started live feed worker")
     
     # Start Flask server
-    app.run(host='0.0.0.0', port=5002, debug=False)
+    app.run(host='0.0.0.0', port=5002, debug=False, threaded=True)
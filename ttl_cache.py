@@ -0,0 +1,135 @@
+"""
+TTL Cache with Single-Flight Loading
+Caches upstream broker responses for a short time. Concurrent misses for the
+same key share one upstream call, and entries past their TTL can still be
+served while a single background refresh runs (stale-while-revalidate).
+"""
+
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class _Flight:
+    """One in-progress upstream call that other callers can wait on"""
+
+    __slots__ = ('done', 'value', 'error', 'stale')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+        # Set when the key is invalidated mid-load: the result still answers
+        # the callers already waiting, but is not cached
+        self.stale = False
+
+class TTLCache:
+    """Per-key cache with TTL, stale-while-revalidate and request coalescing
+
+    ``cacheable(value)`` decides whether a loaded value is stored; failed
+    broker responses are returned to the caller but never cached.
+    """
+
+    def __init__(self, name, ttl, stale_ttl=0, cacheable=None):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.cacheable = cacheable or (lambda value: value is not None)
+
+        self._entries = {}
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    def get(self, key, loader):
+        """Return the cached value for key, calling loader() at most once per refresh"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < self.ttl:
+                    self.hits += 1
+                    return value
+                if age < self.ttl + self.stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._flights:
+                        flight = self._flights[key] = _Flight()
+                        threading.Thread(
+                            target=self._load, args=(key, loader, flight),
+                            name=f"cache-refresh-{self.name}", daemon=True
+                        ).start()
+                    return value
+
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                self.misses += 1
+                flight = self._flights[key] = _Flight()
+                leader = True
+
+        if leader:
+            self._load(key, loader, flight)
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.value
+
+    def _load(self, key, loader, flight):
+        try:
+            flight.value = loader()
+        except Exception as e:
+            flight.error = e
+            logger.warning(f"{self.name} cache load failed: {e}")
+
+        with self._lock:
+            if flight.error is not None:
+                self.errors += 1
+            elif not flight.stale and self.cacheable(flight.value):
+                self._entries[key] = (flight.value, time.monotonic())
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.done.set()
+
+    def invalidate(self, key=None):
+        """Drop one key, or every entry when key is None
+
+        Loads already in flight for those keys started before the change that
+        caused the invalidation: their results are not cached, and later
+        callers start a fresh load instead of waiting on them.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+                flights, self._flights = self._flights, {}
+            else:
+                self._entries.pop(key, None)
+                flight = self._flights.pop(key, None)
+                flights = {key: flight} if flight else {}
+            for flight in flights.values():
+                flight.stale = True
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses + self.coalesced
+        return {
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'hit_rate': round((lookups - self.misses) / lookups, 4) if lookups else 0.0
+        }